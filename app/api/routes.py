@@ -1,8 +1,69 @@
-from fastapi import APIRouter
+from fastapi import APIRouter, Depends, HTTPException
+from fastapi.responses import PlainTextResponse
+from sqlalchemy.exc import SQLAlchemyError
+from sqlalchemy.orm import Session
+
+from app.core.lifespan import readiness
+from app.core.metrics import registry
+from app.crud.outbox import outbox_stats
+from app.crud.response_cache import public_feed_cache
+from app.db.deps import check_metrics_token, get_current_admin, get_db
+from app.db.pool import describe_pool, pool_snapshot
+from app.db.session import engine
 
 router = APIRouter()
+# Operations data of every user and worker. Probes stay on 'router' for load balancers
+admin_router = APIRouter(dependencies=[Depends(get_current_admin)])
 
 
 @router.get("/hello")
 def say_hello():  # For testing if routing is functioning
     return {"message": "Hello and welcome to my TaskListApp!"}
+
+
+@admin_router.get("/db/pool")
+def get_pool_stats():  # Pool usage and checkout wait times of this worker process
+    return pool_snapshot(engine)
+
+
+@admin_router.get("/cache/public-feed")
+def get_public_feed_cache_stats():  # Hits, misses and evictions of this worker's public feed cache
+    return public_feed_cache.stats()
+
+
+@admin_router.get("/outbox")
+def get_outbox_stats(  # Pending and failed outbox messages, and batches drained by this worker
+    db: Session = Depends(get_db),
+):
+    return outbox_stats(db)
+
+
+@router.get(
+    "/metrics",
+    response_class=PlainTextResponse,
+    dependencies=[Depends(check_metrics_token)],
+)
+def get_metrics():  # Prometheus text format. Like /db/pool, the numbers are this worker process's only
+    return PlainTextResponse(
+        registry.render(), media_type="text/plain; version=0.0.4; charset=utf-8"
+    )
+
+
+@router.get("/healthz")
+def get_liveness():  # The process is up and serving. Doesn't touch the database
+    return {"status": "ok"}
+
+
+@router.get("/readyz")
+def get_readiness():  # 200 once migrations and pool warm-up are done and the database answers
+    if not readiness.ready:
+        raise HTTPException(
+            status_code=503,
+            detail=f"Starting: {readiness.error or 'preparing database'}",
+        )
+    try:
+        with engine.connect() as connection:
+            connection.exec_driver_sql("SELECT 1")
+    except SQLAlchemyError:
+        raise HTTPException(status_code=503, detail="Database not reachable")
+    return {"status": "ready", "pool": describe_pool(engine.pool)}
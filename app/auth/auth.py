@@ -1,11 +1,18 @@
+import hashlib
 import os
+import time
 from datetime import datetime, timedelta, timezone
-from typing import Optional
+from typing import Dict, Optional, Type, Union
 
-from jose import jwt
-from passlib.context import CryptContext
+from jose import JWTError
+from jose import jwt as jose_jwt
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import Session
 
+from app.auth.hashing import password_hasher
+from app.core.cache import TTLCache
+from app.core.config import settings
 from app.models.models import User
 
 SECRET_KEY = os.getenv("SECRET_KEY")
@@ -15,17 +22,74 @@ if expire_str is None:  # Int variable not str. Needed for black.
     raise ValueError("ACCESS_TOKEN_EXPIRE_MINUTES environment variable not set")
 ACCESS_TOKEN_EXPIRE_MINUTES = int(expire_str)
 
-pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
-
 
 def verify_password(
     plain_password, hashed_password
-):  # Verifies passed password is hashed password
-    return pwd_context.verify(plain_password, hashed_password)
+):  # Verifies passed password is hashed password. Runs in the hashing process pool
+    return password_hasher.verify(plain_password, hashed_password)
+
+
+# Returns password hashed. Runs in the hashing process pool
+def get_password_hash(password):
+    return password_hasher.hash(password)
+
+
+async def verify_password_async(
+    plain_password, hashed_password
+):  # verify_password for async handlers
+    return await password_hasher.verify_async(plain_password, hashed_password)
+
+
+async def get_password_hash_async(password):  # get_password_hash for async handlers
+    return await password_hasher.hash_async(password)
+
+
+# Raised for tokens with a bad signature, bad format or past expiry
+class InvalidTokenError(Exception):
+    pass
+
+
+class JoseBackend:  # python-jose. Default backend
+    def encode(self, claims: dict) -> str:
+        return jose_jwt.encode(claims, SECRET_KEY, algorithm=ALGORITHM)
+
+    def decode(self, token: str) -> dict:
+        try:
+            return jose_jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM])
+        except JWTError as e:
+            raise InvalidTokenError(str(e))
+
 
+class PyJWTBackend:  # PyJWT. Faster decoding with the same tokens
+    def __init__(self):
+        import jwt  # Optional dependency. Only needed when JWT_BACKEND=pyjwt
 
-def get_password_hash(password):  # Returns password hashed
-    return pwd_context.hash(password)
+        if SECRET_KEY is None or ALGORITHM is None:
+            raise ValueError("SECRET_KEY and ALGORITHM environment variables not set")
+        self._jwt = jwt
+        self._key = SECRET_KEY
+        self._algorithm = ALGORITHM
+
+    def encode(self, claims: dict) -> str:
+        return self._jwt.encode(claims, self._key, algorithm=self._algorithm)
+
+    def decode(self, token: str) -> dict:
+        try:
+            return self._jwt.decode(token, self._key, algorithms=[self._algorithm])
+        except self._jwt.PyJWTError as e:
+            raise InvalidTokenError(str(e))
+
+
+JWT_BACKENDS: Dict[str, Type[Union[JoseBackend, PyJWTBackend]]] = {
+    "jose": JoseBackend,
+    "pyjwt": PyJWTBackend,
+}
+jwt_backend = JWT_BACKENDS[settings.JWT_BACKEND]()
+
+# Token digest -> verified claims. Clients reuse a token until it expires so the signature only has to be checked once
+token_cache = TTLCache(
+    max_entries=settings.TOKEN_CACHE_MAX_ENTRIES, ttl=settings.TOKEN_CACHE_TTL_SECONDS
+)
 
 
 def create_access_token(
@@ -36,8 +100,45 @@ def create_access_token(
         expires_delta or timedelta(minutes=ACCESS_TOKEN_EXPIRE_MINUTES)
     )
     to_encode.update({"exp": expire})
-    return jwt.encode(to_encode, SECRET_KEY, algorithm=ALGORITHM)
+    return jwt_backend.encode(to_encode)
+
+
+def decode_access_token(token: str) -> dict:
+    """
+    Returns the claims of a valid access token.
+
+    Args:
+        token (str): Encoded JWT from the Authorization header.
+
+    Returns:
+        dict: The verified token claims.
+
+    Raises:
+        InvalidTokenError: If the signature, format or expiry of the token is invalid.
+
+    Notes:
+        - Verified claims are cached by the token's SHA-256 digest, so repeated requests skip signature checks.
+        - Cached claims expire no later than the token's 'exp' claim.
+    """
+    digest = hashlib.sha256(token.encode()).digest()
+    claims = token_cache.get(digest)
+    if claims is not None:
+        return claims
+
+    claims = jwt_backend.decode(token)
+    ttl = settings.TOKEN_CACHE_TTL_SECONDS
+    if isinstance(claims.get("exp"), (int, float)):
+        ttl = min(ttl, claims["exp"] - time.time())
+    if ttl > 0:
+        token_cache.set(digest, claims, ttl=ttl)
+    return claims
 
 
 def get_user_by_username(db: Session, username: str):  # Returns user by username string
     return db.query(User).filter(User.username == username).first()
+
+
+async def get_user_by_username_async(
+    db: AsyncSession, username: str
+):  # get_user_by_username for async handlers
+    return await db.scalar(select(User).where(User.username == username))
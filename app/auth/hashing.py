@@ -0,0 +1,110 @@
+import asyncio
+import multiprocessing
+import threading
+from concurrent.futures import ProcessPoolExecutor
+from typing import Callable, Dict, Optional
+
+from fastapi import HTTPException
+from passlib.context import CryptContext
+from starlette.concurrency import run_in_threadpool
+
+from app.core.config import settings
+
+"""
+bcrypt runs in a dedicated process pool. A hash costs a few hundred milliseconds of CPU, so hashing in the request
+threads lets a login storm starve the threadpool that serves task reads. The async methods await the pool's future on
+the event loop, so a login waiting for bcrypt doesn't hold a threadpool thread either. The pool is bounded: once
+max_pending calls are in flight new ones are rejected with 503 right away instead of queueing behind the storm.
+"""
+
+_contexts: Dict[int, CryptContext] = {}
+
+
+# One CryptContext per cost factor, built in the process that uses it
+def _context(rounds: int) -> CryptContext:
+    if rounds not in _contexts:
+        _contexts[rounds] = CryptContext(
+            schemes=["bcrypt"], deprecated="auto", bcrypt__rounds=rounds
+        )
+    return _contexts[rounds]
+
+
+def _hash(password: str, rounds: int) -> str:  # Runs in a worker process
+    return _context(rounds).hash(password)
+
+
+# Runs in a worker process
+def _verify(plain_password: str, hashed_password: str) -> bool:
+    return _context(settings.BCRYPT_ROUNDS).verify(plain_password, hashed_password)
+
+
+class PasswordHasher:  # Hashes and verifies passwords in a bounded process pool
+    def __init__(self, workers: int, max_pending: int, rounds: int):
+        self.workers = workers
+        self.rounds = rounds
+        self._slots = threading.BoundedSemaphore(max_pending)
+        self._executor: Optional[ProcessPoolExecutor] = None
+        self._executor_lock = threading.Lock()
+
+    # Started on first use so importing the app stays cheap
+    def _get_executor(self) -> ProcessPoolExecutor:
+        with self._executor_lock:
+            if self._executor is None:
+                self._executor = ProcessPoolExecutor(
+                    max_workers=self.workers,
+                    # Forking a threaded server is unsafe
+                    mp_context=multiprocessing.get_context("spawn"),
+                )
+            return self._executor
+
+    def _acquire(self) -> None:
+        if not self._slots.acquire(blocking=False):
+            raise HTTPException(
+                status_code=503,
+                detail="Too many login requests, try again later",
+                headers={"Retry-After": "1"},
+            )
+
+    def _run(self, fn: Callable, *args):
+        self._acquire()
+        try:
+            if self.workers == 0:
+                return fn(*args)
+            return self._get_executor().submit(fn, *args).result()
+        finally:
+            self._slots.release()
+
+    async def _run_async(self, fn: Callable, *args):
+        # Waits on the event loop. Without worker processes bcrypt runs in the threadpool, never on the loop
+        self._acquire()
+        try:
+            if self.workers == 0:
+                return await run_in_threadpool(fn, *args)
+            return await asyncio.wrap_future(self._get_executor().submit(fn, *args))
+        finally:
+            self._slots.release()
+
+    def hash(self, password: str) -> str:
+        return self._run(_hash, password, self.rounds)
+
+    def verify(self, plain_password: str, hashed_password: str) -> bool:
+        return self._run(_verify, plain_password, hashed_password)
+
+    async def hash_async(self, password: str) -> str:
+        return await self._run_async(_hash, password, self.rounds)
+
+    async def verify_async(self, plain_password: str, hashed_password: str) -> bool:
+        return await self._run_async(_verify, plain_password, hashed_password)
+
+    def shutdown(self) -> None:
+        with self._executor_lock:
+            if self._executor is not None:
+                self._executor.shutdown(wait=False, cancel_futures=True)
+                self._executor = None
+
+
+password_hasher = PasswordHasher(
+    workers=settings.PASSWORD_HASH_WORKERS,
+    max_pending=settings.PASSWORD_HASH_MAX_PENDING,
+    rounds=settings.BCRYPT_ROUNDS,
+)
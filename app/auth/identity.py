@@ -0,0 +1,47 @@
+from dataclasses import asdict, dataclass
+from typing import Optional
+
+from sqlalchemy import event
+
+from app.core.cache import make_cache
+from app.core.config import settings
+from app.models.models import User
+
+"""
+Cache of authenticated users. get_current_user would otherwise query the users table on every authenticated request
+just to find the id of the token's owner. Only a slim snapshot (id, username) is cached, keyed by the token subject.
+"""
+
+
+@dataclass(frozen=True)
+class CurrentUser:  # Slim snapshot of the authenticated user
+    id: int
+    username: str
+
+
+identity_cache = make_cache(
+    settings.IDENTITY_CACHE_URL,
+    namespace="identity",
+    max_entries=settings.IDENTITY_CACHE_MAX_ENTRIES,
+    ttl=settings.IDENTITY_CACHE_TTL_SECONDS,
+)
+
+
+def get_cached_user(username: str) -> Optional[CurrentUser]:
+    cached = identity_cache.get(username)
+    return CurrentUser(**cached) if cached else None
+
+
+def cache_user(user: CurrentUser) -> None:
+    identity_cache.set(user.username, asdict(user))
+
+
+def invalidate_user(username: str) -> None:
+    identity_cache.delete(username)
+
+
+@event.listens_for(User, "after_insert")
+@event.listens_for(User, "after_update")
+@event.listens_for(User, "after_delete")
+def _invalidate_changed_user(mapper, connection, target):  # Drops stale snapshots
+    invalidate_user(target.username)
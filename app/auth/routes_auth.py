@@ -1,20 +1,51 @@
 from fastapi import APIRouter, Depends, HTTPException
 from sqlalchemy.exc import SQLAlchemyError
 from sqlalchemy.orm import Session
+from starlette.concurrency import run_in_threadpool
 
-from app.auth.auth import (create_access_token, get_password_hash,
-                           get_user_by_username, verify_password)
+from app.auth.auth import (create_access_token, get_password_hash_async,
+                           get_user_by_username, verify_password_async)
 from app.db.deps import get_db
 from app.models.models import User
 from app.schemas.schemas import Token, UserCreate, UserLogin
 
 router = APIRouter()
 
+"""
+register and login are async so the bcrypt call is awaited on the event loop instead of holding a threadpool thread
+for its whole run. Their database work is sync and runs in the threadpool. With DB_MODE=async the versions in
+'routes_auth_async.py' are mounted in front of them and use an AsyncSession instead.
+"""
+
+
+def new_user(
+    user: UserCreate, hashed_password: str
+) -> User:  # User row for a registration. Shared with routes_auth_async.py
+    return User(**user.model_dump(exclude={"password"}), password=hashed_password)
+
+
+def token_response(db_user: User) -> dict:  # Response of register and login
+    access_token = create_access_token(
+        data={"sub": db_user.username, "uid": db_user.id}
+    )
+    return {"access_token": access_token, "token_type": "bearer"}
+
+
+def save_user(db: Session, db_user: User) -> User:  # Runs in the threadpool
+    db.add(db_user)
+    try:
+        db.commit()
+        db.refresh(db_user)
+    except SQLAlchemyError:
+        db.rollback()
+        raise HTTPException(status_code=500, detail="Failed to register user")
+    return db_user
+
 
 @router.post(
     "/register", response_model=Token
 )  # Registers user and returns access token
-def register(user: UserCreate, db: Session = Depends(get_db)):
+async def register(user: UserCreate, db: Session = Depends(get_db)):
     """
     Registers a new user in the database and returns an access token.
 
@@ -35,26 +66,17 @@ def register(user: UserCreate, db: Session = Depends(get_db)):
         - Username must be unique.
         - Rollback writing to database successfully implemented
     """
-    if get_user_by_username(
-        db, user.username
+    if await run_in_threadpool(
+        get_user_by_username, db, user.username
     ):  # Raise exception if username already exists
         raise HTTPException(status_code=400, detail="Username already registered")
-    hashed_password = get_password_hash(user.password)
-    db_user = User(**user.model_dump(exclude={"password"}), password=hashed_password)
-    db.add(db_user)
-    try:
-        db.commit()
-        db.refresh(db_user)
-    except SQLAlchemyError:
-        db.rollback()
-        raise HTTPException(status_code=500, detail="Failed to register user")
-
-    access_token = create_access_token(data={"sub": db_user.username})
-    return {"access_token": access_token, "token_type": "bearer"}
+    hashed_password = await get_password_hash_async(user.password)
+    db_user = await run_in_threadpool(save_user, db, new_user(user, hashed_password))
+    return token_response(db_user)
 
 
 @router.post("/login", response_model=Token)
-def login(
+async def login(
     user: UserLogin, db: Session = Depends(get_db)
 ):  # Logs user in by returning access token
     """
@@ -76,8 +98,7 @@ def login(
         - Rollback writing to database successfully implemented
 
     """
-    db_user = get_user_by_username(db, user.username)
-    if not db_user or not verify_password(user.password, db_user.password):
+    db_user = await run_in_threadpool(get_user_by_username, db, user.username)
+    if not db_user or not await verify_password_async(user.password, db_user.password):
         raise HTTPException(status_code=400, detail="Invalid credentials")
-    access_token = create_access_token(data={"sub": db_user.username})
-    return {"access_token": access_token, "token_type": "bearer"}
+    return token_response(db_user)
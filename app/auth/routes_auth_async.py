@@ -0,0 +1,45 @@
+from fastapi import APIRouter, Depends, HTTPException
+from sqlalchemy.exc import SQLAlchemyError
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.auth.auth import (get_password_hash_async, get_user_by_username_async,
+                           verify_password_async)
+from app.auth.routes_auth import new_user, token_response
+from app.db.deps import get_async_db
+from app.schemas.schemas import Token, UserCreate, UserLogin
+
+router = APIRouter()
+
+"""
+Async versions of register and login in 'routes_auth.py', mounted in front of them when DB_MODE=async. The user lookup
+and insert are awaited on the async engine instead of holding a threadpool thread. Paths, parameters and responses
+are the same as the sync routes. Read the docstrings there for details.
+"""
+
+
+@router.post("/register", response_model=Token)
+async def register(  # Registers user and returns access token
+    user: UserCreate, db: AsyncSession = Depends(get_async_db)
+):
+    if await get_user_by_username_async(db, user.username):
+        raise HTTPException(status_code=400, detail="Username already registered")
+    hashed_password = await get_password_hash_async(user.password)
+    db_user = new_user(user, hashed_password)
+    db.add(db_user)
+    try:
+        await db.commit()
+        await db.refresh(db_user)
+    except SQLAlchemyError:
+        await db.rollback()
+        raise HTTPException(status_code=500, detail="Failed to register user")
+    return token_response(db_user)
+
+
+@router.post("/login", response_model=Token)
+async def login(  # Logs user in by returning access token
+    user: UserLogin, db: AsyncSession = Depends(get_async_db)
+):
+    db_user = await get_user_by_username_async(db, user.username)
+    if not db_user or not await verify_password_async(user.password, db_user.password):
+        raise HTTPException(status_code=400, detail="Invalid credentials")
+    return token_response(db_user)
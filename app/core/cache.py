@@ -0,0 +1,95 @@
+import json
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Callable, Hashable, Optional
+
+
+# Thread-safe LRU cache where every entry also expires after ttl seconds
+class TTLCache:
+    def __init__(
+        self, max_entries: int, ttl: float, clock: Callable[[], float] = time.monotonic
+    ):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self._clock = clock
+        self._data: "OrderedDict[Hashable, tuple]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.evictions = 0  # Entries dropped because the cache was full
+
+    def get(self, key: Hashable, default: Any = None) -> Any:
+        # Returns cached value or default if missing or expired. Hits move the key to the end of the LRU order
+        with self._lock:
+            item = self._data.get(key)
+            if item is None:
+                return default
+            value, expires_at = item
+            if expires_at <= self._clock():
+                del self._data[key]
+                return default
+            self._data.move_to_end(key)
+            return value
+
+    def set(self, key: Hashable, value: Any, ttl: Optional[float] = None) -> None:
+        # Stores value and evicts the least recently used entries when full
+        expires_at = self._clock() + (self.ttl if ttl is None else ttl)
+        with self._lock:
+            self._data[key] = (value, expires_at)
+            self._data.move_to_end(key)
+            while len(self._data) > self.max_entries:
+                self._data.popitem(last=False)
+                self.evictions += 1
+
+    def delete(self, key: Hashable) -> None:
+        with self._lock:
+            self._data.pop(key, None)
+
+    def delete_where(self, predicate: Callable[[Hashable], bool]) -> None:
+        # Deletes every key the predicate returns True for
+        with self._lock:
+            for key in [k for k in self._data if predicate(k)]:
+                del self._data[key]
+
+    def clear(self) -> None:
+        with self._lock:
+            self._data.clear()
+
+    def __len__(self) -> int:
+        return len(self._data)
+
+
+# Same interface as TTLCache but shared by every worker through Redis
+# Values must be JSON serializable
+class RedisCache:
+    def __init__(self, url: str, namespace: str, ttl: float):
+        # Optional dependency. Only needed when a shared cache url is configured
+        import redis  # type: ignore[import-untyped]
+
+        self._client = redis.Redis.from_url(url)
+        self.namespace = namespace
+        self.ttl = ttl
+
+    def _key(self, key: Hashable) -> str:
+        return f"{self.namespace}:{key}"
+
+    def get(self, key: Hashable, default: Any = None) -> Any:
+        raw = self._client.get(self._key(key))
+        return default if raw is None else json.loads(raw)
+
+    def set(self, key: Hashable, value: Any, ttl: Optional[float] = None) -> None:
+        ttl_ms = int((self.ttl if ttl is None else ttl) * 1000)
+        self._client.set(self._key(key), json.dumps(value), px=max(ttl_ms, 1))
+
+    def delete(self, key: Hashable) -> None:
+        self._client.delete(self._key(key))
+
+    def clear(self) -> None:
+        for key in self._client.scan_iter(match=f"{self.namespace}:*"):
+            self._client.delete(key)
+
+
+def make_cache(url: Optional[str], namespace: str, max_entries: int, ttl: float):
+    # Returns a RedisCache when a url is configured and an in-process TTLCache otherwise
+    if url:
+        return RedisCache(url, namespace, ttl)
+    return TTLCache(max_entries=max_entries, ttl=ttl)
@@ -1,19 +1,134 @@
-from pydantic import BaseSettings
+from importlib.util import find_spec
+from typing import List, Literal, Optional
+
+from pydantic import field_validator
+from pydantic_settings import BaseSettings
+from sqlalchemy.engine import make_url
 
 
 class Settings(BaseSettings):  # Gets env variables from .env
-    DATABASE_URL: str
-    POSTGRES_USER: str
-    POSTGRES_PASSWORD: str
-    POSTGRES_DB: str
-    POSTGRES_HOST: str
-    POSTGRES_PORT: str
+    DATABASE_URL: Optional[str] = None  # Built from POSTGRES_* if missing
+    POSTGRES_USER: Optional[str] = None
+    POSTGRES_PASSWORD: Optional[str] = None
+    POSTGRES_DB: Optional[str] = None
+    POSTGRES_HOST: Optional[str] = None
+    POSTGRES_PORT: Optional[str] = None
     SECRET_KEY: str
     ALGORITHM: str
     ACCESS_TOKEN_EXPIRE_MINUTES: int
 
+    # Database
+    DB_MIGRATE_ON_STARTUP: bool = True  # Run 'alembic upgrade head' on startup
+    # 'async' serves task routes from an async engine (asyncpg/aiosqlite)
+    DB_MODE: Literal["sync", "async"] = "sync"
+    DB_POOL_SIZE: int = 5  # Connections kept open per worker process
+    DB_MAX_OVERFLOW: int = 10  # Extra connections opened under load
+    DB_POOL_TIMEOUT: float = 30.0  # Seconds to wait for a free connection
+    DB_POOL_RECYCLE: int = 1800  # Seconds before a connection is replaced. -1 disables
+    DB_POOL_PRE_PING: bool = True  # Test connections on checkout
+    DB_POOL_WARM_CONNECTIONS: int = 2  # Opened on startup before /readyz passes
+    DB_POOL_SLOW_CHECKOUT_SECONDS: float = 0.1  # Slower checkouts are logged
+    DB_SLOW_QUERY_SECONDS: float = 0.5  # Slower statements are logged. 0 disables
+    DB_SLOW_QUERY_LOG_PARAMETERS: bool = True  # Include bound parameters in the log
+    # One statement run this often in a request is logged as a likely N+1. 0 disables
+    DB_REPEATED_QUERY_THRESHOLD: int = 10
+
+    # Task counts
+    COUNT_CACHE_TTL_SECONDS: float = 30.0  # How long cached 'total' values are reused
+    COUNT_CACHE_MAX_ENTRIES: int = 10000
+
+    # Public feed response cache
+    PUBLIC_FEED_CACHE_TTL_SECONDS: float = 5.0  # 0 disables the cache
+    PUBLIC_FEED_CACHE_MAX_ENTRIES: int = 1000  # Pages kept per worker
+    # e.g. redis://localhost:6379/0 to share cached pages and invalidations between workers
+    PUBLIC_FEED_CACHE_URL: Optional[str] = None
+
+    # Task endpoints
+    BULK_MAX_ITEMS: int = 1000  # Items accepted by one /tasks/bulk request
+    EXPORT_BATCH_SIZE: int = 1000  # Rows fetched per round trip by /tasks/export
+    JSON_RESPONSE: Literal["json", "orjson"] = "json"  # 'orjson' renders with orjson
+    # Scopes whose /tasks/search index is kept in memory. Only used without Postgres
+    SEARCH_INDEX_MAX_ENTRIES: int = 100
+
+    # Task event streams (/tasks/stream)
+    # 'postgres' sends events to the streams of every worker with LISTEN/NOTIFY. Required with several workers
+    # Unset follows the database: 'postgres' on PostgreSQL, 'memory' otherwise. Read it via task_events_backend
+    TASK_EVENTS_BACKEND: Optional[Literal["memory", "postgres"]] = None
+    STREAM_MAX_CONNECTIONS: int = 1000  # Open streams per worker. More get 503
+    STREAM_QUEUE_SIZE: int = 100  # Events buffered per stream. Slower clients are reset
+    STREAM_HEARTBEAT_SECONDS: float = 15.0  # Idle time before a keep-alive is sent
+
+    # Outbox worker (side effects of task writes, see app.crud.outbox)
+    OUTBOX_WORKER_ENABLED: bool = True  # Drain the outbox in this worker process
+    OUTBOX_BATCH_SIZE: int = 100  # Messages claimed per round trip
+    OUTBOX_POLL_SECONDS: float = 1.0  # Checks for other workers' messages when idle
+    OUTBOX_LEASE_SECONDS: float = 30.0  # Unfinished claims are run again after it
+    OUTBOX_MAX_ATTEMPTS: int = 10  # Failed messages are kept with failed_at after this
+    OUTBOX_RETRY_SECONDS: float = 1.0  # First retry delay, doubled on every attempt
+
+    # Incremental sync (/tasks/changes)
+    TOMBSTONE_RETENTION_DAYS: int = 30  # Deletions synced this long. Older tokens get 410
+    TOMBSTONE_PRUNE_SECONDS: float = 3600.0  # Pruning interval per worker. 0 disables
+
+    # Production server (gunicorn.conf.py)
+    SERVER_BIND: str = "0.0.0.0:8000"
+    SERVER_WORKERS: int = 0  # 0 starts one worker per CPU core
+    SERVER_KEEPALIVE_SECONDS: int = 5  # Set above the load balancer's idle timeout
+    SERVER_BACKLOG: int = 2048  # Connections the kernel queues while workers are busy
+    SERVER_MAX_REQUESTS: int = 10000  # Requests before a worker is replaced. 0 disables
+    SERVER_MAX_REQUESTS_JITTER: int = (
+        1000  # Random extra so workers aren't replaced together
+    )
+    SERVER_TIMEOUT_SECONDS: int = 60  # Workers silent for longer are restarted
+    SERVER_GRACEFUL_TIMEOUT_SECONDS: int = (
+        30  # Time to finish in-flight requests on shutdown
+    )
+    SERVER_ACCESS_LOG: bool = False
+
+    # Observability
+    METRICS_ENABLED: bool = True  # Record request and query metrics for /metrics
+    # Bearer token the scraper sends to /metrics. Unset leaves /metrics open, so keep it on the internal network
+    METRICS_TOKEN: Optional[str] = None
+
+    # Authenticated user cache
+    IDENTITY_CACHE_TTL_SECONDS: float = 60.0
+    IDENTITY_CACHE_MAX_ENTRIES: int = 10000
+    # e.g. redis://localhost:6379/0 to share the cache between workers
+    IDENTITY_CACHE_URL: Optional[str] = None
+    # Trust the 'uid' claim and skip the user lookup entirely
+    AUTH_TRUST_TOKEN_USER_ID: bool = False
+    JWT_BACKEND: Literal["jose", "pyjwt"] = "jose"  # 'pyjwt' needs PyJWT installed
+    TOKEN_CACHE_MAX_ENTRIES: int = 10000  # 0 verifies every request
+    TOKEN_CACHE_TTL_SECONDS: float = 300.0  # Never longer than the token's 'exp'
+    # Users allowed on admin endpoints, e.g. ADMIN_USERNAMES='["alice"]'. Empty locks them for everyone
+    ADMIN_USERNAMES: List[str] = []
+
+    # Password hashing
+    BCRYPT_ROUNDS: int = 12  # Cost factor for new hashes
+    PASSWORD_HASH_WORKERS: int = 2  # Processes for bcrypt. 0 hashes in the request
+    PASSWORD_HASH_MAX_PENDING: int = 16  # Calls in flight before new ones get 503
+
+    @field_validator("JSON_RESPONSE")
+    @classmethod
+    def _json_library_installed(cls, value: str) -> str:
+        # ORJSONResponse only imports orjson on its first render, which would turn every response into a 500
+        if value == "orjson" and find_spec("orjson") is None:
+            raise ValueError("JSON_RESPONSE=orjson needs orjson installed")
+        return value
+
+    @property
+    def task_events_backend(self) -> str:
+        if self.TASK_EVENTS_BACKEND is not None:
+            return self.TASK_EVENTS_BACKEND
+        # Without DATABASE_URL, app.db.session connects to PostgreSQL with the POSTGRES_* values
+        url = self.DATABASE_URL or "postgresql://"
+        return (
+            "postgres" if make_url(url).get_backend_name() == "postgresql" else "memory"
+        )
+
     class Config:
         env_file = ".env"
+        extra = "ignore"  # .env also holds values that aren't settings
 
 
-settings = Settings()
+settings = Settings()  # type: ignore[call-arg]  # Required values come from the environment or .env
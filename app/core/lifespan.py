@@ -0,0 +1,131 @@
+import asyncio
+import logging
+from contextlib import AsyncExitStack, ExitStack, asynccontextmanager, suppress
+from typing import Optional
+
+from fastapi import FastAPI
+from sqlalchemy.engine import Engine
+from sqlalchemy.ext.asyncio import AsyncEngine
+from starlette.concurrency import run_in_threadpool
+
+from app.core.config import settings
+from app.crud.changes import prune_tombstones
+from app.crud.events import task_events
+from app.crud.outbox import outbox_worker
+from app.db.migrate import upgrade_database
+from app.db.session import SessionLocal, async_engine, engine
+from app.models.models import utcnow
+
+"""
+Startup and shutdown of a worker process. Nothing touches the database at import time: the engines only connect on
+first use, and the lifespan handler starts a background task that runs the migrations and opens DB_POOL_WARM_CONNECTIONS
+connections so the first requests don't pay for the connects. Startup returns right away, so a worker serves /healthz
+while the database is still coming up, and /readyz reports 503 until the task has succeeded. Failures are retried
+with backoff. With TASK_EVENTS_BACKEND=postgres the worker's LISTEN thread for /tasks/stream runs for the same span.
+The outbox worker starts draining once the database is prepared, unless OUTBOX_WORKER_ENABLED is off, and task
+tombstones older than TOMBSTONE_RETENTION_DAYS are pruned every TOMBSTONE_PRUNE_SECONDS.
+"""
+
+logger = logging.getLogger(__name__)
+
+RETRY_DELAY_SECONDS = 0.5
+MAX_RETRY_DELAY_SECONDS = 10.0
+
+
+class Readiness:  # Startup progress of this worker process, reported by /readyz
+    def __init__(self):
+        self.migrated = False  # Kept between lifespans so the migrations run once
+        self.ready = False
+        self.error: Optional[str] = None
+
+
+readiness = Readiness()
+
+
+def warm_pool(engine: Engine, connections: int) -> None:
+    # Opens the connections together and returns them, so they wait in the pool for requests
+    with ExitStack() as stack:
+        for _ in range(connections):
+            connection = stack.enter_context(engine.connect())
+            connection.exec_driver_sql("SELECT 1")
+
+
+async def warm_async_pool(engine: AsyncEngine, connections: int) -> None:
+    async with AsyncExitStack() as stack:
+        for _ in range(connections):
+            connection = await stack.enter_async_context(engine.connect())
+            await connection.exec_driver_sql("SELECT 1")
+
+
+def warm_connections() -> int:
+    # The pool only keeps DB_POOL_SIZE connections. Opening more would just close the rest again
+    return min(settings.DB_POOL_WARM_CONNECTIONS, settings.DB_POOL_SIZE)
+
+
+def prepare_database() -> None:
+    if settings.DB_MIGRATE_ON_STARTUP and not readiness.migrated:
+        upgrade_database(engine)
+    readiness.migrated = True
+    warm_pool(engine, warm_connections())
+
+
+async def prepare_until_ready() -> None:
+    delay = RETRY_DELAY_SECONDS
+    while True:
+        try:
+            await run_in_threadpool(prepare_database)
+            if async_engine is not None:
+                await warm_async_pool(async_engine, warm_connections())
+        # Anything, so an unreachable database is retried instead of ending startup
+        except Exception as error:
+            readiness.error = f"{type(error).__name__}: {error}"
+            logger.warning(
+                "Database not ready, retrying in %.1fs: %s", delay, readiness.error
+            )
+            await asyncio.sleep(delay)
+            delay = min(delay * 2, MAX_RETRY_DELAY_SECONDS)
+            continue
+        readiness.ready = True
+        readiness.error = None
+        return
+
+
+def prune_expired_tombstones() -> int:
+    with SessionLocal() as db:
+        return prune_tombstones(db, utcnow())
+
+
+async def prune_tombstones_periodically(ready: asyncio.Task) -> None:
+    # Every worker prunes. Their deletes don't conflict, a row deleted by one is skipped by the others
+    await asyncio.wait([ready])
+    while True:
+        try:
+            pruned = await run_in_threadpool(prune_expired_tombstones)
+            if pruned:
+                logger.info("Pruned %d task tombstones", pruned)
+        # Anything, so a database outage is retried on the next round
+        except Exception:
+            logger.warning("Pruning task tombstones failed", exc_info=True)
+        await asyncio.sleep(settings.TOMBSTONE_PRUNE_SECONDS)
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    task = asyncio.create_task(prepare_until_ready())
+    task_events.start(engine)
+    if settings.OUTBOX_WORKER_ENABLED:
+        outbox_worker.start(ready=task)
+    background = [task]
+    if settings.TOMBSTONE_PRUNE_SECONDS:
+        background.append(asyncio.create_task(prune_tombstones_periodically(task)))
+    yield
+    await outbox_worker.stop()
+    for running in background:
+        running.cancel()
+        with suppress(asyncio.CancelledError):
+            await running
+    task_events.stop()
+    readiness.ready = False
+    engine.dispose()
+    if async_engine is not None:
+        await async_engine.dispose()
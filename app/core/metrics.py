@@ -0,0 +1,275 @@
+import threading
+import time
+from bisect import bisect_left
+from typing import Dict, Sequence, Tuple, TypeVar
+
+from starlette.routing import Match
+from starlette.types import ASGIApp, Receive, Scope, Send
+
+from app.db.query_monitor import (RequestQueries, current_queries,
+                                  finish_request)
+
+"""
+Prometheus-style metrics without the client library. MetricsMiddleware labels every request with its route template
+(e.g. /tasks/{task_id:int}) rather than the raw path so ids don't create a series each. Database statements are
+counted by app.db.query_monitor into the RequestQueries that QueryMonitorMiddleware sets for the request, and
+MetricsMiddleware reads it once the response is sent.
+Every worker process keeps its own registry, so a scrape of /metrics reports the worker that answered it.
+"""
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+QUERY_COUNT_BUCKETS = (0, 1, 2, 3, 5, 10, 25, 50, 100)
+UNMATCHED_ROUTE = (
+    "unmatched"  # One label for every 404 so random paths don't add series
+)
+
+Labels = Tuple[str, ...]
+M = TypeVar("M", bound="Metric")
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _format_labels(names: Sequence[str], values: Labels, extra: str = "") -> str:
+    pairs = [f'{name}="{_escape(value)}"' for name, value in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+def _format_value(value: float) -> str:
+    return str(int(value)) if float(value).is_integer() else repr(value)
+
+
+class Metric:
+    kind = ""
+
+    def __init__(self, name: str, documentation: str, label_names: Sequence[str] = ()):
+        self.name = name
+        self.documentation = documentation
+        self.label_names = tuple(label_names)
+        self._lock = threading.Lock()
+        self._values: Dict[Labels, float] = {}
+
+    def _header(self) -> list:
+        return [
+            f"# HELP {self.name} {self.documentation}",
+            f"# TYPE {self.name} {self.kind}",
+        ]
+
+    def render(self) -> list:
+        with self._lock:
+            items = sorted(self._values.items())
+        return self._header() + [
+            f"{self.name}{_format_labels(self.label_names, labels)} {_format_value(value)}"
+            for labels, value in items
+        ]
+
+    def value(self, *labels: str) -> float:
+        return self._values.get(labels, 0)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._values.clear()
+
+
+class Counter(Metric):
+    kind = "counter"
+
+    def inc(self, *labels: str, amount: float = 1) -> None:
+        with self._lock:
+            self._values[labels] = self._values.get(labels, 0) + amount
+
+
+class Gauge(Metric):
+    kind = "gauge"
+
+    def inc(self, *labels: str, amount: float = 1) -> None:
+        with self._lock:
+            self._values[labels] = self._values.get(labels, 0) + amount
+
+    def dec(self, *labels: str, amount: float = 1) -> None:
+        self.inc(*labels, amount=-amount)
+
+
+class Histogram(Metric):
+    kind = "histogram"
+
+    def __init__(
+        self,
+        name: str,
+        documentation: str,
+        label_names: Sequence[str] = (),
+        buckets: Sequence[float] = LATENCY_BUCKETS,
+    ):
+        super().__init__(name, documentation, label_names)
+        self.buckets = tuple(buckets)
+        self._series: Dict[Labels, list] = (
+            {}
+        )  # labels -> [bucket counts..., +Inf count, sum]
+
+    def observe(self, *labels: str, value: float) -> None:
+        with self._lock:
+            series = self._series.get(labels)
+            if series is None:
+                series = self._series[labels] = [0] * (len(self.buckets) + 1) + [0.0]
+            series[bisect_left(self.buckets, value)] += 1
+            series[-1] += value
+
+    def count(self, *labels: str) -> int:
+        series = self._series.get(labels)
+        return sum(series[:-1]) if series else 0
+
+    def sum(self, *labels: str) -> float:
+        series = self._series.get(labels)
+        return series[-1] if series else 0.0
+
+    def render(self) -> list:
+        with self._lock:
+            items = sorted(
+                (labels, list(series)) for labels, series in self._series.items()
+            )
+        lines = self._header()
+        for labels, series in items:
+            cumulative = 0
+            for bound, count in zip(self.buckets + ("+Inf",), series[:-1]):
+                cumulative += count
+                le = f'le="{bound if isinstance(bound, str) else _format_value(bound)}"'
+                lines.append(
+                    f"{self.name}_bucket{_format_labels(self.label_names, labels, le)} {cumulative}"
+                )
+            label_text = _format_labels(self.label_names, labels)
+            lines.append(f"{self.name}_sum{label_text} {_format_value(series[-1])}")
+            lines.append(f"{self.name}_count{label_text} {cumulative}")
+        return lines
+
+    def clear(self) -> None:
+        with self._lock:
+            self._series.clear()
+
+
+class Registry:
+    def __init__(self):
+        self.metrics: Dict[str, Metric] = {}
+
+    def register(self, metric: M) -> M:
+        self.metrics[metric.name] = metric
+        return metric
+
+    def render(self) -> str:
+        lines = []
+        for metric in self.metrics.values():
+            lines.extend(metric.render())
+        return "\n".join(lines) + "\n"
+
+    def clear(self) -> None:
+        for metric in self.metrics.values():
+            metric.clear()
+
+
+registry = Registry()
+
+http_requests = registry.register(
+    Counter(
+        "http_requests_total",
+        "HTTP requests by route template and status code.",
+        ("method", "route", "status"),
+    )
+)
+http_request_duration = registry.register(
+    Histogram(
+        "http_request_duration_seconds",
+        "Time from receiving a request until its response is sent.",
+        ("method", "route"),
+    )
+)
+http_requests_in_progress = registry.register(
+    Gauge(
+        "http_requests_in_progress",
+        "Requests being handled right now.",
+        ("method", "route"),
+    )
+)
+db_queries_per_request = registry.register(
+    Histogram(
+        "http_request_db_queries",
+        "Database statements executed per request.",
+        ("method", "route"),
+        buckets=QUERY_COUNT_BUCKETS,
+    )
+)
+db_time_per_request = registry.register(
+    Histogram(
+        "http_request_db_seconds",
+        "Time spent executing database statements per request.",
+        ("method", "route"),
+    )
+)
+
+
+def route_template(app: ASGIApp, scope: Scope) -> str:
+    # Path template of the route that will handle the request, matched the same way the router does
+    partial = None
+    for route in getattr(app, "routes", ()):
+        match, _ = route.matches(scope)
+        if match == Match.FULL:
+            return route.path
+        if match == Match.PARTIAL and partial is None:
+            partial = route.path
+    return partial or UNMATCHED_ROUTE
+
+
+class QueryMonitorMiddleware:  # ASGI middleware giving every request the RequestQueries the query monitor counts into
+    def __init__(self, app: ASGIApp, router: ASGIApp):
+        self.app = app
+        self.router = router
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        queries = RequestQueries(scope["method"], route_template(self.router, scope))
+        token = current_queries.set(queries)
+        try:
+            await self.app(scope, receive, send)
+        finally:
+            current_queries.reset(token)
+            finish_request(queries)
+
+
+class MetricsMiddleware:  # ASGI middleware recording request counts, latency, in-flight requests and DB usage
+    def __init__(self, app: ASGIApp, router: ASGIApp):
+        self.app = app
+        self.router = router
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        method = scope["method"]
+        # Empty, without DB usage, when QueryMonitorMiddleware isn't installed around this one
+        queries = current_queries.get() or RequestQueries(
+            method, route_template(self.router, scope)
+        )
+        route = queries.route
+        status = {"code": 500}  # Reported when the app raises before sending a response
+
+        async def send_with_status(message):
+            if message["type"] == "http.response.start":
+                status["code"] = message["status"]
+            await send(message)
+
+        http_requests_in_progress.inc(method, route)
+        started = time.perf_counter()
+        try:
+            await self.app(scope, receive, send_with_status)
+        finally:
+            elapsed = time.perf_counter() - started
+            http_requests_in_progress.dec(method, route)
+            http_requests.inc(method, route, str(status["code"]))
+            http_request_duration.observe(method, route, value=elapsed)
+            db_queries_per_request.observe(method, route, value=queries.count)
+            db_time_per_request.observe(method, route, value=queries.seconds)
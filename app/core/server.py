@@ -0,0 +1,61 @@
+import multiprocessing
+import sys
+
+import uvicorn_worker  # type: ignore[import-untyped]
+
+from app.core.config import settings
+
+"""
+Production server profile, loaded by gunicorn.conf.py. Gunicorn runs SERVER_WORKERS uvicorn worker processes and
+replaces them gracefully after SERVER_MAX_REQUESTS (plus jitter) requests. uvloop and httptools are used when they are
+installed. The master never touches the database: every worker runs the migrations in its lifespan phase, where they
+are retried until the database answers and serialized with an advisory lock (see app.core.lifespan), and drops any
+connections it inherited so each process opens its own pool. The profile refuses to start several workers with
+the memory task event backend, where a stream would only see the events drained by its own worker. On PostgreSQL the
+backend defaults to 'postgres', so the defaults start one worker per core.
+"""
+
+
+class UvicornWorker(uvicorn_worker.UvicornWorker):
+    # 'on' instead of 'auto' so a failing startup stops the worker instead of being logged and ignored
+    CONFIG_KWARGS = {"loop": "auto", "http": "auto", "lifespan": "on"}
+
+
+def worker_count() -> int:
+    return settings.SERVER_WORKERS or multiprocessing.cpu_count()
+
+
+def check_task_events_backend(workers: int) -> None:
+    if workers > 1 and settings.task_events_backend == "memory":
+        raise RuntimeError(
+            f"The memory task event backend can't serve /tasks/stream from {workers} workers. "
+            "Set TASK_EVENTS_BACKEND=postgres or SERVER_WORKERS=1"
+        )
+
+
+def gunicorn_options() -> dict:
+    workers = worker_count()
+    check_task_events_backend(workers)
+    return {
+        "bind": settings.SERVER_BIND,
+        "workers": workers,
+        "worker_class": f"{__name__}.UvicornWorker",
+        "keepalive": settings.SERVER_KEEPALIVE_SECONDS,
+        "backlog": settings.SERVER_BACKLOG,
+        "max_requests": settings.SERVER_MAX_REQUESTS,
+        "max_requests_jitter": settings.SERVER_MAX_REQUESTS_JITTER,
+        "timeout": settings.SERVER_TIMEOUT_SECONDS,
+        "graceful_timeout": settings.SERVER_GRACEFUL_TIMEOUT_SECONDS,
+        "preload_app": False,  # Workers import the app themselves
+        "accesslog": "-" if settings.SERVER_ACCESS_LOG else None,
+    }
+
+
+def post_fork(server, worker) -> None:  # Gunicorn hook. Runs in every new worker
+    session = sys.modules.get("app.db.session")
+    if session is None:  # The engines haven't been created in the master
+        return
+    # close=False leaves the master's connections alone and only forgets them in this process
+    session.engine.dispose(close=False)
+    if session.async_engine is not None:
+        session.async_engine.sync_engine.dispose(close=False)
@@ -0,0 +1,214 @@
+import heapq
+from datetime import datetime, timedelta
+from typing import List, Optional, Sequence, Tuple
+
+from fastapi import HTTPException
+from sqlalchemy import (BigInteger, ColumnElement, Row, delete, literal,
+                        select, tuple_)
+from sqlalchemy.ext.compiler import compiles
+from sqlalchemy.orm import Session
+from sqlalchemy.sql.functions import FunctionElement
+
+from app.core.config import settings
+from app.crud.pagination import (decode_payload, encode_payload,
+                                 invalid_cursor, is_id, row_dicts)
+from app.models.models import Task, TaskTombstone, utcnow
+
+"""
+Incremental sync for /tasks/changes. Every write of a task stores the next value of one change sequence in
+tasks.change_seq and the writing transaction in tasks.change_xid, and every delete leaves a row in task_tombstones with
+its own values (see app.models.models). A sync token is the (change_xid, change_seq, task id) of the last change a
+client received, so a sync reads only what was written after it, through the (user_id, change_xid, change_seq, id)
+indexes, and costs the same however many tasks the user has.
+
+On Postgres writers take sequence values without waiting for each other, so a transaction can commit after another one
+that took a higher value. A reader therefore stops at its snapshot's xmin, the oldest transaction still running: every
+change of an older transaction is committed or rolled back and visible, and every later commit comes from a
+transaction at or above it, which sorts after the token. Changes of newer transactions are returned by the next sync
+once the transactions before them have finished. SQLite runs one writer at a time, stores change_xid 0 and has no
+such limit.
+
+Tasks and tombstones are read with a keyset each and merged in change order. A task written several times only shows
+up once, with its latest state.
+
+Tombstones are kept for TOMBSTONE_RETENTION_DAYS and then pruned, see prune_tombstones. A token also stores when its
+client was last caught up, the start of the last sync that ended with has_more False. Every deletion after that time
+is still stored while the token is inside the window, and older tokens get 410 so the client syncs from scratch.
+"""
+
+SYNC_COLUMNS = (
+    Task.id,
+    Task.title,
+    Task.description,
+    Task.status,
+    Task.created_at,
+    Task.updated_at,
+    Task.change_seq,
+    Task.change_xid,
+)
+
+# After = (change_xid, change_seq, task id) of the last change the client received
+After = Tuple[int, int, int]
+START: After = (0, 0, 0)
+
+
+class sync_horizon(
+    FunctionElement
+):  # Changes of this transaction id and above aren't read yet. Evaluated with the reading statement's snapshot
+    type = BigInteger()
+    inherit_cache = True
+
+
+@compiles(sync_horizon)
+def _sync_horizon(element, compiler, **kw):
+    return "1"  # SQLite: every change_xid is 0
+
+
+@compiles(sync_horizon, "postgresql")
+def _sync_horizon_postgresql(element, compiler, **kw):
+    return "pg_snapshot_xmin(pg_current_snapshot())::text::bigint"
+
+
+def sync_token_expired() -> HTTPException:
+    return HTTPException(
+        status_code=410, detail="Sync token expired, sync again without 'since'"
+    )
+
+
+def retention_start(now: datetime) -> datetime:
+    # Tombstones of deletions before it are pruned
+    return now - timedelta(days=settings.TOMBSTONE_RETENTION_DAYS)
+
+
+def encode_sync_token(after: After, user_id: int, synced_at: int) -> str:
+    # The user is stored so a token can't be used to read someone else's changes after theirs
+    return encode_payload(
+        {
+            "xid": after[0],
+            "seq": after[1],
+            "id": after[2],
+            "user": user_id,
+            "at": synced_at,
+        }
+    )
+
+
+def decode_sync_token(token: str, user_id: int) -> Tuple[After, int]:
+    # Returns the position and the caught-up time (Unix seconds). 410 once the time is outside the retention window
+    payload = decode_payload(token)
+    xid, seq, last_id = payload.get("xid"), payload.get("seq"), payload.get("id")
+    if not (is_id(xid) and is_id(seq) and is_id(last_id)):
+        raise invalid_cursor()
+    if payload.get("user") != user_id:
+        raise invalid_cursor()
+    synced_at = payload.get("at")
+    # Tokens from before the retention window was added have no 'at'
+    if not is_id(synced_at) or synced_at < retention_start(utcnow()).timestamp():
+        raise sync_token_expired()
+    return (xid, seq, last_id), synced_at
+
+
+def keyset(after: After) -> ColumnElement:
+    # Bound values of a sync token, compared as a row value like the index columns
+    return tuple_(*(literal(value) for value in after))
+
+
+def changed_tasks(user_id: int, after: After, limit: int):
+    return (
+        select(*SYNC_COLUMNS)
+        .where(
+            Task.user_id == user_id,
+            tuple_(Task.change_xid, Task.change_seq, Task.id) > keyset(after),
+            Task.change_xid < sync_horizon(),
+        )
+        .order_by(Task.change_xid, Task.change_seq, Task.id)
+        .limit(limit)
+    )
+
+
+def deleted_tasks(user_id: int, after: After, limit: int):
+    return (
+        select(
+            TaskTombstone.change_xid, TaskTombstone.change_seq, TaskTombstone.task_id
+        )
+        .where(
+            TaskTombstone.user_id == user_id,
+            tuple_(
+                TaskTombstone.change_xid,
+                TaskTombstone.change_seq,
+                TaskTombstone.task_id,
+            )
+            > keyset(after),
+            TaskTombstone.change_xid < sync_horizon(),
+        )
+        .order_by(
+            TaskTombstone.change_xid, TaskTombstone.change_seq, TaskTombstone.task_id
+        )
+        .limit(limit)
+    )
+
+
+def read_changes(
+    db: Session,
+    user_id: int,
+    after: Optional[After],
+    limit: int,
+    synced_at: Optional[int] = None,
+) -> dict:
+    """
+    Reads up to 'limit' changes of a user's tasks after a sync token.
+
+    Args:
+        db (Session): SQLAlchemy database session.
+        user_id (int): Owner of the tasks.
+        after (Optional[After]): Decoded 'since' token. None for a first sync, which skips tombstones.
+        limit (int): Maximum number of changes, tasks and deletions together.
+        synced_at (Optional[int]): Caught-up time of the token. None for a first sync.
+
+    Returns:
+        dict: 'tasks', 'deleted', 'since' and 'has_more', as in TaskChanges.
+
+    Notes:
+        - Both reads fetch one row more than 'limit', so 'has_more' is only True when another change is waiting.
+        - Tombstones and tasks never share a (change_xid, change_seq, id), a recreated id always gets a later change_seq.
+        - On Postgres a long running transaction holds back the changes of every transaction that started after it.
+        - The returned token keeps 'synced_at' while 'has_more' is True, the client hasn't caught up yet.
+    """
+    now = int(utcnow().timestamp())
+    start = after or START
+    connection = db.connection()
+    tasks = row_dicts(connection.execute(changed_tasks(user_id, start, limit + 1)))
+    deleted: Sequence[Row] = []
+    if after is not None:
+        deleted = connection.execute(deleted_tasks(user_id, start, limit + 1)).all()
+    # (change_xid, change_seq, id) -> the task's current state, or None for a deletion
+    merged: List[Tuple[After, Optional[dict]]] = list(
+        heapq.merge(
+            (
+                ((task["change_xid"], task["change_seq"], task["id"]), task)
+                for task in tasks
+            ),
+            (((xid, seq, task_id), None) for xid, seq, task_id in deleted),
+            key=lambda change: change[0],
+        )
+    )
+    page = merged[:limit]
+    return {
+        "tasks": [task for _, task in page if task is not None],
+        "deleted": [key[2] for key, task in page if task is None],
+        "since": encode_sync_token(
+            page[-1][0] if page else start,
+            user_id,
+            synced_at if synced_at is not None and len(merged) > limit else now,
+        ),
+        "has_more": len(merged) > limit,
+    }
+
+
+def prune_tombstones(db: Session, now: datetime) -> int:
+    # Deletes the tombstones outside the retention window and returns how many. Tokens that could still need them get 410
+    deleted = db.execute(
+        delete(TaskTombstone).where(TaskTombstone.deleted_at < retention_start(now))
+    ).rowcount
+    db.commit()
+    return deleted
@@ -0,0 +1,143 @@
+from typing import Hashable, Optional
+
+from sqlalchemy import Select, func, select, text
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session
+
+from app.core.cache import TTLCache
+from app.core.config import settings
+from app.schemas.schemas import TotalMode
+
+"""
+'total' values for paginated listings. Counting is a second query on every list request, and on /tasks/public it is a
+full COUNT(*) over the tasks table. Counts are cached per (user_id, filters) and dropped by the task write handlers.
+user_id None is the public feed. Other workers drop theirs when the outbox broadcasts the write (see
+app.crud.response_cache), so 'estimate' may be a moment old. 'exact' always counts.
+"""
+
+count_cache = TTLCache(
+    max_entries=settings.COUNT_CACHE_MAX_ENTRIES,
+    ttl=settings.COUNT_CACHE_TTL_SECONDS,
+)
+
+ESTIMATE_TASK_ROWS = text(
+    "SELECT reltuples::bigint FROM pg_class WHERE oid = 'tasks'::regclass"
+)
+
+
+def count_statement(stmt: Select) -> Select:  # Wraps a task select in SELECT count(*)
+    return select(func.count()).select_from(stmt.order_by(None).subquery())
+
+
+def _usable_estimate(estimate: Optional[int]) -> Optional[int]:
+    # -1 means the table was never vacuumed or analyzed
+    if estimate is None or estimate < 0:
+        return None
+    return int(estimate)
+
+
+def estimate_table_rows(db: Session) -> Optional[int]:
+    # Reads the planner's row estimate for the tasks table. Only Postgres keeps one; None when it isn't available
+    if db.get_bind().dialect.name != "postgresql":
+        return None
+    return _usable_estimate(db.execute(ESTIMATE_TASK_ROWS).scalar())
+
+
+async def estimate_table_rows_async(db: AsyncSession) -> Optional[int]:
+    if db.get_bind().dialect.name != "postgresql":
+        return None
+    return _usable_estimate((await db.execute(ESTIMATE_TASK_ROWS)).scalar())
+
+
+def _count_key(user_id: Optional[int], filters: Optional[Hashable]) -> Hashable:
+    # invalidate_task_counts matches the owner in key[0]
+    return (user_id, filters)
+
+
+def _known_total(
+    key: Hashable, mode: TotalMode, counted: Optional[int]
+) -> Optional[int]:
+    # The total without counting: the caller's exact count or a cached estimate. None when it has to be counted
+    if counted is not None:
+        return _remember(key, counted)
+    if mode == TotalMode.estimate:
+        return count_cache.get(key)
+    return None
+
+
+def _uses_table_estimate(mode: TotalMode, key: Hashable) -> bool:
+    # Only the unfiltered public feed is estimated from table statistics
+    return mode == TotalMode.estimate and key == _count_key(None, None)
+
+
+def _remember(key: Hashable, total: int) -> int:
+    count_cache.set(key, total)
+    return total
+
+
+def count_tasks(
+    db: Session,
+    stmt: Select,
+    mode: TotalMode,
+    user_id: Optional[int] = None,
+    filters: Optional[Hashable] = None,
+    counted: Optional[int] = None,
+) -> Optional[int]:
+    """
+    Returns the 'total' for a task listing.
+
+    Args:
+        db (Session): SQLAlchemy database session.
+        stmt (Select): Filtered task statement the listing pages through.
+        mode (TotalMode): 'exact' counts, 'estimate' may use a cached or approximate value, 'none' skips counting.
+        user_id (Optional[int]): Owner the listing is scoped to. None for listings of all users.
+        filters (Optional[Hashable]): Filters of the listing other than the owner, e.g. TaskListQuery.filters. None when unfiltered.
+        counted (Optional[int]): Exact count the caller already has, e.g. from the listing ETag query.
+
+    Returns:
+        Optional[int]: Number of matching tasks, or None when mode is 'none'.
+
+    Notes:
+        - 'estimate' on the unfiltered public feed uses Postgres reltuples statistics.
+        - Every other 'estimate' is counted once and served from the cache until it expires or a write drops it.
+    """
+    if mode == TotalMode.none:
+        return None
+    key = _count_key(user_id, filters)
+    known = _known_total(key, mode, counted)
+    if known is not None:
+        return known
+    if _uses_table_estimate(mode, key):
+        estimate = estimate_table_rows(db)
+        if estimate is not None:
+            return _remember(key, estimate)
+    return _remember(key, db.scalar(count_statement(stmt)))
+
+
+async def count_tasks_async(
+    db: AsyncSession,
+    stmt: Select,
+    mode: TotalMode,
+    user_id: Optional[int] = None,
+    filters: Optional[Hashable] = None,
+    counted: Optional[int] = None,
+) -> Optional[int]:
+    # Async version of count_tasks. Only the statements are awaited, the cache handling is shared
+    if mode == TotalMode.none:
+        return None
+    key = _count_key(user_id, filters)
+    known = _known_total(key, mode, counted)
+    if known is not None:
+        return known
+    if _uses_table_estimate(mode, key):
+        estimate = await estimate_table_rows_async(db)
+        if estimate is not None:
+            return _remember(key, estimate)
+    return _remember(key, await db.scalar(count_statement(stmt)))
+
+
+def invalidate_task_counts(user_id: int) -> None:
+    # A write changes the counts of its owner and of the public feed for every filter
+    count_cache.delete_where(
+        lambda key: isinstance(key, tuple) and key[0] in (user_id, None)
+    )
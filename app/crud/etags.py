@@ -0,0 +1,78 @@
+import hashlib
+import re
+from typing import List, Optional
+
+from fastapi import HTTPException, Response
+from sqlalchemy import Select, func
+
+from app.models.models import Task
+
+"""
+ETags for conditional requests. A single task has a strong ETag built from its id and version, so a client can send it
+back in If-None-Match (GET, 304 when unchanged) or If-Match (PUT, 412 when someone else changed the task first).
+A listing has a weak ETag built from the count, highest id, sum of versions and highest change_seq of every task
+matching its filter plus the query parameters. Any create, update or delete in the filter changes one of them. The
+change_seq covers SQLite handing the id of a deleted newest task to the next one, which leaves the other three as
+they were.
+"""
+
+TASK_ETAG = re.compile(r'"(\d+)-(\d+)"')
+
+
+def task_etag(task_id: int, version: int) -> str:
+    return f'"{task_id}-{version}"'
+
+
+def _etag_values(header: str) -> List[str]:
+    return [value.strip() for value in header.split(",") if value.strip()]
+
+
+def is_not_modified(if_none_match: Optional[str], etag: str) -> bool:
+    # If-None-Match uses weak comparison, so W/ prefixes are ignored on both sides
+    if if_none_match is None:
+        return False
+    values = [value.removeprefix("W/") for value in _etag_values(if_none_match)]
+    return "*" in values or etag.removeprefix("W/") in values
+
+
+def not_modified(etag: str) -> Response:
+    return Response(status_code=304, headers={"ETag": etag})
+
+
+def expected_versions(if_match: Optional[str], task_id: int) -> Optional[List[int]]:
+    # Versions of 'task_id' listed in If-Match. None means no condition. An empty list can never match
+    if if_match is None:
+        return None
+    values = _etag_values(if_match)
+    if "*" in values:
+        return None
+    versions = []
+    # If-Match uses strong comparison. Weak ETags never match
+    for value in values:
+        match = TASK_ETAG.fullmatch(value)
+        if match and int(match[1]) == task_id:
+            versions.append(int(match[2]))
+    return versions
+
+
+def precondition_failed() -> HTTPException:
+    return HTTPException(status_code=412, detail="Task was modified by another request")
+
+
+def listing_state(stmt: Select) -> Select:
+    # SELECT count, max(id), sum(version) and max(change_seq) with the filters of a task listing
+    return stmt.order_by(None).with_only_columns(
+        func.count(Task.id),
+        func.max(Task.id),
+        func.coalesce(func.sum(Task.version), 0),
+        func.max(Task.change_seq),
+    )
+
+
+def listing_etag(state, *params) -> str:
+    # Weak ETag from the result of 'listing_state' and the parameters that shape the page
+    # A change detector, not a security boundary
+    digest = hashlib.sha1(
+        repr((tuple(state), params)).encode(), usedforsecurity=False
+    ).hexdigest()
+    return f'W/"{digest[:20]}"'
@@ -0,0 +1,249 @@
+import asyncio
+import json
+import logging
+import select
+import threading
+from contextlib import contextmanager
+from typing import (Callable, Dict, Iterator, List, Optional, Sequence, Set,
+                    Union)
+
+from sqlalchemy import text
+from sqlalchemy.engine import Engine
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session
+
+from app.core.config import settings
+from app.crud.outbox import enqueue, outbox_handler
+from app.schemas.schemas import TaskOut
+
+"""
+Task change events for /tasks/stream. Write handlers enqueue an event per created, updated, completed or deleted task
+in the outbox (app.crud.outbox), and the outbox worker publishes them to the owner's channel and to the public channel
+after the commit. Every open stream reads the events of one channel from its own queue. The queues are bounded: a
+client that reads slower than events arrive is sent 'reset' and disconnected instead of buffering without limit, and
+reconnects and refetches. STREAM_MAX_CONNECTIONS bounds the streams per worker. Listeners added with
+add_listener get the events of a channel without a stream, e.g. the cache invalidation of app.crud.response_cache.
+
+With TASK_EVENTS_BACKEND=memory, the default without PostgreSQL, events only reach streams of the worker process that
+drained them, so it suits a single process. With 'postgres', the default on PostgreSQL, they are sent with NOTIFY and every worker LISTENs on a dedicated connection, so streams see
+the writes of all workers. The outbox publishes at least once and a stream may miss events while it reconnects, so
+clients treat the stream as a hint and resync with /tasks/changes after a reconnect.
+"""
+
+logger = logging.getLogger(__name__)
+
+PUBLIC_CHANNEL = "public"
+NOTIFY_CHANNEL = "task_events"
+TASK_EVENTS_TOPIC = "task_events"  # Outbox topic
+# Postgres rejects larger NOTIFY payloads. Bigger events are sent without the task, clients fetch it by id
+NOTIFY_MAX_BYTES = 7900
+LISTEN_POLL_SECONDS = 1.0
+LISTEN_RETRY_SECONDS = 5.0
+
+
+def user_channel(user_id: int) -> str:
+    return f"user:{user_id}"
+
+
+def task_event(kind: str, task_id: int, task=None) -> dict:
+    # 'task' is an ORM object, a Row mapping or None for deletions
+    event = {"type": kind, "id": task_id}
+    if task is not None:
+        event["task"] = TaskOut.model_validate(task).model_dump(mode="json")
+    return event
+
+
+def write_event(kind: str, task) -> dict:
+    # Event for a task that was just written. 'task' is an ORM object or a Row of TASK_COLUMNS
+    return task_event(kind, task.id, task)
+
+
+class Subscription:  # Bounded queue of events for one open stream
+    def __init__(self, channel: str, max_events: int):
+        self.channel = channel
+        self.loop = asyncio.get_running_loop()
+        self.queue: asyncio.Queue = asyncio.Queue(maxsize=max_events)
+        self.overflowed = False
+
+    def push(self, event: dict) -> None:  # Runs on the stream's event loop
+        if self.overflowed:
+            return
+        try:
+            self.queue.put_nowait(event)
+        except asyncio.QueueFull:
+            self.overflowed = True
+
+    async def next(self, timeout: float) -> Optional[dict]:
+        # Returns the next event, or None when nothing arrived within 'timeout'
+        try:
+            return await asyncio.wait_for(self.queue.get(), timeout)
+        except asyncio.TimeoutError:
+            return None
+
+
+class PostgresBroker:  # Sends events between workers with NOTIFY and a LISTEN thread
+    def __init__(self, engine: Engine, bus: "EventBus"):
+        self.engine = engine
+        self.bus = bus
+        self._stopped = threading.Event()
+        self.listening = threading.Event()  # Set while the LISTEN connection is open
+        self._thread: Optional[threading.Thread] = None
+
+    def publish(self, channels: Sequence[str], events: List[dict]) -> None:
+        payloads = []
+        for event in events:
+            payload = json.dumps({"channels": channels, "event": event})
+            if len(payload.encode()) > NOTIFY_MAX_BYTES:
+                event = {key: value for key, value in event.items() if key != "task"}
+                payload = json.dumps({"channels": channels, "event": event})
+            payloads.append({"channel": NOTIFY_CHANNEL, "payload": payload})
+        with self.engine.connect() as connection:
+            connection.execute(text("SELECT pg_notify(:channel, :payload)"), payloads)
+            connection.commit()
+
+    def start(self) -> None:
+        self._stopped.clear()
+        self._thread = threading.Thread(
+            target=self._listen, name="task-events-listener", daemon=True
+        )
+        self._thread.start()
+
+    def stop(self) -> None:
+        self._stopped.set()
+        if self._thread is not None:
+            self._thread.join(timeout=LISTEN_POLL_SECONDS * 2)
+
+    def _listen(self) -> None:
+        # Reconnects after errors until stop() is called
+        while not self._stopped.is_set():
+            connection = None
+            try:
+                connection = self.engine.raw_connection()
+                # Read before detaching, which drops the pool record that driver_connection comes from
+                driver = connection.driver_connection
+                if driver is None:
+                    raise RuntimeError("Listener connection has no driver connection")
+                # Detached so the pool never hands out a connection that is LISTENing
+                connection.detach()
+                driver.autocommit = True
+                with driver.cursor() as cursor:
+                    cursor.execute(f"LISTEN {NOTIFY_CHANNEL}")
+                self.listening.set()
+                while not self._stopped.is_set():
+                    if not select.select([driver], [], [], LISTEN_POLL_SECONDS)[0]:
+                        continue
+                    driver.poll()
+                    while driver.notifies:
+                        message = json.loads(driver.notifies.pop(0).payload)
+                        self.bus.deliver(message["channels"], [message["event"]])
+            # Anything, so a lost connection is retried instead of ending the thread
+            except Exception:
+                logger.warning("Task event listener failed, retrying", exc_info=True)
+                self._stopped.wait(LISTEN_RETRY_SECONDS)
+            finally:
+                self.listening.clear()
+                if connection is not None:
+                    connection.close()
+
+
+class EventBus:  # Channels of open streams in this worker
+    def __init__(self, max_subscriptions: int, max_events: int):
+        self.max_subscriptions = max_subscriptions
+        self.max_events = max_events
+        self.broker: Optional[PostgresBroker] = None
+        self._channels: Dict[str, Set[Subscription]] = {}
+        self._listeners: Dict[str, List[Callable[[dict], None]]] = {}
+        self._count = 0
+        self._lock = threading.Lock()
+
+    @property
+    def full(self) -> bool:
+        return self._count >= self.max_subscriptions
+
+    @contextmanager
+    def subscribe(self, channel: str) -> Iterator[Subscription]:
+        # Must be entered on the event loop that reads the subscription
+        subscription = Subscription(channel, self.max_events)
+        with self._lock:
+            self._channels.setdefault(channel, set()).add(subscription)
+            self._count += 1
+        try:
+            yield subscription
+        finally:
+            with self._lock:
+                subscriptions = self._channels[channel]
+                subscriptions.discard(subscription)
+                if not subscriptions:
+                    del self._channels[channel]
+                self._count -= 1
+
+    def add_listener(self, channel: str, listener: Callable[[dict], None]) -> None:
+        # Calls 'listener' with every event of 'channel' that reaches this worker, on the delivering thread
+        self._listeners.setdefault(channel, []).append(listener)
+
+    def deliver(self, channels: Sequence[str], events: List[dict]) -> None:
+        # Hands events to the listeners and streams of this worker. Safe to call from any thread
+        for channel in channels:
+            for listener in self._listeners.get(channel, ()):
+                for event in events:
+                    try:
+                        listener(event)
+                    # Anything, so one failing listener doesn't end the LISTEN thread or hold back the streams
+                    except Exception:
+                        logger.warning(
+                            "Task event listener of %s failed", channel, exc_info=True
+                        )
+        with self._lock:
+            subscriptions = [
+                subscription
+                for channel in channels
+                for subscription in self._channels.get(channel, ())
+            ]
+        for subscription in subscriptions:
+            for event in events:
+                try:
+                    subscription.loop.call_soon_threadsafe(subscription.push, event)
+                except RuntimeError:  # The stream's loop is closed
+                    break
+
+    def publish(self, channels: Sequence[str], events: List[dict]) -> None:
+        if not events:
+            return
+        # Broker errors are raised, so the outbox retries the message
+        if self.broker is None:
+            self.deliver(channels, events)
+        else:
+            self.broker.publish(channels, events)
+
+    def start(self, engine: Engine) -> None:
+        if settings.task_events_backend == "postgres":
+            self.broker = PostgresBroker(engine, self)
+            self.broker.start()
+
+    def stop(self) -> None:
+        if self.broker is not None:
+            self.broker.stop()
+            self.broker = None
+
+
+task_events = EventBus(
+    max_subscriptions=settings.STREAM_MAX_CONNECTIONS,
+    max_events=settings.STREAM_QUEUE_SIZE,
+)
+
+
+def publish_task_events(user_id: int, events: List[dict]) -> None:
+    task_events.publish([user_channel(user_id), PUBLIC_CHANNEL], events)
+
+
+@outbox_handler(TASK_EVENTS_TOPIC)
+def _publish_enqueued_events(payload: dict) -> None:
+    publish_task_events(payload["user_id"], payload["events"])
+
+
+def enqueue_task_events(
+    db: Union[Session, AsyncSession], user_id: int, events: List[dict]
+) -> None:
+    # Called by the write handlers before their commit. Sync and async sessions alike, adding doesn't block
+    if events:
+        enqueue(db, TASK_EVENTS_TOPIC, {"user_id": user_id, "events": events})
@@ -0,0 +1,72 @@
+from typing import Any, Dict, List, Optional, Tuple
+
+from fastapi import HTTPException
+from sqlalchemy import Select, Update, delete, select, update
+from sqlalchemy.sql.dml import ReturningDelete
+
+from app.crud.etags import precondition_failed
+from app.models.models import Task
+
+"""
+Single-statement writes for one task. The owner check is part of the WHERE clause and the new row comes back with
+RETURNING, so an update or delete is one round trip instead of SELECT, UPDATE and refresh. When nothing matched,
+'owner_of' is run once to tell a missing task (404) from one owned by another user (403) or one whose version didn't
+match If-Match (412).
+"""
+
+TASK_COLUMNS = (Task.id, Task.title, Task.description, Task.status, Task.version)
+
+
+def _owned(task_id: int, user_id: int, versions: Optional[List[int]]) -> list:
+    criteria = [Task.id == task_id, Task.user_id == user_id]
+    if versions is not None:
+        criteria.append(Task.version.in_(versions))
+    return criteria
+
+
+def update_owned_task(
+    task_id: int,
+    user_id: int,
+    values: Dict[str, Any],
+    versions: Optional[List[int]] = None,
+) -> Update:
+    # UPDATE ... WHERE id AND user_id [AND version IN If-Match] RETURNING the TaskOut columns and the new version
+    return (
+        update(Task)
+        .where(*_owned(task_id, user_id, versions))
+        .values({**values, "version": Task.version + 1})
+        .returning(*TASK_COLUMNS)
+        .execution_options(synchronize_session=False)
+    )
+
+
+def select_owned_task(
+    task_id: int, user_id: int, versions: Optional[List[int]] = None
+) -> Select:
+    # Used instead of update_owned_task when an update sets no fields
+    return select(*TASK_COLUMNS).where(*_owned(task_id, user_id, versions))
+
+
+def delete_owned_task(task_id: int, user_id: int) -> ReturningDelete[Tuple[int]]:
+    return (
+        delete(Task)
+        .where(Task.id == task_id, Task.user_id == user_id)
+        .returning(Task.id)
+        .execution_options(synchronize_session=False)
+    )
+
+
+def owner_of(task_id: int) -> Select:
+    return select(Task.user_id).where(Task.id == task_id)
+
+
+def write_error(owner_id: Optional[int], user_id: int) -> HTTPException:
+    # Error for a write that matched no row. owner_id is the result of 'owner_of'
+    if owner_id is None:
+        return HTTPException(status_code=404, detail="Task not found")
+    if owner_id != user_id:
+        return HTTPException(
+            status_code=403, detail="Not authorized to access this task"
+        )
+    # The task exists and is owned by the user, so only the If-Match version can have failed
+    return precondition_failed()
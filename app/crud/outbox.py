@@ -0,0 +1,237 @@
+import asyncio
+import logging
+from contextlib import suppress
+from datetime import datetime, timedelta
+from typing import Awaitable, Callable, Dict, List, Optional, Union
+
+from sqlalchemy import Update, bindparam, delete, event, func, select, update
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session, sessionmaker
+from starlette.concurrency import run_in_threadpool
+
+from app.core.config import settings
+from app.db.session import SessionLocal
+from app.models.models import OutboxMessage, utcnow
+
+"""
+Transactional outbox for the side effects of task writes. A write handler adds its messages to the session with
+'enqueue' before it commits, so a message is stored exactly when the write is: a rolled back write leaves none and a
+committed one can't lose its message when the worker dies before the side effect ran. The request only pays for one
+INSERT in a transaction it runs anyway, however many consumers a topic grows.
+
+Every worker process runs an OutboxWorker on its event loop. It drains the table in batches of OUTBOX_BATCH_SIZE:
+one UPDATE ... RETURNING claims the oldest due messages for OUTBOX_LEASE_SECONDS (with FOR UPDATE SKIP LOCKED on
+Postgres, so workers claim disjoint batches), the handlers of their topics run in the threadpool, and one statement
+each deletes the finished messages and reschedules the failed ones with exponential backoff. After
+OUTBOX_MAX_ATTEMPTS a message is kept with failed_at set and no longer claimed. A commit that enqueued messages wakes
+the worker of its own process right away; other processes find them within OUTBOX_POLL_SECONDS.
+
+Delivery is at least once. A worker that dies between running a handler and recording it leaves the message to be
+claimed again when the lease runs out, so handlers must be idempotent. Messages of one batch run in id order, but
+batches of different workers can overlap.
+"""
+
+logger = logging.getLogger(__name__)
+
+MAX_RETRY_DELAY_SECONDS = 300.0
+# Session.info key set by 'enqueue'. The commit that stores the messages wakes the worker
+PENDING_KEY = "outbox_pending"
+
+Handler = Callable[[dict], None]
+handlers: Dict[str, Handler] = {}
+
+
+def outbox_handler(topic: str) -> Callable[[Handler], Handler]:
+    # Registers the function that runs the messages of 'topic'. It receives the payload and must be idempotent
+    def register(handler: Handler) -> Handler:
+        handlers[topic] = handler
+        return handler
+
+    return register
+
+
+def enqueue(db: Union[Session, AsyncSession], topic: str, payload: dict) -> None:
+    # Adds a message to the write's transaction. 'payload' has to be JSON serializable
+    db.add(OutboxMessage(topic=topic, payload=payload))
+    db.info[PENDING_KEY] = True
+
+
+@event.listens_for(Session, "after_commit")
+def _wake_after_commit(session: Session) -> None:
+    if session.info.pop(PENDING_KEY, False):
+        outbox_worker.wake()
+
+
+@event.listens_for(Session, "after_soft_rollback")
+def _forget_after_rollback(session: Session, previous_transaction) -> None:
+    session.info.pop(PENDING_KEY, None)
+
+
+def claim_batch(now: datetime, limit: int) -> Update:
+    # Leases the oldest due messages and counts the attempt. Returns them for the handlers
+    due = (
+        select(OutboxMessage.id)
+        .where(OutboxMessage.available_at <= now)
+        .order_by(OutboxMessage.available_at, OutboxMessage.id)
+        .limit(limit)
+        .with_for_update(skip_locked=True)
+    )
+    return (
+        update(OutboxMessage)
+        .where(OutboxMessage.id.in_(due.scalar_subquery()))
+        .values(
+            attempts=OutboxMessage.attempts + 1,
+            available_at=now + timedelta(seconds=settings.OUTBOX_LEASE_SECONDS),
+        )
+        .returning(
+            OutboxMessage.id,
+            OutboxMessage.topic,
+            OutboxMessage.payload,
+            OutboxMessage.attempts,
+        )
+        .execution_options(synchronize_session=False)
+    )
+
+
+def retry_delay(attempts: int) -> float:
+    return min(
+        settings.OUTBOX_RETRY_SECONDS * 2 ** (attempts - 1), MAX_RETRY_DELAY_SECONDS
+    )
+
+
+def failure(message, error: Exception, now: datetime) -> dict:
+    # Parameters of 'record_failures' for one message whose handler raised 'error'
+    exhausted = message.attempts >= settings.OUTBOX_MAX_ATTEMPTS
+    return {
+        "b_id": message.id,
+        "b_available_at": (
+            None
+            if exhausted
+            else now + timedelta(seconds=retry_delay(message.attempts))
+        ),
+        "b_failed_at": now if exhausted else None,
+        "b_last_error": f"{type(error).__name__}: {error}",
+    }
+
+
+def record_failures() -> Update:
+    # executemany UPDATE for the parameters built by 'failure'
+    return (
+        update(OutboxMessage.__table__)
+        .where(OutboxMessage.id == bindparam("b_id"))
+        .values(
+            available_at=bindparam("b_available_at"),
+            failed_at=bindparam("b_failed_at"),
+            last_error=bindparam("b_last_error"),
+        )
+    )
+
+
+def drain_batch(db: Session) -> int:
+    """
+    Claims one batch of due messages, runs their handlers and records the outcome.
+
+    Args:
+        db (Session): SQLAlchemy database session. Committed twice: after the claim and after the outcome.
+
+    Returns:
+        int: Number of messages claimed. Less than OUTBOX_BATCH_SIZE when the outbox has no more due messages.
+
+    Notes:
+        - The claim is committed before any handler runs, so no transaction or row lock is held while they work.
+        - A message without a handler for its topic fails like one whose handler raised.
+    """
+    now = utcnow()
+    messages = sorted(
+        db.execute(claim_batch(now, settings.OUTBOX_BATCH_SIZE)).all(),
+        key=lambda message: message.id,
+    )
+    db.commit()
+    done: List[int] = []
+    failed: List[dict] = []
+    for message in messages:
+        try:
+            handlers[message.topic](message.payload)
+        # Anything, so one broken message is retried without stopping the batch
+        except Exception as error:
+            logger.warning(
+                "Outbox message %s (%s) failed, attempt %s",
+                message.id,
+                message.topic,
+                message.attempts,
+                exc_info=True,
+            )
+            failed.append(failure(message, error, utcnow()))
+        else:
+            done.append(message.id)
+    if done:
+        db.execute(delete(OutboxMessage).where(OutboxMessage.id.in_(done)))
+    if failed:
+        db.execute(record_failures(), failed)
+    db.commit()
+    return len(messages)
+
+
+class OutboxWorker:  # Drains the outbox from the event loop of one worker process
+    def __init__(self, session_factory: sessionmaker):
+        self.session_factory = session_factory
+        self.batches = 0
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._wakeup: Optional[asyncio.Event] = None
+        self._task: Optional[asyncio.Task] = None
+
+    def start(self, ready: Awaitable) -> None:
+        # Starts draining once 'ready' is done, i.e. the migrations have created the table
+        self._loop = asyncio.get_running_loop()
+        self._wakeup = wakeup = asyncio.Event()
+        self._task = asyncio.create_task(self._run(ready, wakeup))
+
+    async def stop(self) -> None:
+        # Waits for a batch that is running, its handlers can't be interrupted
+        if self._task is not None:
+            self._task.cancel()
+            with suppress(asyncio.CancelledError):
+                await self._task
+        self._task = self._loop = self._wakeup = None
+
+    def wake(self) -> None:
+        # Safe to call from any thread. Does nothing while the worker isn't running
+        loop, wakeup = self._loop, self._wakeup
+        if loop is None or wakeup is None:
+            return
+        with suppress(RuntimeError):  # The loop is closed
+            loop.call_soon_threadsafe(wakeup.set)
+
+    def drain(self) -> int:
+        with self.session_factory() as db:
+            return drain_batch(db)
+
+    async def _run(self, ready: Awaitable, wakeup: asyncio.Event) -> None:
+        # asyncio.wait, unlike await, doesn't cancel 'ready' when the worker is stopped first
+        await asyncio.wait([asyncio.ensure_future(ready)])
+        while True:
+            wakeup.clear()  # Before the batch, so a commit during it isn't missed
+            try:
+                claimed = await run_in_threadpool(self.drain)
+                self.batches += 1
+            # Anything, so a database outage is retried instead of ending the worker
+            except Exception:
+                logger.warning("Draining the outbox failed", exc_info=True)
+                claimed = 0
+            if claimed < settings.OUTBOX_BATCH_SIZE:
+                with suppress(asyncio.TimeoutError):
+                    await asyncio.wait_for(wakeup.wait(), settings.OUTBOX_POLL_SECONDS)
+
+
+outbox_worker = OutboxWorker(SessionLocal)
+
+
+def outbox_stats(db: Session) -> dict:
+    # Backlog of every worker and the batches drained by this one
+    pending, failed = db.execute(
+        select(
+            func.count(OutboxMessage.id).filter(OutboxMessage.failed_at.is_(None)),
+            func.count(OutboxMessage.failed_at),
+        )
+    ).one()
+    return {"pending": pending, "failed": failed, "batches": outbox_worker.batches}
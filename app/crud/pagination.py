@@ -0,0 +1,87 @@
+import base64
+import binascii
+import json
+from typing import List, Optional, Sequence, Tuple, TypeGuard
+
+from fastapi import HTTPException
+from sqlalchemy import ColumnElement, Result, Select, literal, tuple_
+
+"""
+Keyset (cursor) pagination for task listings. Offset pagination makes the database walk and throw away 'skip' rows,
+so deep pages get slower the further a client goes. A cursor remembers the sort key of the last row that was returned
+and the next page starts with 'WHERE (key, id) > (:last_key, :last_id)', which costs the same on every page. What goes
+into a cursor is decided by the caller, see app.crud.query_builder.
+"""
+
+
+def invalid_cursor() -> HTTPException:
+    return HTTPException(status_code=400, detail="Invalid cursor")
+
+
+def encode_payload(payload: dict) -> str:
+    # Cursors are opaque to clients: URL-safe base64 of compact JSON
+    raw = json.dumps(payload, separators=(",", ":")).encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip("=")
+
+
+def decode_payload(cursor: str) -> dict:
+    # Inverse of encode_payload. Raises 400 for anything that isn't an encoded JSON object
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        payload = json.loads(base64.urlsafe_b64decode(padded.encode()))
+    except (binascii.Error, ValueError, TypeError):
+        raise invalid_cursor()
+    if not isinstance(payload, dict):
+        raise invalid_cursor()
+    return payload
+
+
+def is_id(value) -> TypeGuard[int]:
+    return isinstance(value, int) and not isinstance(value, bool)
+
+
+def paginate(
+    stmt: Select,
+    keys: Sequence[ColumnElement],
+    descending: bool,
+    skip: int,
+    limit: int,
+    after: Optional[Sequence] = None,
+) -> Tuple[Select, int]:
+    """
+    Orders an already filtered task statement by its keyset and limits it to one page.
+
+    Args:
+        stmt (Select): Task select statement with all filters applied.
+        keys (Sequence[ColumnElement]): Columns the rows are ordered by. The last one has to be unique, i.e. Task.id.
+        descending (bool): Order every key descending instead of ascending.
+        skip (int): Number of tasks to skip. Ignored when 'after' is given.
+        limit (int): Maximum number of tasks to return.
+        after (Optional[Sequence]): Values of 'keys' in the last row of the previous page, decoded from its cursor.
+
+    Returns:
+        tuple: The statement for the page and the skip that was applied.
+
+    Notes:
+        - Ordering always ends with a unique key so both pagination modes are stable.
+        - Several keys are compared as a row value, (created_at, id) > (:created_at, :id), which an index on the same
+          columns answers with one range scan.
+        - Returns a statement so sync and async sessions can both execute it.
+    """
+    stmt = stmt.order_by(*(key.desc() if descending else key for key in keys))
+    if after is None:
+        return stmt.offset(skip).limit(limit), skip
+    bound = [literal(value, key.type) for key, value in zip(keys, after)]
+    row: ColumnElement
+    last: ColumnElement
+    if len(keys) == 1:
+        row, last = keys[0], bound[0]
+    else:
+        row, last = tuple_(*keys), tuple_(*bound)
+    return stmt.where(row < last if descending else row > last).limit(limit), 0
+
+
+def row_dicts(result: Result) -> List[dict]:
+    # Plain dicts are validated by TaskOut much faster than Task objects or Rows read through from_attributes
+    keys = list(result.keys())
+    return [dict(zip(keys, row)) for row in result]
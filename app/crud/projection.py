@@ -0,0 +1,41 @@
+from typing import Optional, Tuple
+
+from fastapi import HTTPException
+from sqlalchemy import Column
+
+from app.models.models import Task
+
+"""
+Column projection for task listings. 'fields=id,title' reads only those columns, so large descriptions aren't read
+from the database or sent to the client when a page doesn't show them. 'id' is always selected because cursors are
+built from it.
+"""
+
+PROJECTED_COLUMNS: Tuple[Column, ...] = (
+    Task.id,
+    Task.title,
+    Task.description,
+    Task.status,
+    Task.created_at,
+    Task.updated_at,
+)
+TASK_FIELDS = {column.key: column for column in PROJECTED_COLUMNS}
+DEFAULT_FIELDS = ("id", "title", "description", "status")  # The fields of TaskOut
+
+
+def parse_fields(fields: Optional[str]) -> Tuple[str, ...]:
+    # Returns the requested field names in TASK_FIELDS order. The fields of TaskOut when 'fields' isn't given
+    if fields is None:
+        return DEFAULT_FIELDS
+    requested = {name.strip() for name in fields.split(",") if name.strip()}
+    unknown = requested - TASK_FIELDS.keys()
+    if unknown:
+        raise HTTPException(
+            status_code=400,
+            detail=f"Unknown fields: {', '.join(sorted(unknown))}. Allowed: {', '.join(TASK_FIELDS)}",
+        )
+    return tuple(name for name in TASK_FIELDS if name in requested or name == "id")
+
+
+def field_columns(names: Tuple[str, ...]) -> tuple:
+    return tuple(TASK_FIELDS[name] for name in names)
@@ -0,0 +1,197 @@
+from dataclasses import dataclass
+from datetime import datetime, timezone
+from typing import List, Optional, Sequence, Tuple
+
+from fastapi import HTTPException, Query
+from sqlalchemy import Select, select
+
+from app.crud.pagination import (decode_payload, encode_payload,
+                                 invalid_cursor, is_id, paginate)
+from app.crud.projection import DEFAULT_FIELDS, field_columns, parse_fields
+from app.models.models import Task, TaskStatus
+from app.schemas.schemas import TaskSort, TotalMode
+
+"""
+Statements for the task listings. Every list endpoint reads its parameters into a TaskListQuery and builds the same
+statement from it. Only combinations an index answers in sort order are accepted, so no request makes the database
+scan and sort the whole table:
+
+    sort=id, -id                  ix_tasks_user_id_id, ix_tasks_user_id_status_id, ix_tasks_status_id, primary key
+    sort=created_at, -created_at  ix_tasks_user_id_created_at_id, ix_tasks_created_at_id. created_after is its range
+    sort=updated_at, -updated_at  ix_tasks_user_id_updated_at_id, ix_tasks_updated_at_id. updated_after is its range
+
+created_after and updated_after are only allowed with the sort on the same column; anywhere else they would be a filter
+on rows read in another order. Any number of statuses can be given, they are checked on the rows the index returns.
+Ties are broken by id in the direction of the sort, so cursors continue after (sort value, id) of the last row.
+"""
+
+SORT_COLUMNS = {
+    "id": Task.id,
+    "created_at": Task.created_at,
+    "updated_at": Task.updated_at,
+}
+
+
+@dataclass(frozen=True)
+class TaskListQuery:  # Parameters of one listing page. Hashable, so it doubles as the public feed cache key
+    statuses: Tuple[TaskStatus, ...] = ()
+    sort: TaskSort = TaskSort.id
+    created_after: Optional[datetime] = None
+    updated_after: Optional[datetime] = None
+    skip: int = 0
+    limit: int = 10
+    cursor: Optional[str] = None
+    total: TotalMode = TotalMode.exact
+    fields: Tuple[str, ...] = DEFAULT_FIELDS
+    user_id: Optional[int] = None  # None lists the tasks of every user
+
+    @property
+    def sort_field(self) -> str:
+        return self.sort.value.lstrip("-")
+
+    @property
+    def descending(self) -> bool:
+        return self.sort.value.startswith("-")
+
+    @property
+    def filters(self) -> Optional[tuple]:
+        # Filters other than the owner, as a key for count_cache. None when the listing isn't filtered
+        filters = (self.statuses, self.created_after, self.updated_after)
+        return None if filters == ((), None, None) else filters
+
+
+def as_utc(value: Optional[datetime]) -> Optional[datetime]:
+    # Timestamps are stored in UTC. Values without an offset are taken as UTC
+    if value is None:
+        return None
+    if value.tzinfo is None:
+        return value.replace(tzinfo=timezone.utc)
+    return value.astimezone(timezone.utc)
+
+
+def task_list_query(  # Dependency of the list endpoints. Reads and validates the listing parameters
+    status: Optional[List[TaskStatus]] = Query(
+        None, description="Tasks with any of these statuses. Repeat to give several"
+    ),
+    sort: TaskSort = Query(TaskSort.id, description="Sort field. '-' sorts descending"),
+    created_after: Optional[datetime] = Query(
+        None,
+        description="Tasks created after this time. Needs sort=created_at or -created_at",
+    ),
+    updated_after: Optional[datetime] = Query(
+        None,
+        description="Tasks updated after this time. Needs sort=updated_at or -updated_at",
+    ),
+    skip: int = Query(0, ge=0),
+    limit: int = Query(10, ge=1),
+    cursor: Optional[str] = Query(None, description="next_cursor of the previous page"),
+    total: TotalMode = Query(TotalMode.exact, description="How 'total' is calculated"),
+    fields: Optional[str] = Query(
+        None, description="Comma separated task fields to return, e.g. id,title,status"
+    ),
+) -> TaskListQuery:
+    query = TaskListQuery(
+        statuses=tuple(sorted(set(status or ()), key=list(TaskStatus).index)),
+        sort=sort,
+        created_after=as_utc(created_after),
+        updated_after=as_utc(updated_after),
+        skip=skip,
+        limit=limit,
+        cursor=cursor,
+        total=total,
+        fields=parse_fields(fields),
+    )
+    if query.created_after is not None and query.sort_field != "created_at":
+        raise not_covered("created_after", "created_at")
+    if query.updated_after is not None and query.sort_field != "updated_at":
+        raise not_covered("updated_after", "updated_at")
+    return query
+
+
+def not_covered(name: str, column: str) -> HTTPException:
+    return HTTPException(
+        status_code=400, detail=f"{name} needs sort={column} or sort=-{column}"
+    )
+
+
+def filtered_statement(query: TaskListQuery) -> Select:
+    # Task columns of the page with every filter applied, before ordering and paging
+    columns = field_columns(query.fields)
+    if query.sort_field not in query.fields:  # Read for the cursor, see page_tasks
+        columns += (SORT_COLUMNS[query.sort_field],)
+    stmt = select(*columns)
+    if query.user_id is not None:
+        stmt = stmt.where(Task.user_id == query.user_id)
+    if len(query.statuses) == 1:
+        stmt = stmt.where(Task.status == query.statuses[0])
+    elif query.statuses:
+        stmt = stmt.where(Task.status.in_(query.statuses))
+    if query.created_after is not None:
+        stmt = stmt.where(Task.created_at > query.created_after)
+    if query.updated_after is not None:
+        stmt = stmt.where(Task.updated_at > query.updated_after)
+    return stmt
+
+
+def sort_keys(query: TaskListQuery) -> tuple:
+    if query.sort_field == "id":
+        return (Task.id,)
+    return (SORT_COLUMNS[query.sort_field], Task.id)
+
+
+def _cursor_scope(query: TaskListQuery) -> dict:
+    # The sort and filters are stored so a cursor can't be reused with a different listing
+    return {
+        "sort": query.sort.value,
+        "status": [status.value for status in query.statuses],
+        "created_after": _encode_value(query.created_after),
+        "updated_after": _encode_value(query.updated_after),
+    }
+
+
+def _encode_value(value):
+    return value.isoformat() if isinstance(value, datetime) else value
+
+
+def encode_cursor(row: dict, query: TaskListQuery) -> str:
+    after = [_encode_value(row[key.key]) for key in sort_keys(query)]
+    return encode_payload({"after": after, **_cursor_scope(query)})
+
+
+def decode_cursor(cursor: str, query: TaskListQuery) -> list:
+    # Returns the sort key of the last row of the previous page. Raises 400 for tampered cursors or other listings
+    payload = decode_payload(cursor)
+    after = payload.pop("after", None)
+    if payload != _cursor_scope(query) or not isinstance(after, list):
+        raise invalid_cursor()
+    if len(after) != len(sort_keys(query)) or not is_id(after[-1]):
+        raise invalid_cursor()
+    if len(after) == 2:
+        try:
+            after[0] = as_utc(datetime.fromisoformat(after[0]))
+        except (TypeError, ValueError):
+            raise invalid_cursor()
+    return after
+
+
+def listing_statement(query: TaskListQuery, stmt: Select) -> Tuple[Select, int]:
+    # Orders and limits 'filtered_statement(query)' to the requested page. Returns it with the skip that was applied
+    after = decode_cursor(query.cursor, query) if query.cursor is not None else None
+    return paginate(
+        stmt, sort_keys(query), query.descending, query.skip, query.limit, after
+    )
+
+
+def page_tasks(
+    rows: Sequence[dict], query: TaskListQuery
+) -> Tuple[list, Optional[str]]:
+    # Returns the tasks of a page and the cursor for the next one. A short page is the last page
+    next_cursor = None
+    if len(rows) == query.limit:
+        next_cursor = encode_cursor(rows[-1], query)
+    if query.sort_field not in query.fields:
+        rows = [
+            {name: value for name, value in row.items() if name != query.sort_field}
+            for row in rows
+        ]
+    return list(rows), next_cursor
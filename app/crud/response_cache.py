@@ -0,0 +1,197 @@
+import asyncio
+import threading
+import time
+from typing import (Any, Awaitable, Callable, Dict, Generic, Hashable,
+                    Optional, Tuple, TypeVar, Union)
+
+from fastapi import Response
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session
+
+from app.core.cache import TTLCache, make_cache
+from app.core.config import settings
+from app.crud.counts import invalidate_task_counts
+from app.crud.etags import is_not_modified, not_modified
+from app.crud.events import task_events
+from app.crud.outbox import enqueue, outbox_handler
+from app.crud.search import invalidate_search_index
+
+"""
+Response cache for the public task feed. /tasks/public and /tasks/filter-by-status/ return the same pages to every
+user, so a page is built once per TTL and reused. Entries are keyed with a generation token that every task write
+replaces, which drops all cached pages at once without scanning the backend. With PUBLIC_FEED_CACHE_URL the pages and
+the generation are shared by every worker; otherwise each worker caches its own pages. Concurrent misses for one key
+are single-flight per process: the first request loads the page and the others wait for it instead of querying too.
+
+Task writes drop the caches of their own worker right after the commit (invalidate_task_caches) and enqueue a
+TASK_CACHES_TOPIC message in the outbox next to their task event. The outbox worker that claims it broadcasts the
+invalidation on the CACHES_CHANNEL of the task event bus: with TASK_EVENTS_BACKEND=postgres every worker gets it over
+NOTIFY and drops its own cached totals, search index and public pages, with 'memory' only the draining process does.
+A rolled back write invalidates nothing. Workers that miss a broadcast, e.g. while their LISTEN connection
+reconnects or when no process runs the outbox worker, serve stale entries until their TTL runs out.
+"""
+
+GENERATION_KEY = "generation"
+TASK_CACHES_TOPIC = "task_caches"  # Outbox topic
+CACHES_CHANNEL = "caches"  # Task event bus channel of the broadcast invalidations
+GENERATION_TTL_SECONDS = (
+    86400.0  # Must outlive the entries. A lost generation only drops the cache
+)
+
+
+LockT = TypeVar("LockT", threading.Lock, asyncio.Lock)
+
+
+class Flight(Generic[LockT]):  # Lock of one key being loaded and the number of callers using it
+    def __init__(self, lock: LockT):
+        self.lock: LockT = lock
+        self.callers = 0
+
+
+class ResponseCache:
+    def __init__(self, backend, ttl: float):
+        self.backend = backend
+        self.ttl = ttl
+        self.hits = 0
+        self.misses = 0
+        # A key's Flight is kept until its last caller is done, so late callers wait on the same lock
+        self._flights: Dict[Hashable, Flight[threading.Lock]] = {}
+        self._async_flights: Dict[Hashable, Flight[asyncio.Lock]] = {}
+        self._guard = threading.Lock()
+
+    @property
+    def enabled(self) -> bool:
+        return self.ttl > 0
+
+    def _generation(self) -> int:
+        generation = self.backend.get(GENERATION_KEY)
+        if generation is None:
+            generation = self.invalidate()
+        return generation
+
+    def invalidate(self) -> int:
+        # Starts a new generation. Entries of older generations are never read again and expire on their own
+        generation = time.time_ns()
+        self.backend.set(GENERATION_KEY, generation, ttl=GENERATION_TTL_SECONDS)
+        return generation
+
+    def _key(self, key: Tuple) -> str:
+        return repr((self._generation(), *key))
+
+    def _lookup(self, full_key: str) -> Optional[Any]:
+        value = self.backend.get(full_key)
+        if value is not None:
+            self.hits += 1
+        return value
+
+    def _store(self, full_key: str, value: Any) -> None:
+        self.misses += 1
+        self.backend.set(full_key, value, ttl=self.ttl)
+
+    def get_or_load(self, key: Tuple, load: Callable[[], Any]) -> Any:
+        # Returns the cached value for key or calls load once for all concurrent callers
+        full_key = self._key(key)
+        value = self._lookup(full_key)
+        if value is not None:
+            return value
+        with self._guard:
+            flight = self._flights.setdefault(full_key, Flight(threading.Lock()))
+            flight.callers += 1
+        try:
+            with flight.lock:
+                # Loaded by another request while this one waited
+                value = self._lookup(full_key)
+                if value is None:
+                    value = load()
+                    self._store(full_key, value)
+                return value
+        finally:
+            with self._guard:
+                flight.callers -= 1
+                if not flight.callers:
+                    del self._flights[full_key]
+
+    async def get_or_load_async(
+        self, key: Tuple, load: Callable[[], Awaitable[Any]]
+    ) -> Any:
+        # Async version of get_or_load. Waiting requests don't block the event loop
+        full_key = self._key(key)
+        value = self._lookup(full_key)
+        if value is not None:
+            return value
+        flight = self._async_flights.setdefault(full_key, Flight(asyncio.Lock()))
+        flight.callers += 1
+        try:
+            async with flight.lock:
+                value = self._lookup(full_key)
+                if value is None:
+                    value = await load()
+                    self._store(full_key, value)
+                return value
+        finally:
+            flight.callers -= 1
+            if not flight.callers:
+                del self._async_flights[full_key]
+
+    def stats(self) -> dict:
+        return {
+            "enabled": self.enabled,
+            "hits": self.hits,
+            "misses": self.misses,
+            # Only the in-process backend knows about evictions
+            "evictions": getattr(self.backend, "evictions", None),
+            "entries": (
+                len(self.backend) if isinstance(self.backend, TTLCache) else None
+            ),
+        }
+
+    def clear(self) -> None:
+        self.backend.clear()
+        self.hits = self.misses = 0
+
+
+public_feed_cache = ResponseCache(
+    make_cache(
+        settings.PUBLIC_FEED_CACHE_URL,
+        "public_feed",
+        settings.PUBLIC_FEED_CACHE_MAX_ENTRIES,
+        settings.PUBLIC_FEED_CACHE_TTL_SECONDS,
+    ),
+    ttl=settings.PUBLIC_FEED_CACHE_TTL_SECONDS,
+)
+
+
+def cached_page(cached: dict, response: Response, if_none_match: Optional[str]):
+    # Turns a cached {"etag", "page"} entry into the endpoint's response
+    etag = cached["etag"]
+    if etag is None:
+        return cached["page"]
+    if is_not_modified(if_none_match, etag):
+        return not_modified(etag)
+    response.headers["ETag"] = etag
+    return cached["page"]
+
+
+def invalidate_task_caches(user_id: int) -> None:
+    # Called after every committed task write. Drops the owner's cached totals and search index and every public page
+    invalidate_task_counts(user_id)
+    invalidate_search_index(user_id)
+    public_feed_cache.invalidate()
+
+
+def enqueue_cache_invalidation(db: Union[Session, AsyncSession], user_id: int) -> None:
+    # Called by the write handlers before their commit, next to enqueue_task_events
+    enqueue(db, TASK_CACHES_TOPIC, {"user_id": user_id})
+
+
+@outbox_handler(TASK_CACHES_TOPIC)
+def _broadcast_enqueued_invalidation(payload: dict) -> None:
+    task_events.publish([CACHES_CHANNEL], [{"user_id": payload["user_id"]}])
+
+
+def _invalidate_broadcast_caches(event: dict) -> None:
+    # Runs in every worker that receives the broadcast, including the one that made the write
+    invalidate_task_caches(event["user_id"])
+
+
+task_events.add_listener(CACHES_CHANNEL, _invalidate_broadcast_caches)
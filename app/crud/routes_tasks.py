@@ -1,12 +1,28 @@
-from typing import Optional
+from dataclasses import replace
+from typing import Optional, Tuple
 
-from fastapi import APIRouter, Depends, HTTPException, Query
+from fastapi import APIRouter, Depends, Header, HTTPException, Response
+from sqlalchemy import Executable
 from sqlalchemy.exc import SQLAlchemyError
 from sqlalchemy.orm import Session
 
+from app.auth.identity import CurrentUser
+from app.crud.counts import count_tasks
+from app.crud.etags import (expected_versions, is_not_modified, listing_etag,
+                            listing_state, not_modified, task_etag)
+from app.crud.events import enqueue_task_events, task_event, write_event
+from app.crud.mutations import (delete_owned_task, owner_of, select_owned_task,
+                                update_owned_task, write_error)
+from app.crud.pagination import row_dicts
+from app.crud.query_builder import (TaskListQuery, filtered_statement,
+                                    listing_statement, page_tasks,
+                                    task_list_query)
+from app.crud.response_cache import (cached_page, enqueue_cache_invalidation,
+                                     invalidate_task_caches, public_feed_cache)
 from app.db.deps import get_current_user, get_db
-from app.models.models import Task, TaskStatus, User
-from app.schemas.schemas import PaginatedTasks, TaskCreate, TaskOut, TaskUpdate
+from app.models.models import Task, TaskStatus
+from app.schemas.schemas import (PaginatedTasks, TaskCreate, TaskOut,
+                                 TaskUpdate, TotalMode)
 
 router = APIRouter()
 
@@ -16,9 +32,8 @@ it in README file.
 """
 
 
-def get_task_or_403(task_id: int, user_id: int, db: Session) -> Task:
+def check_task_access(task: Optional[Task], user_id: int) -> Task:
     # Returns 404 if page not found and 403 if user doesn't have access
-    task = db.query(Task).filter(Task.id == task_id).first()
     if not task:
         raise HTTPException(status_code=404, detail="Task not found")
     if task.user_id != user_id:
@@ -28,13 +43,109 @@ def get_task_or_403(task_id: int, user_id: int, db: Session) -> Task:
     return task
 
 
-@router.get("/public", response_model=PaginatedTasks)
+def get_task_or_403(task_id: int, user_id: int, db: Session) -> Task:
+    return check_task_access(db.query(Task).filter(Task.id == task_id).first(), user_id)
+
+
+def check_etag(  # Sets the ETag of a read. Returns a 304 response instead when If-None-Match already holds it
+    response: Response, if_none_match: Optional[str], etag: str
+) -> Optional[Response]:
+    if is_not_modified(if_none_match, etag):
+        return not_modified(etag)
+    response.headers["ETag"] = etag
+    return None
+
+
+def task_or_not_modified(task, response: Response, if_none_match: Optional[str]):
+    # 'task' is an ORM object
+    return check_etag(response, if_none_match, task_etag(task.id, task.version)) or task
+
+
+def cache_entry(page_response: Response, page: dict) -> dict:
+    # What public_feed_cache keeps of a page read by 'query_tasks'
+    return {
+        "etag": page_response.headers.get("ETag"),
+        "page": PaginatedTasks.model_validate(page).model_dump(
+            mode="json", exclude_unset=True
+        ),
+    }
+
+
+def listing_page(query: TaskListQuery, count: Optional[int], skip: int, rows) -> dict:
+    tasks, next_cursor = page_tasks(rows, query)
+    return {
+        "total": count,
+        "skip": skip,
+        "limit": query.limit,
+        "tasks": tasks,
+        "next_cursor": next_cursor,
+    }
+
+
+def update_statement(
+    task_id: int, user_id: int, updates: TaskUpdate, if_match: Optional[str]
+) -> Tuple[Executable, dict]:
+    # UPDATE ... RETURNING for the fields that were sent, or a SELECT with the same checks when none were
+    values = updates.model_dump(exclude_unset=True)
+    versions = expected_versions(if_match, task_id)
+    if values:
+        return update_owned_task(task_id, user_id, values, versions), values
+    return select_owned_task(task_id, user_id, versions), values
+
+
+def task_written(task, user_id: int, response: Response) -> None:
+    # Shared end of the write routes. 'task' is an ORM object or a Row of TASK_COLUMNS
+    invalidate_task_caches(user_id)
+    response.headers["ETag"] = task_etag(task.id, task.version)
+
+
+def list_tasks(  # Shared body of the list endpoints. Public pages go through public_feed_cache
+    db: Session,
+    response: Response,
+    if_none_match: Optional[str],
+    query: TaskListQuery,
+):
+    if query.user_id is not None or not public_feed_cache.enabled:
+        return query_tasks(db, response, if_none_match, query)
+
+    def load() -> dict:
+        page_response = Response()
+        return cache_entry(page_response, query_tasks(db, page_response, None, query))
+
+    cached = public_feed_cache.get_or_load((query,), load)
+    return cached_page(cached, response, if_none_match)
+
+
+def query_tasks(  # Reads one page of a listing from the database
+    db: Session,
+    response: Response,
+    if_none_match: Optional[str],
+    query: TaskListQuery,
+):
+    # Columns instead of Task objects. Pages are read as plain dicts without ORM hydration
+    stmt = filtered_statement(query)
+
+    # The ETag needs a pass over the matching rows, so it comes with 'exact' totals and replaces their COUNT
+    counted = None
+    if query.total == TotalMode.exact:
+        state = db.execute(listing_state(stmt)).one()
+        unchanged = check_etag(response, if_none_match, listing_etag(state, query))
+        if unchanged is not None:
+            return unchanged
+        counted = state[0]
+
+    count = count_tasks(db, stmt, query.total, query.user_id, query.filters, counted)
+    page, skip = listing_statement(query, stmt)
+    return listing_page(query, count, skip, row_dicts(db.connection().execute(page)))
+
+
+@router.get("/public", response_model=PaginatedTasks, response_model_exclude_unset=True)
 def get_all_tasks(  # Returns paginated queried tasks created by anyone
-    status: Optional[TaskStatus] = None,
-    skip: int = Query(0, ge=0),
-    limit: int = Query(10, ge=1),
+    response: Response,
+    query: TaskListQuery = Depends(task_list_query),
+    if_none_match: Optional[str] = Header(None, description="ETag of a cached copy"),
     db: Session = Depends(get_db),
-    current_user: User = Depends(
+    current_user: CurrentUser = Depends(
         get_current_user
     ),  # Not used. Only to restrict access to authenticated users
 ):
@@ -42,70 +153,83 @@ def get_all_tasks(  # Returns paginated queried tasks created by anyone
     Retrieve a paginated list of all tasks created by any user.
 
     Args:
-        status (Optional[TaskStatus]): Optional filter to return tasks with the status given.
-        skip (int): Number of tasks to skip
-        limit (int): Maximum number of tasks to return.
+        query (TaskListQuery): Listing parameters (dependency injection):
+            status: Tasks with any of the statuses given. Repeat the parameter to give several.
+            sort: 'id', 'created_at' or 'updated_at', prefixed with '-' for descending order. Ties are broken by id.
+            created_after / updated_after: Tasks created or updated after this time. Only with sort on the same column.
+            skip, limit: Number of tasks to skip and maximum number of tasks to return.
+            cursor: Cursor from the previous page. Replaces 'skip' with keyset pagination when given.
+            total: 'exact' counts matching tasks, 'estimate' allows a cached or approximate count, 'none' skips it.
+            fields: Comma separated fields to return, e.g. 'id,title'. Only those columns are read. 'id' is always included.
         db (Session): SQLAlchemy database session (dependency injection).
-        current_user (User): Currently authenticated user (to manage access to endpoints for authenticated users only).
+        current_user (CurrentUser): Currently authenticated user (to manage access to endpoints for authenticated users only).
 
     Returns:
-        PaginatedTasks: A dictionary with keys 'total', 'skip', 'limit', and 'tasks'. Contains the paginated results
+        PaginatedTasks: A dictionary with keys 'total', 'skip', 'limit', 'tasks' and 'next_cursor'. Contains the paginated results
+
+    Raises:
+        HTTPException 400: If the cursor is invalid or a filter isn't covered by the sort.
 
     Notes:
         - Returns tasks created by any user (not just the current user).
         - `current_user` is used only to enforce authentication. No active use
-        - Supports optional filtering with task status.
+        - Supports filtering on status and timestamps. Only combinations an index covers are allowed, see app.crud.query_builder.
+        - Pass 'next_cursor' back as 'cursor' to get the next page without an offset scan.
+        - With total=exact the response has a weak ETag. Send it back in If-None-Match to get 304 when nothing changed.
     """
-    query = db.query(Task)
-    if status:
-        query = query.filter(Task.status == status)
+    return list_tasks(db, response, if_none_match, query)
 
-    total = query.count()
-    tasks = query.offset(skip).limit(limit).all()
 
-    return {"total": total, "skip": skip, "limit": limit, "tasks": tasks}
-
-
-@router.get("", response_model=PaginatedTasks)
+@router.get("", response_model=PaginatedTasks, response_model_exclude_unset=True)
 def get_all_user_tasks(  # Returns paginated queried tasks created by current user only.
-    status: Optional[TaskStatus] = None,
-    skip: int = Query(0, ge=0),
-    limit: int = Query(10, ge=1),
+    response: Response,
+    query: TaskListQuery = Depends(task_list_query),
+    if_none_match: Optional[str] = Header(None, description="ETag of a cached copy"),
     db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_user),
+    current_user: CurrentUser = Depends(get_current_user),
 ):
     """
     Retrieve a paginated list of all tasks created by the current user.
 
     Args:
-        status (Optional[TaskStatus]): Optional filter to return tasks with the status given.
-        skip (int): Number of tasks to skip
-        limit (int): Maximum number of tasks to return.
+        query (TaskListQuery): Listing parameters (dependency injection):
+            status: Tasks with any of the statuses given. Repeat the parameter to give several.
+            sort: 'id', 'created_at' or 'updated_at', prefixed with '-' for descending order. Ties are broken by id.
+            created_after / updated_after: Tasks created or updated after this time. Only with sort on the same column.
+            skip, limit: Number of tasks to skip and maximum number of tasks to return.
+            cursor: Cursor from the previous page. Replaces 'skip' with keyset pagination when given.
+            total: 'exact' counts matching tasks, 'estimate' allows a cached or approximate count, 'none' skips it.
+            fields: Comma separated fields to return, e.g. 'id,title'. Only those columns are read. 'id' is always included.
         db (Session): SQLAlchemy database session (dependency injection).
-        current_user (User): Currently authenticated user (to manage access to endpoints for authenticated users only).
+        current_user (CurrentUser): Currently authenticated user (to manage access to endpoints for authenticated users only).
 
     Returns:
-        PaginatedTasks: A dictionary with keys 'total', 'skip', 'limit', and 'tasks'. Contains the paginated results
+        PaginatedTasks: A dictionary with keys 'total', 'skip', 'limit', 'tasks' and 'next_cursor'. Contains the paginated results
+
+    Raises:
+        HTTPException 400: If the cursor is invalid or a filter isn't covered by the sort.
 
     Notes:
         - Returns tasks created by the current user.
-        - Supports optional filtering with task status.
+        - Supports filtering on status and timestamps. Only combinations an index covers are allowed, see app.crud.query_builder.
+        - Pass 'next_cursor' back as 'cursor' to get the next page without an offset scan.
+        - With total=exact the response has a weak ETag. Send it back in If-None-Match to get 304 when nothing changed.
     """
-    query = db.query(Task).filter(Task.user_id == current_user.id)
-    if status:
-        query = query.filter(Task.status == status)
-
-    total = query.count()
-    tasks = query.offset(skip).limit(limit).all()
-
-    return {"total": total, "skip": skip, "limit": limit, "tasks": tasks}
+    return list_tasks(
+        db,
+        response,
+        if_none_match,
+        replace(query, user_id=current_user.id),
+    )
 
 
 @router.get("/{task_id:int}", response_model=TaskOut)
 def get_specific_task(  # Returns details to a specific task only if created by current user
     task_id: int,
+    response: Response,
+    if_none_match: Optional[str] = Header(None, description="ETag of a cached copy"),
     db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_user),
+    current_user: CurrentUser = Depends(get_current_user),
 ):
     """
     Retrieves a specific task created by the current user.
@@ -113,7 +237,7 @@ def get_specific_task(  # Returns details to a specific task only if created by
     Args:
         task_id (int):  Identifies the specific task to return
         db (Session): SQLAlchemy database session (dependency injection).
-        current_user (User): Currently authenticated user (to manage access to endpoints for authenticated users only).
+        current_user (CurrentUser): Currently authenticated user (to manage access to endpoints for authenticated users only).
 
     Returns:
         TaskOut: A Pydantic model representing the requested information.
@@ -125,25 +249,27 @@ def get_specific_task(  # Returns details to a specific task only if created by
     Notes:
         - Only the user who created the task can access it
         - Returns specific task created by the current user.
+        - The response has a strong ETag. Returns 304 without a body when If-None-Match holds the current one.
     """
     task = get_task_or_403(
         task_id, current_user.id, db
     )  # Only returns task if created by current user
-    return task
+    return task_or_not_modified(task, response, if_none_match)
 
 
 @router.post("", response_model=TaskOut)
 def create_task(  # Creates task based on TaskCreate schema
     task: TaskCreate,
+    response: Response,
     db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_user),
+    current_user: CurrentUser = Depends(get_current_user),
 ):
     """
     Creates a task with schema TaskCreate for the current user.
 
     Args:
         db (Session): SQLAlchemy database session.
-        current_user (User): Authenticated user making the request.
+        current_user (CurrentUser): Authenticated user making the request.
 
     Raises:
         HTTPException 500: If there is a database error which will cause the task to not be created because of rollback.
@@ -158,11 +284,15 @@ def create_task(  # Creates task based on TaskCreate schema
     db_task = Task(**task.dict(), user_id=current_user.id)
     db.add(db_task)
     try:
+        db.flush()  # Assigns the id for the event
+        enqueue_task_events(db, current_user.id, [write_event("created", db_task)])
+        enqueue_cache_invalidation(db, current_user.id)
         db.commit()
         db.refresh(db_task)
     except SQLAlchemyError:
         db.rollback()
         raise HTTPException(status_code=500, detail="Failed to create task")
+    task_written(db_task, current_user.id, response)
     return db_task
 
 
@@ -170,15 +300,17 @@ def create_task(  # Creates task based on TaskCreate schema
 def update_task(  # Updates task based on TaskUpdate schema only if task was created by current user
     task_id: int,
     updates: TaskUpdate,
+    response: Response,
+    if_match: Optional[str] = Header(None, description="ETag the update is based on"),
     db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_user),
+    current_user: CurrentUser = Depends(get_current_user),
 ):
     """
     Updates a task with the schema TaskUpdate for the current user if they are authorized to access this task.
 
     Args:
         db (Session): SQLAlchemy database session.
-        current_user (User): Authenticated user making the request.
+        current_user (CurrentUser): Authenticated user making the request.
 
     Returns:
         TaskOut: A Pydantic model representing the requested information.
@@ -186,37 +318,43 @@ def update_task(  # Updates task based on TaskUpdate schema only if task was cre
     Raises:
         HTTPException 403: If the task does not belong to the current user.
         HTTPException 404: If the task with the given ID does not exist.
+        HTTPException 412: If If-Match was sent and the task's current ETag isn't in it.
         HTTPException 500: If there is a database error which will cause the task to not be updated because of rollback.
 
 
     Notes:
         - Authentication is enforced: only authenticated users can create tasks.
         - Tasks with empty titles will fail
+        - One UPDATE ... RETURNING scoped to the owner. The task is only looked up again when nothing matched (403/404).
     """
-    task = get_task_or_403(task_id, current_user.id, db)
-    for field, value in updates.model_dump(exclude_unset=True).items():
-        setattr(task, field, value)
+    stmt, values = update_statement(task_id, current_user.id, updates, if_match)
     try:
+        row = db.execute(stmt).first()
+        if row is not None and values:
+            enqueue_task_events(db, current_user.id, [write_event("updated", row)])
+            enqueue_cache_invalidation(db, current_user.id)
         db.commit()
-        db.refresh(task)
     except SQLAlchemyError:
         db.rollback()
         raise HTTPException(status_code=500, detail="Failed to update task")
-    return task
+    if row is None:
+        raise write_error(db.scalar(owner_of(task_id)), current_user.id)
+    task_written(row, current_user.id, response)
+    return row._mapping
 
 
 @router.delete("/{task_id:int}")
 def delete_task(  # Deletes task only if task was created by current user
     task_id: int,
     db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_user),
+    current_user: CurrentUser = Depends(get_current_user),
 ):
     """
     Deletes a task for the current user if they are authenticated.
 
     Args:
         db (Session): SQLAlchemy database session.
-        current_user (User): Authenticated user making the request.
+        current_user (CurrentUser): Authenticated user making the request.
 
     Returns:
         dict: {"message": "Task deleted"}
@@ -230,22 +368,29 @@ def delete_task(  # Deletes task only if task was created by current user
     Notes:
         - Authentication is enforced: only authenticated users can delete tasks.
         - Users can only delete their own tasks
+        - One DELETE scoped to the owner. The task is only looked up again when nothing matched (403/404).
     """
-    task = get_task_or_403(task_id, current_user.id, db)
     try:
-        db.delete(task)
+        deleted = db.scalar(delete_owned_task(task_id, current_user.id))
+        if deleted is not None:
+            enqueue_task_events(db, current_user.id, [task_event("deleted", task_id)])
+            enqueue_cache_invalidation(db, current_user.id)
         db.commit()
     except SQLAlchemyError:
         db.rollback()
         raise HTTPException(status_code=500, detail="Failed to delete task")
+    if deleted is None:
+        raise write_error(db.scalar(owner_of(task_id)), current_user.id)
+    invalidate_task_caches(current_user.id)
     return {"message": "Task deleted"}
 
 
 @router.put("/{task_id:int}/complete", response_model=TaskOut)
 def mark_completed(  # Marks task as Completed although update_task updates the task to be New, In Progress or Completed
     task_id: int,
+    response: Response,
     db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_user),
+    current_user: CurrentUser = Depends(get_current_user),
 ):
     """
     Set a specific task's status to "Completed" only if the task belongs to the current user.
@@ -253,7 +398,7 @@ def mark_completed(  # Marks task as Completed although update_task updates the
     Args:
         task_id (int): ID of the task to mark as completed.
         db (Session): SQLAlchemy database session.
-        current_user (User): The user attempting to update task.
+        current_user (CurrentUser): The user attempting to update task.
 
     Returns:
         TaskOut: The updated task with its status set to 'Completed'.
@@ -269,24 +414,33 @@ def mark_completed(  # Marks task as Completed although update_task updates the
         - Could be used as shortcut instead of using `update_task`.
 
     """
-    task = get_task_or_403(task_id, current_user.id, db)
-    task.status = TaskStatus.completed
+    stmt = update_owned_task(task_id, current_user.id, {"status": TaskStatus.completed})
     try:
+        row = db.execute(stmt).first()
+        if row is not None:
+            enqueue_task_events(db, current_user.id, [write_event("completed", row)])
+            enqueue_cache_invalidation(db, current_user.id)
         db.commit()
-        db.refresh(task)
     except SQLAlchemyError:
         db.rollback()
         raise HTTPException(status_code=500, detail="Failed to complete task")
-    return task
+    if row is None:
+        raise write_error(db.scalar(owner_of(task_id)), current_user.id)
+    task_written(row, current_user.id, response)
+    return row._mapping
 
 
-@router.get("/filter-by-status/", response_model=PaginatedTasks)
+@router.get(
+    "/filter-by-status/",
+    response_model=PaginatedTasks,
+    response_model_exclude_unset=True,
+)
 def filter_task_by_status(  # Filters query by status although filter by status already implemented in get_all_tasks and get_all_user_tasks
-    status: Optional[TaskStatus] = Query(None, description="Filter tasks by status"),
-    skip: int = Query(0, ge=0),
-    limit: int = Query(10, ge=1),
+    response: Response,
+    query: TaskListQuery = Depends(task_list_query),
+    if_none_match: Optional[str] = Header(None, description="ETag of a cached copy"),
     db: Session = Depends(get_db),
-    current_user: User = Depends(
+    current_user: CurrentUser = Depends(
         get_current_user
     ),  # Not used. Only to restrict access to authenticated users
 ):
@@ -294,26 +448,28 @@ def filter_task_by_status(  # Filters query by status although filter by status
     Retrieve a paginated list of tasks that are filtered by status.
 
     Args:
-        status (Optional[TaskStatus]): Filter tasks by their status (e.g., New, In Progress, Completed).
-        skip (int): Number of tasks to skip.
-        limit (int): Maximum number of tasks to return.
+        query (TaskListQuery): Listing parameters (dependency injection):
+            status: Tasks with any of the statuses given. Repeat the parameter to give several.
+            sort: 'id', 'created_at' or 'updated_at', prefixed with '-' for descending order. Ties are broken by id.
+            created_after / updated_after: Tasks created or updated after this time. Only with sort on the same column.
+            skip, limit: Number of tasks to skip and maximum number of tasks to return.
+            cursor: Cursor from the previous page. Replaces 'skip' with keyset pagination when given.
+            total: 'exact' counts matching tasks, 'estimate' allows a cached or approximate count, 'none' skips it.
+            fields: Comma separated fields to return, e.g. 'id,title'. Only those columns are read. 'id' is always included.
         db (Session): SQLAlchemy database session.
-        current_user (User): Authenticated user (used to enforce authentication only).
+        current_user (CurrentUser): Authenticated user (used to enforce authentication only).
 
     Returns:
-        PaginatedTasks: A dictionary with keys 'total', 'limit', 'skip', and 'tasks' containing the filtered paginated results.
+        PaginatedTasks: A dictionary with keys 'total', 'limit', 'skip', 'tasks' and 'next_cursor' containing the filtered paginated results.
+
+    Raises:
+        HTTPException 400: If the cursor is invalid or a filter isn't covered by the sort.
 
     Notes:
         - This endpoint returns tasks created by any user, not just the current one.
         - Authentication is required even though current_user isn't used in function.
         - Redundant because status filtering is already supported by `get_all_tasks` and `get_specific_task`.
+        - Pass 'next_cursor' back as 'cursor' to get the next page without an offset scan.
+        - With total=exact the response has a weak ETag. Send it back in If-None-Match to get 304 when nothing changed.
     """
-    query = db.query(Task)
-
-    if status is not None:
-        query = query.filter(Task.status == status)
-
-    total = query.count()
-    tasks = query.offset(skip).limit(limit).all()
-
-    return {"total": total, "skip": skip, "limit": limit, "tasks": tasks}
+    return list_tasks(db, response, if_none_match, query)
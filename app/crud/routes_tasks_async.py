@@ -0,0 +1,230 @@
+from dataclasses import replace
+from typing import Optional
+
+from fastapi import APIRouter, Depends, Header, HTTPException, Response
+from sqlalchemy.exc import SQLAlchemyError
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.auth.identity import CurrentUser
+from app.crud.counts import count_tasks_async
+from app.crud.etags import listing_etag, listing_state
+from app.crud.events import enqueue_task_events, task_event, write_event
+from app.crud.mutations import (delete_owned_task, owner_of, update_owned_task,
+                                write_error)
+from app.crud.pagination import row_dicts
+from app.crud.query_builder import (TaskListQuery, filtered_statement,
+                                    listing_statement, task_list_query)
+from app.crud.response_cache import (cached_page, enqueue_cache_invalidation,
+                                     invalidate_task_caches, public_feed_cache)
+from app.crud.routes_tasks import (cache_entry, check_etag, check_task_access,
+                                   listing_page, task_or_not_modified,
+                                   task_written, update_statement)
+from app.db.deps import get_async_db, get_current_user_async
+from app.models.models import Task, TaskStatus
+from app.schemas.schemas import (PaginatedTasks, TaskCreate, TaskOut,
+                                 TaskUpdate, TotalMode)
+
+router = APIRouter()
+
+"""
+Async versions of the task routes in 'routes_tasks.py'. They are mounted in front of the sync routes when DB_MODE=async
+so one worker can keep many database round trips in flight instead of blocking a threadpool thread per request.
+Paths, parameters and responses are the same as the sync routes, and so are the helpers that validate requests and
+build responses. Read the docstrings there for details.
+"""
+
+
+async def get_task_or_403(task_id: int, user_id: int, db: AsyncSession) -> Task:
+    return check_task_access(await db.get(Task, task_id), user_id)
+
+
+async def list_tasks(  # Shared body of the list endpoints. Public pages go through public_feed_cache
+    db: AsyncSession,
+    response: Response,
+    if_none_match: Optional[str],
+    query: TaskListQuery,
+):
+    if query.user_id is not None or not public_feed_cache.enabled:
+        return await query_tasks(db, response, if_none_match, query)
+
+    async def load() -> dict:
+        page_response = Response()
+        return cache_entry(
+            page_response, await query_tasks(db, page_response, None, query)
+        )
+
+    cached = await public_feed_cache.get_or_load_async((query,), load)
+    return cached_page(cached, response, if_none_match)
+
+
+async def query_tasks(  # Reads one page of a listing from the database
+    db: AsyncSession,
+    response: Response,
+    if_none_match: Optional[str],
+    query: TaskListQuery,
+):
+    stmt = filtered_statement(query)
+
+    counted = None
+    if query.total == TotalMode.exact:
+        state = (await db.execute(listing_state(stmt))).one()
+        unchanged = check_etag(response, if_none_match, listing_etag(state, query))
+        if unchanged is not None:
+            return unchanged
+        counted = state[0]
+
+    count = await count_tasks_async(
+        db, stmt, query.total, query.user_id, query.filters, counted
+    )
+    page, skip = listing_statement(query, stmt)
+    connection = await db.connection()
+    return listing_page(query, count, skip, row_dicts(await connection.execute(page)))
+
+
+@router.get("/public", response_model=PaginatedTasks, response_model_exclude_unset=True)
+async def get_all_tasks(  # Returns paginated queried tasks created by anyone
+    response: Response,
+    query: TaskListQuery = Depends(task_list_query),
+    if_none_match: Optional[str] = Header(None, description="ETag of a cached copy"),
+    db: AsyncSession = Depends(get_async_db),
+    current_user: CurrentUser = Depends(
+        get_current_user_async
+    ),  # Not used. Only to restrict access to authenticated users
+):
+    return await list_tasks(db, response, if_none_match, query)
+
+
+@router.get("", response_model=PaginatedTasks, response_model_exclude_unset=True)
+async def get_all_user_tasks(  # Returns paginated queried tasks created by current user only.
+    response: Response,
+    query: TaskListQuery = Depends(task_list_query),
+    if_none_match: Optional[str] = Header(None, description="ETag of a cached copy"),
+    db: AsyncSession = Depends(get_async_db),
+    current_user: CurrentUser = Depends(get_current_user_async),
+):
+    return await list_tasks(
+        db,
+        response,
+        if_none_match,
+        replace(query, user_id=current_user.id),
+    )
+
+
+@router.get("/{task_id:int}", response_model=TaskOut)
+async def get_specific_task(  # Returns details to a specific task only if created by current user
+    task_id: int,
+    response: Response,
+    if_none_match: Optional[str] = Header(None, description="ETag of a cached copy"),
+    db: AsyncSession = Depends(get_async_db),
+    current_user: CurrentUser = Depends(get_current_user_async),
+):
+    task = await get_task_or_403(task_id, current_user.id, db)
+    return task_or_not_modified(task, response, if_none_match)
+
+
+@router.post("", response_model=TaskOut)
+async def create_task(  # Creates task based on TaskCreate schema
+    task: TaskCreate,
+    response: Response,
+    db: AsyncSession = Depends(get_async_db),
+    current_user: CurrentUser = Depends(get_current_user_async),
+):
+    db_task = Task(**task.model_dump(), user_id=current_user.id)
+    db.add(db_task)
+    try:
+        await db.flush()  # Assigns the id for the event
+        enqueue_task_events(db, current_user.id, [write_event("created", db_task)])
+        enqueue_cache_invalidation(db, current_user.id)
+        await db.commit()
+        await db.refresh(db_task)
+    except SQLAlchemyError:
+        await db.rollback()
+        raise HTTPException(status_code=500, detail="Failed to create task")
+    task_written(db_task, current_user.id, response)
+    return db_task
+
+
+@router.put("/{task_id:int}", response_model=TaskOut)
+async def update_task(  # Updates task based on TaskUpdate schema only if task was created by current user
+    task_id: int,
+    updates: TaskUpdate,
+    response: Response,
+    if_match: Optional[str] = Header(None, description="ETag the update is based on"),
+    db: AsyncSession = Depends(get_async_db),
+    current_user: CurrentUser = Depends(get_current_user_async),
+):
+    stmt, values = update_statement(task_id, current_user.id, updates, if_match)
+    try:
+        row = (await db.execute(stmt)).first()
+        if row is not None and values:
+            enqueue_task_events(db, current_user.id, [write_event("updated", row)])
+            enqueue_cache_invalidation(db, current_user.id)
+        await db.commit()
+    except SQLAlchemyError:
+        await db.rollback()
+        raise HTTPException(status_code=500, detail="Failed to update task")
+    if row is None:
+        raise write_error(await db.scalar(owner_of(task_id)), current_user.id)
+    task_written(row, current_user.id, response)
+    return row._mapping
+
+
+@router.delete("/{task_id:int}")
+async def delete_task(  # Deletes task only if task was created by current user
+    task_id: int,
+    db: AsyncSession = Depends(get_async_db),
+    current_user: CurrentUser = Depends(get_current_user_async),
+):
+    try:
+        deleted = await db.scalar(delete_owned_task(task_id, current_user.id))
+        if deleted is not None:
+            enqueue_task_events(db, current_user.id, [task_event("deleted", task_id)])
+            enqueue_cache_invalidation(db, current_user.id)
+        await db.commit()
+    except SQLAlchemyError:
+        await db.rollback()
+        raise HTTPException(status_code=500, detail="Failed to delete task")
+    if deleted is None:
+        raise write_error(await db.scalar(owner_of(task_id)), current_user.id)
+    invalidate_task_caches(current_user.id)
+    return {"message": "Task deleted"}
+
+
+@router.put("/{task_id:int}/complete", response_model=TaskOut)
+async def mark_completed(  # Marks task as Completed although update_task updates the task to be New, In Progress or Completed
+    task_id: int,
+    response: Response,
+    db: AsyncSession = Depends(get_async_db),
+    current_user: CurrentUser = Depends(get_current_user_async),
+):
+    stmt = update_owned_task(task_id, current_user.id, {"status": TaskStatus.completed})
+    try:
+        row = (await db.execute(stmt)).first()
+        if row is not None:
+            enqueue_task_events(db, current_user.id, [write_event("completed", row)])
+            enqueue_cache_invalidation(db, current_user.id)
+        await db.commit()
+    except SQLAlchemyError:
+        await db.rollback()
+        raise HTTPException(status_code=500, detail="Failed to complete task")
+    if row is None:
+        raise write_error(await db.scalar(owner_of(task_id)), current_user.id)
+    task_written(row, current_user.id, response)
+    return row._mapping
+
+
+@router.get(
+    "/filter-by-status/",
+    response_model=PaginatedTasks,
+    response_model_exclude_unset=True,
+)
+async def filter_task_by_status(  # Filters query by status although filter by status already implemented in get_all_tasks and get_all_user_tasks
+    response: Response,
+    query: TaskListQuery = Depends(task_list_query),
+    if_none_match: Optional[str] = Header(None, description="ETag of a cached copy"),
+    db: AsyncSession = Depends(get_async_db),
+    current_user: CurrentUser = Depends(
+        get_current_user_async
+    ),  # Not used. Only to restrict access to authenticated users
+):
+    return await list_tasks(db, response, if_none_match, query)
@@ -0,0 +1,334 @@
+from typing import Dict, List
+
+from fastapi import APIRouter, Body, Depends, HTTPException
+from sqlalchemy import (Boolean, Integer, Update, case, cast, column, delete,
+                        insert, literal_column, select, update, values)
+from sqlalchemy.exc import SQLAlchemyError
+from sqlalchemy.ext.compiler import compiles
+from sqlalchemy.orm import Session
+from sqlalchemy.sql.expression import Values
+
+from app.auth.identity import CurrentUser
+from app.core.config import settings
+from app.crud.events import enqueue_task_events, task_event, write_event
+from app.crud.mutations import TASK_COLUMNS
+from app.crud.response_cache import (enqueue_cache_invalidation,
+                                     invalidate_task_caches)
+from app.db.deps import get_current_user, get_db
+from app.models.models import Task
+from app.schemas.schemas import (BulkItemResult, BulkResult, BulkTaskDelete,
+                                 BulkTaskUpdate, TaskCreate, TaskOut)
+
+router = APIRouter()
+
+"""
+Bulk versions of create_task, update_task and delete_task. One request replaces N single-task requests and the
+database work is done with multi-row statements instead of one commit and refresh per task. Each item gets the status
+code the single-task endpoint would have returned, so one bad id doesn't fail the whole batch.
+"""
+
+UPDATE_FIELDS = ("title", "description", "status")  # BulkTaskUpdate fields besides id
+
+
+def task_out(row) -> TaskOut:
+    return TaskOut.model_validate(row._mapping)
+
+
+class named_values(Values):  # VALUES list used as a named table in FROM
+    inherit_cache = True
+
+
+@compiles(named_values, "sqlite")
+def _named_values_sqlite(element, compiler, asfrom=False, from_linter=None, **kw):
+    # SQLite can't name the columns of a VALUES alias. They are column1, column2, ... and renamed by a subquery
+    if not asfrom:
+        return compiler.visit_values(element, from_linter=from_linter, **kw)
+    if from_linter:
+        from_linter.froms[element._de_clone()] = element.name
+    unnamed = values(*[column(value.name, value.type) for value in element.columns])
+    for rows in element._data:
+        unnamed = unnamed.data(rows)
+    renamed = select(
+        *[
+            literal_column(f"column{position}", value.type).label(value.name)
+            for position, value in enumerate(element.columns, 1)
+        ]
+    ).select_from(unnamed)
+    return compiler.process(renamed.subquery(element.name), asfrom=True, **kw)
+
+
+def update_owned_tasks(user_id: int, changes: List[dict]) -> Update:
+    # One UPDATE ... FROM (VALUES ...) RETURNING for items with different field sets. Every VALUES row holds the item's
+    # id, a value per field and a set_<field> flag per field; fields whose flag is false keep their current value
+    table = Task.__table__
+    rows = named_values(
+        column("id", Integer),
+        *[column(field, table.c[field].type) for field in UPDATE_FIELDS],
+        *[column(f"set_{field}", Boolean) for field in UPDATE_FIELDS],
+        name="changes",
+    ).data(
+        [
+            (
+                item["id"],
+                *[item.get(field) for field in UPDATE_FIELDS],
+                *[field in item for field in UPDATE_FIELDS],
+            )
+            for item in changes
+        ]
+    )
+    return (
+        update(table)
+        .where(table.c.id == rows.c.id, table.c.user_id == user_id)
+        .values(
+            {
+                # Cast because Postgres types VALUES columns as text, which isn't assignable to the status enum
+                **{
+                    field: case(
+                        (
+                            rows.c[f"set_{field}"],
+                            cast(rows.c[field], table.c[field].type),
+                        ),
+                        else_=table.c[field],
+                    )
+                    for field in UPDATE_FIELDS
+                },
+                "version": table.c.version + 1,
+            }
+        )
+        .returning(*TASK_COLUMNS)
+    )
+
+
+def forbidden_or_missing(
+    task_ids: List[int], user_id: int, db: Session
+) -> Dict[int, BulkItemResult]:
+    # Returns 403 results for ids owned by other users and 404 results for ids that don't exist
+    owners: Dict[int, int] = {
+        task_id: owner
+        for task_id, owner in db.execute(
+            select(Task.id, Task.user_id).where(Task.id.in_(task_ids))
+        )
+    }
+    results = {}
+    for task_id in task_ids:
+        if task_id not in owners:
+            results[task_id] = BulkItemResult(
+                id=task_id, status_code=404, detail="Task not found"
+            )
+        elif owners[task_id] != user_id:
+            results[task_id] = BulkItemResult(
+                id=task_id, status_code=403, detail="Not authorized to access this task"
+            )
+    return results
+
+
+@router.post("/bulk", response_model=BulkResult)
+def create_tasks_bulk(  # Creates many tasks with one multi-row INSERT ... RETURNING
+    tasks: List[TaskCreate] = Body(
+        ..., min_length=1, max_length=settings.BULK_MAX_ITEMS
+    ),
+    db: Session = Depends(get_db),
+    current_user: CurrentUser = Depends(get_current_user),
+):
+    """
+    Creates tasks for the current user.
+
+    Args:
+        tasks (List[TaskCreate]): Tasks to create. At most BULK_MAX_ITEMS.
+        db (Session): SQLAlchemy database session.
+        current_user (CurrentUser): Authenticated user making the request.
+
+    Returns:
+        BulkResult: One result with the created task per item, in request order.
+
+    Raises:
+        HTTPException 500: If there is a database error. No task is created because of rollback.
+
+    Notes:
+        - Items are validated with TaskCreate so one invalid item fails the request with 422 before anything is written.
+    """
+    rows = [{**task.model_dump(), "user_id": current_user.id} for task in tasks]
+    try:
+        created = db.execute(
+            insert(Task).returning(*TASK_COLUMNS, sort_by_parameter_order=True), rows
+        ).all()
+        enqueue_task_events(
+            db,
+            current_user.id,
+            [write_event("created", row) for row in created],
+        )
+        enqueue_cache_invalidation(db, current_user.id)
+        db.commit()
+    except SQLAlchemyError:
+        db.rollback()
+        raise HTTPException(status_code=500, detail="Failed to create tasks")
+    invalidate_task_caches(current_user.id)
+    return {
+        "results": [
+            BulkItemResult(id=row.id, status_code=200, task=task_out(row))
+            for row in created
+        ]
+    }
+
+
+@router.patch("/bulk", response_model=BulkResult)
+def update_tasks_bulk(  # Updates many tasks owned by the current user with one UPDATE ... FROM (VALUES ...)
+    updates: List[BulkTaskUpdate] = Body(
+        ..., min_length=1, max_length=settings.BULK_MAX_ITEMS
+    ),
+    db: Session = Depends(get_db),
+    current_user: CurrentUser = Depends(get_current_user),
+):
+    """
+    Updates tasks of the current user. Every item holds a task id and the TaskUpdate fields to change.
+
+    Args:
+        updates (List[BulkTaskUpdate]): Task ids with the fields to update. At most BULK_MAX_ITEMS.
+        db (Session): SQLAlchemy database session.
+        current_user (CurrentUser): Authenticated user making the request.
+
+    Returns:
+        BulkResult: One result per item in request order. 200 with the updated task, 403, 404, or 400 for repeated ids.
+
+    Raises:
+        HTTPException 500: If there is a database error. No task is updated because of rollback.
+
+    Notes:
+        - Round trips: one lookup of the tasks and their owners, and one UPDATE ... FROM (VALUES ...) RETURNING for all
+          items that change fields, scoped to the current user. Items without fields return the task as it was read.
+        - A task deleted between the lookup and the UPDATE is reported as 404.
+    """
+    task_ids = list(dict.fromkeys(item.id for item in updates))
+    found = {
+        row.id: row
+        for row in db.execute(
+            select(*TASK_COLUMNS, Task.user_id).where(Task.id.in_(task_ids))
+        ).all()
+    }
+
+    seen = set()
+    duplicates = []
+    changes = []  # Fields to set per owned task, with its id
+    results: Dict[int, BulkItemResult] = {}
+    for index, item in enumerate(updates):
+        if item.id in seen:
+            duplicates.append(index)
+            continue
+        seen.add(item.id)
+        row = found.get(item.id)
+        if row is None:
+            continue  # 404 below
+        if row.user_id != current_user.id:
+            results[item.id] = BulkItemResult(
+                id=item.id, status_code=403, detail="Not authorized to access this task"
+            )
+            continue
+        values = item.model_dump(exclude_unset=True, exclude={"id"})
+        if values:
+            changes.append({**values, "id": item.id})
+        else:
+            results[item.id] = BulkItemResult(
+                id=item.id, status_code=200, task=task_out(row)
+            )
+
+    try:
+        rows = (
+            db.execute(update_owned_tasks(current_user.id, changes)).all()
+            if changes
+            else []
+        )
+        enqueue_task_events(
+            db,
+            current_user.id,
+            [write_event("updated", row) for row in rows],
+        )
+        if rows:
+            enqueue_cache_invalidation(db, current_user.id)
+        db.commit()
+    except SQLAlchemyError:
+        db.rollback()
+        raise HTTPException(status_code=500, detail="Failed to update tasks")
+    invalidate_task_caches(current_user.id)
+
+    for row in rows:
+        results[row.id] = BulkItemResult(id=row.id, status_code=200, task=task_out(row))
+    ordered = [
+        results.get(
+            item.id,
+            BulkItemResult(id=item.id, status_code=404, detail="Task not found"),
+        )
+        for item in updates
+    ]
+    for index in duplicates:
+        ordered[index] = BulkItemResult(
+            id=updates[index].id, status_code=400, detail="Task id repeated in request"
+        )
+    return {"results": ordered}
+
+
+@router.delete("/bulk", response_model=BulkResult)
+def delete_tasks_bulk(  # Deletes many tasks owned by the current user with one DELETE ... RETURNING
+    payload: BulkTaskDelete,
+    db: Session = Depends(get_db),
+    current_user: CurrentUser = Depends(get_current_user),
+):
+    """
+    Deletes tasks of the current user.
+
+    Args:
+        payload (BulkTaskDelete): Ids of the tasks to delete.
+        db (Session): SQLAlchemy database session.
+        current_user (CurrentUser): Authenticated user making the request.
+
+    Returns:
+        BulkResult: One result per unique id in request order. 200 when deleted, 403 or 404 otherwise.
+
+    Raises:
+        HTTPException 422: If more than BULK_MAX_ITEMS ids are sent.
+        HTTPException 500: If there is a database error. No task is deleted because of rollback.
+
+    Notes:
+        - Ids that weren't deleted are looked up once to tell 403 from 404.
+    """
+    task_ids = list(dict.fromkeys(payload.ids))  # Unique ids, request order kept
+    if len(task_ids) > settings.BULK_MAX_ITEMS:
+        raise HTTPException(
+            status_code=422, detail=f"At most {settings.BULK_MAX_ITEMS} ids per request"
+        )
+    try:
+        deleted = set(
+            db.execute(
+                delete(Task)
+                .where(Task.id.in_(task_ids), Task.user_id == current_user.id)
+                .returning(Task.id)
+                .execution_options(synchronize_session=False)
+            ).scalars()
+        )
+        enqueue_task_events(
+            db,
+            current_user.id,
+            [
+                task_event("deleted", task_id)
+                for task_id in task_ids
+                if task_id in deleted
+            ],
+        )
+        if deleted:
+            enqueue_cache_invalidation(db, current_user.id)
+        db.commit()
+    except SQLAlchemyError:
+        db.rollback()
+        raise HTTPException(status_code=500, detail="Failed to delete tasks")
+    invalidate_task_caches(current_user.id)
+
+    missing = [task_id for task_id in task_ids if task_id not in deleted]
+    results = forbidden_or_missing(missing, current_user.id, db) if missing else {}
+    return {
+        "results": [
+            results.get(
+                task_id,
+                BulkItemResult(id=task_id, status_code=200, detail="Task deleted"),
+            )
+            for task_id in task_ids
+        ]
+    }
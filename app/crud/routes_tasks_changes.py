@@ -0,0 +1,48 @@
+from typing import Optional
+
+from fastapi import APIRouter, Depends, Query
+from sqlalchemy.orm import Session
+
+from app.auth.identity import CurrentUser
+from app.crud.changes import decode_sync_token, read_changes
+from app.db.deps import get_current_user, get_db
+from app.schemas.schemas import TaskChanges
+
+router = APIRouter()
+
+
+@router.get("/changes", response_model=TaskChanges)
+def get_task_changes(  # Returns the current user's task changes after a sync token
+    since: Optional[str] = Query(
+        None, description="'since' of the previous response. Omit for a full sync"
+    ),
+    limit: int = Query(100, ge=1, le=1000),
+    db: Session = Depends(get_db),
+    current_user: CurrentUser = Depends(get_current_user),
+):
+    """
+    Returns the tasks the current user created, updated or deleted after the sync token 'since'.
+
+    Args:
+        since (Optional[str]): Token from the previous response. Without it every task is returned.
+        limit (int): Maximum number of changes to return, tasks and deletions together.
+        db (Session): SQLAlchemy database session (dependency injection).
+        current_user (CurrentUser): Currently authenticated user.
+
+    Returns:
+        TaskChanges: Changed tasks in their current state, ids of deleted tasks, the next token and 'has_more'.
+
+    Raises:
+        HTTPException 400: If the token is invalid or belongs to another user.
+        HTTPException 410: If the token is older than TOMBSTONE_RETENTION_DAYS. Deletions since then may be gone.
+
+    Notes:
+        - Store the returned 'since' and send it with the next sync. Call again right away while 'has_more' is True.
+        - The response only grows with the number of changes, not with the number of tasks.
+        - Applying the changes in order is always correct, a task that was written several times is returned once.
+        - After a 410, drop the local tasks and sync again without 'since'.
+    """
+    if since is None:
+        return read_changes(db, current_user.id, None, limit)
+    after, synced_at = decode_sync_token(since, current_user.id)
+    return read_changes(db, current_user.id, after, limit, synced_at)
@@ -0,0 +1,148 @@
+import csv
+import io
+import json
+from typing import Iterator, Optional, Tuple
+
+from fastapi import APIRouter, Depends, Query
+from fastapi.responses import StreamingResponse
+from sqlalchemy import Column, Select, select
+from sqlalchemy.engine import Connection, Engine
+from sqlalchemy.orm import Session
+
+from app.auth.identity import CurrentUser
+from app.core.config import settings
+from app.db.deps import get_current_admin, get_current_user, get_db
+from app.models.models import Task, TaskStatus
+from app.schemas.schemas import ExportFormat
+
+router = APIRouter()
+
+"""
+Streaming exports of tasks. Rows are read from a server-side cursor in EXPORT_BATCH_SIZE batches and written to the
+response as they arrive, so memory stays flat no matter how many tasks are exported.
+"""
+
+EXPORT_COLUMNS: Tuple[Column, ...] = (
+    Task.id,
+    Task.title,
+    Task.description,
+    Task.status,
+)
+MEDIA_TYPES = {
+    ExportFormat.ndjson: "application/x-ndjson",
+    ExportFormat.csv: "text/csv",
+}
+
+
+def status_value(status: Optional[TaskStatus]) -> Optional[str]:
+    # The status column is nullable. None is written as null (NDJSON) or an empty field (CSV)
+    return status.value if status is not None else None
+
+
+def format_rows(rows, export_format: ExportFormat) -> str:
+    # Renders one batch of rows. Batches are written as one chunk so the response isn't flushed per row
+    if export_format == ExportFormat.csv:
+        buffer = io.StringIO()
+        csv.writer(buffer).writerows(
+            (row.id, row.title, row.description, status_value(row.status))
+            for row in rows
+        )
+        return buffer.getvalue()
+    return "".join(
+        json.dumps(
+            {
+                "id": row.id,
+                "title": row.title,
+                "description": row.description,
+                "status": status_value(row.status),
+            }
+        )
+        + "\n"
+        for row in rows
+    )
+
+
+def stream_rows(
+    bind: Engine | Connection, stmt: Select, export_format: ExportFormat
+) -> Iterator[str]:
+    # Uses its own session because the request's session is closed before the body is streamed
+    with Session(bind) as db:
+        result = db.execute(
+            stmt.execution_options(yield_per=settings.EXPORT_BATCH_SIZE)
+        )
+        if export_format == ExportFormat.csv:
+            yield ",".join(column.key for column in EXPORT_COLUMNS) + "\r\n"
+        for batch in result.partitions():
+            yield format_rows(batch, export_format)
+
+
+def export_response(
+    db: Session, stmt: Select, export_format: ExportFormat, filename: str
+) -> StreamingResponse:
+    return StreamingResponse(
+        stream_rows(db.get_bind(), stmt.order_by(Task.id), export_format),
+        media_type=MEDIA_TYPES[export_format],
+        headers={
+            "Content-Disposition": f'attachment; filename="{filename}.{export_format.value}"'
+        },
+    )
+
+
+@router.get("/export")
+def export_user_tasks(  # Streams every task of the current user as NDJSON or CSV
+    format: ExportFormat = Query(ExportFormat.ndjson),
+    status: Optional[TaskStatus] = None,
+    db: Session = Depends(get_db),
+    current_user: CurrentUser = Depends(get_current_user),
+):
+    """
+    Exports all tasks created by the current user.
+
+    Args:
+        format (ExportFormat): 'ndjson' (one JSON object per line) or 'csv' (with header row).
+        status (Optional[TaskStatus]): Optional filter to export only tasks with the status given.
+        db (Session): SQLAlchemy database session (dependency injection).
+        current_user (CurrentUser): Currently authenticated user.
+
+    Returns:
+        StreamingResponse: Tasks ordered by id with the fields of TaskOut.
+
+    Notes:
+        - Rows are streamed from a server-side cursor so memory use doesn't grow with the number of tasks.
+        - Use this instead of paging through GET /tasks to download everything.
+    """
+    stmt = select(*EXPORT_COLUMNS).where(Task.user_id == current_user.id)
+    if status is not None:
+        stmt = stmt.where(Task.status == status)
+    return export_response(db, stmt, format, "tasks")
+
+
+@router.get("/public/export")
+def export_all_tasks(  # Streams tasks created by anyone as NDJSON or CSV
+    format: ExportFormat = Query(ExportFormat.ndjson),
+    status: Optional[TaskStatus] = None,
+    db: Session = Depends(get_db),
+    current_user: CurrentUser = Depends(
+        get_current_admin
+    ),  # Not used. Only to restrict access to admins
+):
+    """
+    Exports tasks created by any user, e.g. for backfills.
+
+    Args:
+        format (ExportFormat): 'ndjson' (one JSON object per line) or 'csv' (with header row).
+        status (Optional[TaskStatus]): Optional filter to export only tasks with the status given.
+        db (Session): SQLAlchemy database session (dependency injection).
+        current_user (CurrentUser): Currently authenticated admin (to manage access to endpoints for admins only).
+
+    Returns:
+        StreamingResponse: Tasks ordered by id with the fields of TaskOut.
+
+    Notes:
+        - Same feed as /tasks/public without pagination.
+        - Only users listed in ADMIN_USERNAMES may export every user's tasks. Others get 403.
+    """
+    stmt = select(*EXPORT_COLUMNS)
+    if status is not None:
+        stmt = stmt.where(Task.status == status)
+    return export_response(db, stmt, format, "public_tasks")
@@ -0,0 +1,51 @@
+from typing import Optional
+
+from fastapi import APIRouter, Depends, Query
+from sqlalchemy.orm import Session
+
+from app.auth.identity import CurrentUser
+from app.crud.search import (decode_search_cursor, encode_search_cursor,
+                             search_tasks)
+from app.db.deps import get_current_user, get_db
+from app.schemas.schemas import SearchScope, TaskSearchResults
+
+router = APIRouter()
+
+
+@router.get("/search", response_model=TaskSearchResults)
+def search(  # Full-text search over titles and descriptions, best match first
+    q: str = Query(..., min_length=1, max_length=200),
+    scope: SearchScope = Query(SearchScope.own),
+    limit: int = Query(20, ge=1, le=100),
+    cursor: Optional[str] = Query(None),
+    db: Session = Depends(get_db),
+    current_user: CurrentUser = Depends(get_current_user),
+):
+    """
+    Searches the current user's tasks, or every task with scope=public.
+
+    Args:
+        q (str): Search terms. On Postgres also "quoted phrases", OR and -excluded words (websearch_to_tsquery).
+        scope (SearchScope): 'own' for the current user's tasks, 'public' for tasks created by anyone.
+        limit (int): Maximum number of hits to return.
+        cursor (Optional[str]): 'next_cursor' from the previous page.
+        db (Session): SQLAlchemy database session (dependency injection).
+        current_user (CurrentUser): Currently authenticated user.
+
+    Returns:
+        TaskSearchResults: Hits ordered by rank, best first, then by id, and the cursor for the next page.
+
+    Raises:
+        HTTPException 400: If the cursor is invalid or was made for another query or scope.
+
+    Notes:
+        - Pages use a keyset on (rank, id), there is no offset.
+        - Postgres uses the GIN index on search_vector. Other databases use an in-memory index, see app.crud.search.
+    """
+    user_id = current_user.id if scope == SearchScope.own else None
+    after = decode_search_cursor(cursor, q, user_id) if cursor is not None else None
+    hits = search_tasks(db, q, user_id, limit, after)
+    next_cursor = (
+        encode_search_cursor(hits[-1], q, user_id) if len(hits) == limit else None
+    )
+    return {"tasks": hits, "next_cursor": next_cursor}
@@ -0,0 +1,73 @@
+import json
+from typing import AsyncIterator
+
+from fastapi import APIRouter, Depends, HTTPException, Query
+from fastapi.responses import StreamingResponse
+
+from app.auth.identity import CurrentUser
+from app.core.config import settings
+from app.crud.events import PUBLIC_CHANNEL, task_events, user_channel
+from app.db.deps import get_current_user
+from app.schemas.schemas import StreamScope
+
+router = APIRouter()
+
+# Tells EventSource clients how long to wait before reconnecting, in milliseconds
+RETRY_MILLISECONDS = 3000
+
+
+def sse_message(kind: str, data: dict) -> str:
+    return f"event: {kind}\ndata: {json.dumps(data, separators=(',', ':'))}\n\n"
+
+
+async def event_stream(channel: str) -> AsyncIterator[str]:
+    # Subscribes when the response starts, so a client that is already gone never holds a subscription
+    with task_events.subscribe(channel) as subscription:
+        yield f"retry: {RETRY_MILLISECONDS}\n\n"
+        while True:
+            if subscription.overflowed:
+                yield sse_message("reset", {})
+                return
+            event = await subscription.next(settings.STREAM_HEARTBEAT_SECONDS)
+            if event is None:
+                yield ": keep-alive\n\n"
+            else:
+                yield sse_message(event["type"], event)
+
+
+@router.get("/stream")
+async def stream_task_events(  # Pushes task changes as server-sent events
+    scope: StreamScope = Query(StreamScope.own),
+    current_user: CurrentUser = Depends(get_current_user),
+):
+    """
+    Streams task changes as server-sent events (text/event-stream).
+
+    Args:
+        scope (StreamScope): 'own' for changes to the current user's tasks, 'public' for changes to any task.
+        current_user (CurrentUser): Currently authenticated user.
+
+    Returns:
+        StreamingResponse: Events named 'created', 'updated', 'completed' and 'deleted'. Their data is a JSON object
+        with 'type', 'id' and, except for deletions, 'task'.
+
+    Raises:
+        HTTPException 503: If this worker already serves STREAM_MAX_CONNECTIONS streams.
+
+    Notes:
+        - Events are only a notification. After a reconnect or a 'reset' event, refetch the list or call /tasks/changes.
+        - 'reset' is sent and the stream closed when the client falls STREAM_QUEUE_SIZE events behind.
+        - A ': keep-alive' comment is sent after STREAM_HEARTBEAT_SECONDS without events.
+        - EventSource can't send an Authorization header. Browsers read the stream with fetch instead.
+    """
+    if task_events.full:
+        raise HTTPException(status_code=503, detail="Too many open streams")
+    channel = (
+        user_channel(current_user.id) if scope == StreamScope.own else PUBLIC_CHANNEL
+    )
+    return StreamingResponse(
+        event_stream(channel),
+        media_type="text/event-stream",
+        # no-transform and X-Accel-Buffering keep proxies from buffering the events
+        headers={"Cache-Control": "no-cache, no-transform", "X-Accel-Buffering": "no"},
+    )
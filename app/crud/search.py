@@ -0,0 +1,149 @@
+import re
+from collections import defaultdict
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from sqlalchemy import and_, cast, func, literal_column, or_, select
+from sqlalchemy.dialects.postgresql import DOUBLE_PRECISION, TSVECTOR
+from sqlalchemy.orm import Session
+
+from app.core.cache import TTLCache
+from app.core.config import settings
+from app.crud.etags import listing_state
+from app.crud.pagination import (decode_payload, encode_payload,
+                                 invalid_cursor, is_id, row_dicts)
+from app.models.models import Task
+
+"""
+Full-text search over task titles and descriptions. On Postgres the search_vector column (migration 0004) is matched
+with websearch_to_tsquery through its GIN index and ranked with ts_rank_cd. Other databases, i.e. SQLite in tests and
+development, use SearchIndex: an inverted index built in Python from the tasks of one scope and rebuilt whenever the
+scope's count, highest id or version sum changes. It matches whole words without stemming.
+
+Results are ordered by rank, best first, then by id. Pages use a keyset on (rank, id) so deep pages cost the same as
+the first one.
+"""
+
+SEARCH_CONFIG = "english"
+SEARCH_VECTOR = literal_column("tasks.search_vector", type_=TSVECTOR)
+SEARCH_COLUMNS = (Task.id, Task.title, Task.description, Task.status)
+# Matches in the title count double, like weight A over B on Postgres
+TITLE_WEIGHT = 2.0
+SEARCH_INDEX_TTL_SECONDS = 600.0
+TOKEN = re.compile(r"\w+")
+
+# After = (rank, id) of the last hit on the previous page
+After = Optional[Tuple[float, int]]
+
+
+def tokenize(text: Optional[str]) -> List[str]:
+    return TOKEN.findall(text.lower()) if text else []
+
+
+def encode_search_cursor(hit: dict, q: str, user_id: Optional[int]) -> str:
+    # The query and scope are stored so a cursor can't be reused with a different search
+    return encode_payload(
+        {"rank": hit["rank"], "id": hit["id"], "q": q, "user": user_id}
+    )
+
+
+def decode_search_cursor(cursor: str, q: str, user_id: Optional[int]) -> After:
+    payload = decode_payload(cursor)
+    rank, last_id = payload.get("rank"), payload.get("id")
+    if not isinstance(rank, (int, float)) or isinstance(rank, bool):
+        raise invalid_cursor()
+    if not is_id(last_id) or payload.get("q") != q or payload.get("user") != user_id:
+        raise invalid_cursor()
+    return float(rank), last_id
+
+
+def search_statement(q: str, user_id: Optional[int], limit: int, after: After):
+    # Postgres query for one page of hits. 'user_id' None searches the public feed
+    query = func.websearch_to_tsquery(SEARCH_CONFIG, q)
+    # ts_rank_cd returns a real. As float8 the rank in the cursor compares equal to the rows it came from
+    rank = cast(func.ts_rank_cd(SEARCH_VECTOR, query), DOUBLE_PRECISION)
+    stmt = select(*SEARCH_COLUMNS, rank.label("rank")).where(
+        SEARCH_VECTOR.op("@@")(query)
+    )
+    if user_id is not None:
+        stmt = stmt.where(Task.user_id == user_id)
+    if after is not None:
+        last_rank, last_id = after
+        stmt = stmt.where(
+            or_(rank < last_rank, and_(rank == last_rank, Task.id > last_id))
+        )
+    return stmt.order_by(rank.desc(), Task.id).limit(limit)
+
+
+class SearchIndex:  # Inverted index over the tasks of one scope, for databases without full-text search
+    def __init__(self, rows: Iterable[dict]):
+        self.rows: Dict[int, dict] = {}
+        # Term -> task id -> weighted number of occurrences
+        self.postings: Dict[str, Dict[int, float]] = defaultdict(dict)
+        for row in rows:
+            self.rows[row["id"]] = row
+            for weight, text in (
+                (TITLE_WEIGHT, row["title"]),
+                (1.0, row["description"]),
+            ):
+                for term in tokenize(text):
+                    postings = self.postings[term]
+                    postings[row["id"]] = postings.get(row["id"], 0.0) + weight
+
+    def search(self, q: str, limit: int, after: After) -> List[dict]:
+        # Every term has to match, like websearch_to_tsquery without operators
+        terms = set(tokenize(q))
+        if not terms:
+            return []
+        postings = [self.postings.get(term, {}) for term in terms]
+        matching = set.intersection(*(set(p) for p in postings))
+        hits = sorted(
+            (
+                {**self.rows[task_id], "rank": sum(p[task_id] for p in postings)}
+                for task_id in matching
+            ),
+            key=lambda hit: (-hit["rank"], hit["id"]),
+        )
+        if after is not None:
+            last_rank, last_id = after
+            hits = [
+                hit for hit in hits if (-hit["rank"], hit["id"]) > (-last_rank, last_id)
+            ]
+        return hits[:limit]
+
+
+# Scope (user id, None for the public feed) -> (listing state, SearchIndex)
+search_indexes = TTLCache(
+    max_entries=settings.SEARCH_INDEX_MAX_ENTRIES, ttl=SEARCH_INDEX_TTL_SECONDS
+)
+
+
+def scoped(stmt, user_id: Optional[int]):
+    return stmt if user_id is None else stmt.where(Task.user_id == user_id)
+
+
+def search_index(db: Session, user_id: Optional[int]) -> SearchIndex:
+    # Returns the scope's index, rebuilt when a task of the scope was created, updated or deleted
+    state = tuple(db.execute(listing_state(scoped(select(Task.id), user_id))).one())
+    cached = search_indexes.get(user_id)
+    if cached is not None and cached[0] == state:
+        return cached[1]
+    rows = row_dicts(db.connection().execute(scoped(select(*SEARCH_COLUMNS), user_id)))
+    index = SearchIndex(rows)
+    search_indexes.set(user_id, (state, index))
+    return index
+
+
+def invalidate_search_index(user_id: int) -> None:
+    # Called after task writes, for ids SQLite hands out again after the newest task was deleted
+    search_indexes.delete(user_id)
+    search_indexes.delete(None)
+
+
+def search_tasks(
+    db: Session, q: str, user_id: Optional[int], limit: int, after: After
+) -> List[dict]:
+    if db.get_bind().dialect.name == "postgresql":
+        return row_dicts(
+            db.connection().execute(search_statement(q, user_id, limit, after))
+        )
+    return search_index(db, user_id).search(q, limit, after)
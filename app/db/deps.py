@@ -1,13 +1,22 @@
+import secrets
+from typing import Optional, Tuple
+
 from fastapi import Depends, HTTPException, status
 from fastapi.security import HTTPAuthorizationCredentials, HTTPBearer
-from jose import JWTError, jwt
+from sqlalchemy import Row, Select, select
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import Session
 
-from app.auth.auth import ALGORITHM, SECRET_KEY
+from app.auth.auth import InvalidTokenError, decode_access_token
+from app.auth.identity import CurrentUser, cache_user, get_cached_user
+from app.core.config import settings
+from app.db import session as db_session
 from app.db.session import SessionLocal
 from app.models.models import User
 
 bearer_scheme = HTTPBearer()
+# /metrics checks METRICS_TOKEN itself, so a missing header isn't rejected up front
+metrics_bearer_scheme = HTTPBearer(auto_error=False)
 
 
 def get_db():  # Creates new session per request
@@ -18,25 +27,92 @@ def get_db():  # Creates new session per request
         db.close()
 
 
-def get_current_user(  # Returns current user
-    credentials: HTTPAuthorizationCredentials = Depends(bearer_scheme),
-    db: Session = Depends(get_db),
-):
-    token = credentials.credentials
-    credentials_exception = HTTPException(
+# Creates new async session per request. Only available with DB_MODE=async
+async def get_async_db():
+    if db_session.AsyncSessionLocal is None:
+        raise RuntimeError("Async database sessions require DB_MODE=async")
+    async with db_session.AsyncSessionLocal() as db:
+        yield db
+
+
+def credentials_exception() -> HTTPException:
+    return HTTPException(
         status_code=status.HTTP_401_UNAUTHORIZED,
         detail="Could not validate credentials",
         headers={"WWW-Authenticate": "Bearer"},
     )
+
+
+def resolve_token(token: str) -> Tuple[str, Optional[CurrentUser]]:
+    # Returns the token's username and the user if it is known without a database query
     try:
-        payload = jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM])
-        username: str = payload.get("sub")
-        if username is None:
-            raise credentials_exception
-    except JWTError:
-        raise credentials_exception
-
-    user = db.query(User).filter(User.username == username).first()
+        payload = decode_access_token(token)
+    except InvalidTokenError:
+        raise credentials_exception()
+    username: Optional[str] = payload.get("sub")
+    if username is None:
+        raise credentials_exception()
+
+    user_id = payload.get("uid")
+    if settings.AUTH_TRUST_TOKEN_USER_ID and isinstance(user_id, int):
+        return username, CurrentUser(id=user_id, username=username)
+    return username, get_cached_user(username)
+
+
+def user_lookup(username: str) -> Select:
+    # Reads only the columns of the snapshot, not the whole User
+    return select(User.id, User.username).where(User.username == username)
+
+
+# Caches the user found by the database lookup
+def _remember_user(user: Optional[Row]) -> CurrentUser:
     if user is None:
-        raise credentials_exception
-    return user
+        raise credentials_exception()
+    current_user = CurrentUser(id=user.id, username=user.username)
+    cache_user(current_user)
+    return current_user
+
+
+def get_current_user(  # Returns snapshot of current user. Database is only queried on a cache miss
+    credentials: HTTPAuthorizationCredentials = Depends(bearer_scheme),
+    db: Session = Depends(get_db),
+) -> CurrentUser:
+    username, current_user = resolve_token(credentials.credentials)
+    if current_user is not None:
+        return current_user
+    user = db.execute(user_lookup(username)).first()
+    return _remember_user(user)
+
+
+async def get_current_user_async(  # Async version of get_current_user
+    credentials: HTTPAuthorizationCredentials = Depends(bearer_scheme),
+    db: AsyncSession = Depends(get_async_db),
+) -> CurrentUser:
+    username, current_user = resolve_token(credentials.credentials)
+    if current_user is not None:
+        return current_user
+    user = (await db.execute(user_lookup(username))).first()
+    return _remember_user(user)
+
+
+def get_current_admin(  # Returns the current user if they are listed in ADMIN_USERNAMES
+    current_user: CurrentUser = Depends(get_current_user),
+) -> CurrentUser:
+    if current_user.username not in settings.ADMIN_USERNAMES:
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN, detail="Admin access required"
+        )
+    return current_user
+
+
+def check_metrics_token(  # Requires METRICS_TOKEN as bearer token when it is set. A static token, unlike expiring JWTs
+    credentials: Optional[HTTPAuthorizationCredentials] = Depends(
+        metrics_bearer_scheme
+    ),
+) -> None:
+    if settings.METRICS_TOKEN is None:
+        return
+    if credentials is None or not secrets.compare_digest(
+        credentials.credentials.encode(), settings.METRICS_TOKEN.encode()
+    ):
+        raise credentials_exception()
@@ -0,0 +1,38 @@
+from pathlib import Path
+
+from alembic import command
+from alembic.config import Config
+from sqlalchemy import inspect, text
+from sqlalchemy.engine import Engine
+
+"""
+Runs the Alembic migrations in app/db/migrations. Replaces Base.metadata.create_all so indexes and later schema
+changes reach databases that already exist. Databases made by create_all before migrations existed are stamped with
+the initial revision first so their tables aren't created twice.
+"""
+
+MIGRATIONS_DIR = Path(__file__).parent / "migrations"
+BASELINE_REVISION = "0001"  # Schema create_all used to build
+# Arbitrary. Serializes workers that start at the same time on Postgres
+MIGRATION_LOCK_ID = 7_270_001
+
+
+# Works without alembic.ini so the app image only needs the app package
+def alembic_config() -> Config:
+    config = Config()
+    config.set_main_option("script_location", str(MIGRATIONS_DIR))
+    return config
+
+
+def upgrade_database(engine: Engine, revision: str = "head") -> None:
+    config = alembic_config()
+    with engine.begin() as connection:
+        if connection.dialect.name == "postgresql":
+            connection.execute(
+                text("SELECT pg_advisory_xact_lock(:id)"), {"id": MIGRATION_LOCK_ID}
+            )
+        config.attributes["connection"] = connection
+        inspector = inspect(connection)
+        if inspector.has_table("tasks") and not inspector.has_table("alembic_version"):
+            command.stamp(config, BASELINE_REVISION)
+        command.upgrade(config, revision)
@@ -0,0 +1,51 @@
+from logging.config import fileConfig
+
+from alembic import context
+from sqlalchemy import create_engine
+
+from app.db.session import DATABASE_URL, Base
+from app.models import models  # Registers the tables on Base.metadata
+
+config = context.config
+if config.config_file_name is not None:  # Only set when run from the alembic CLI
+    fileConfig(config.config_file_name)
+
+target_metadata = Base.metadata
+
+
+# Writes SQL to stdout instead of running it ('alembic upgrade head --sql')
+def run_migrations_offline():
+    context.configure(
+        url=DATABASE_URL, target_metadata=target_metadata, literal_binds=True
+    )
+    with context.begin_transaction():
+        context.run_migrations()
+
+
+def run_migrations_online():
+    # app.db.migrations.upgrade_database passes its own connection. The CLI connects with DATABASE_URL
+    connection = config.attributes.get("connection")
+    if connection is not None:
+        _run_with_connection(connection)
+        return
+    engine = create_engine(DATABASE_URL)
+    with engine.connect() as connection:
+        _run_with_connection(connection)
+    engine.dispose()
+
+
+def _run_with_connection(connection):
+    context.configure(
+        connection=connection,
+        target_metadata=target_metadata,
+        # SQLite can't ALTER most things in place
+        render_as_batch=connection.dialect.name == "sqlite",
+    )
+    with context.begin_transaction():
+        context.run_migrations()
+
+
+if context.is_offline_mode():
+    run_migrations_offline()
+else:
+    run_migrations_online()
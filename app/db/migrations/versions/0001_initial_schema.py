@@ -0,0 +1,52 @@
+"""Initial users and tasks tables (what Base.metadata.create_all used to build)
+
+Revision ID: 0001
+Revises:
+Create Date: 2026-10-17
+"""
+
+import sqlalchemy as sa
+from alembic import op
+
+revision = "0001"
+down_revision = None
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table(
+        "users",
+        sa.Column("id", sa.Integer(), primary_key=True),
+        sa.Column("first_name", sa.String(), nullable=False),
+        sa.Column("last_name", sa.Text(), nullable=True),
+        sa.Column("username", sa.String(), nullable=False),
+        sa.Column("password", sa.String(), nullable=False),
+    )
+    op.create_index("ix_users_id", "users", ["id"])
+    op.create_index("ix_users_username", "users", ["username"], unique=True)
+
+    op.create_table(
+        "tasks",
+        sa.Column("id", sa.Integer(), primary_key=True),
+        sa.Column("title", sa.String(), nullable=False),
+        sa.Column("description", sa.Text(), nullable=True),
+        sa.Column(
+            "status",
+            sa.Enum("new", "in_progress", "completed", name="taskstatus"),
+            nullable=True,
+        ),
+        sa.Column(
+            "user_id", sa.Integer(), sa.ForeignKey("users.id", ondelete="CASCADE")
+        ),
+    )
+    op.create_index("ix_tasks_id", "tasks", ["id"])
+
+
+def downgrade():
+    op.drop_index("ix_tasks_id", table_name="tasks")
+    op.drop_table("tasks")
+    op.drop_index("ix_users_username", table_name="users")
+    op.drop_index("ix_users_id", table_name="users")
+    op.drop_table("users")
+    sa.Enum(name="taskstatus").drop(op.get_bind(), checkfirst=True)
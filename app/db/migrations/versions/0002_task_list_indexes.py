@@ -0,0 +1,41 @@
+"""Composite indexes for the task listings
+
+Every listing filters on user_id and/or status and pages in id order. Without these indexes Postgres scans the whole
+tasks table and sorts it for every page.
+
+    /tasks                    WHERE user_id = ? ORDER BY id               -> ix_tasks_user_id_id
+    /tasks?status=            WHERE user_id = ? AND status = ? ORDER BY id -> ix_tasks_user_id_status_id
+    /tasks/public?status=     WHERE status = ? ORDER BY id                -> ix_tasks_status_id
+    /tasks/public             ORDER BY id                                 -> primary key
+
+Revision ID: 0002
+Revises: 0001
+Create Date: 2026-10-17
+"""
+
+from alembic import op
+
+revision = "0002"
+down_revision = "0001"
+branch_labels = None
+depends_on = None
+
+
+# if_not_exists because databases stamped from create_all may already have them
+def upgrade():
+    op.create_index(
+        "ix_tasks_user_id_id", "tasks", ["user_id", "id"], if_not_exists=True
+    )
+    op.create_index(
+        "ix_tasks_user_id_status_id",
+        "tasks",
+        ["user_id", "status", "id"],
+        if_not_exists=True,
+    )
+    op.create_index("ix_tasks_status_id", "tasks", ["status", "id"], if_not_exists=True)
+
+
+def downgrade():
+    op.drop_index("ix_tasks_status_id", table_name="tasks")
+    op.drop_index("ix_tasks_user_id_status_id", table_name="tasks")
+    op.drop_index("ix_tasks_user_id_id", table_name="tasks")
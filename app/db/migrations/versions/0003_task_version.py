@@ -0,0 +1,34 @@
+"""Task version column for ETags and If-Match
+
+Every UPDATE of a task sets version = version + 1. GET /tasks/{id} returns it in a strong ETag and PUT compares it with
+If-Match, so clients get optimistic concurrency without row locks.
+
+Revision ID: 0003
+Revises: 0002
+Create Date: 2026-10-17
+"""
+
+import sqlalchemy as sa
+from alembic import op
+
+revision = "0003"
+down_revision = "0002"
+branch_labels = None
+depends_on = None
+
+
+# Databases stamped from create_all may already have the column
+def upgrade():
+    columns = {
+        column["name"] for column in sa.inspect(op.get_bind()).get_columns("tasks")
+    }
+    if "version" not in columns:
+        op.add_column(
+            "tasks",
+            sa.Column("version", sa.Integer(), nullable=False, server_default="1"),
+        )
+
+
+def downgrade():
+    with op.batch_alter_table("tasks") as batch_op:
+        batch_op.drop_column("version")
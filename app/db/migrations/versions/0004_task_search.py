@@ -0,0 +1,43 @@
+"""Full-text search column and GIN index on tasks
+
+A stored generated tsvector of title (weight A) and description (weight B) backs GET /tasks/search. Postgres only,
+SQLite databases use the in-process index in app.crud.search. Adding the column rewrites the tasks table, so run it
+in a maintenance window on large databases.
+
+Revision ID: 0004
+Revises: 0003
+Create Date: 2026-10-17
+"""
+
+from alembic import op
+
+revision = "0004"
+down_revision = "0003"
+branch_labels = None
+depends_on = None
+
+SEARCH_VECTOR_SQL = (
+    "setweight(to_tsvector('english', coalesce(title, '')), 'A') || "
+    "setweight(to_tsvector('english', coalesce(description, '')), 'B')"
+)
+
+
+# IF NOT EXISTS because databases stamped from create_all already have both
+def upgrade():
+    if op.get_bind().dialect.name != "postgresql":
+        return
+    op.execute(
+        "ALTER TABLE tasks ADD COLUMN IF NOT EXISTS search_vector tsvector "
+        f"GENERATED ALWAYS AS ({SEARCH_VECTOR_SQL}) STORED"
+    )
+    op.execute(
+        "CREATE INDEX IF NOT EXISTS ix_tasks_search_vector "
+        "ON tasks USING gin (search_vector)"
+    )
+
+
+def downgrade():
+    if op.get_bind().dialect.name != "postgresql":
+        return
+    op.execute("DROP INDEX IF EXISTS ix_tasks_search_vector")
+    op.execute("ALTER TABLE tasks DROP COLUMN IF EXISTS search_vector")
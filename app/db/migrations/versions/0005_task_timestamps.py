@@ -0,0 +1,67 @@
+"""Task created_at/updated_at and the indexes for sorting and filtering on them
+
+The listings accept sort=created_at|updated_at (optionally descending) and created_after/updated_after. Each sort is
+read in index order, with the *_after filter as a range on the same index:
+
+    /tasks?sort=created_at&created_after=     WHERE user_id = ? AND created_at > ? ORDER BY created_at, id
+                                              -> ix_tasks_user_id_created_at_id
+    /tasks/public?sort=-updated_at            ORDER BY updated_at DESC, id DESC -> ix_tasks_updated_at_id
+
+Existing tasks get the migration's time for both columns.
+
+Revision ID: 0005
+Revises: 0004
+Create Date: 2026-10-17
+"""
+
+from datetime import datetime, timezone
+
+import sqlalchemy as sa
+from alembic import op
+
+revision = "0005"
+down_revision = "0004"
+branch_labels = None
+depends_on = None
+
+TIMESTAMP_COLUMNS = ("created_at", "updated_at")
+INDEXES = {
+    "ix_tasks_user_id_created_at_id": ["user_id", "created_at", "id"],
+    "ix_tasks_user_id_updated_at_id": ["user_id", "updated_at", "id"],
+    "ix_tasks_created_at_id": ["created_at", "id"],
+    "ix_tasks_updated_at_id": ["updated_at", "id"],
+}
+
+
+# Databases stamped from create_all may already have the columns and indexes
+def upgrade():
+    columns = {
+        column["name"] for column in sa.inspect(op.get_bind()).get_columns("tasks")
+    }
+    missing = [name for name in TIMESTAMP_COLUMNS if name not in columns]
+    if missing:
+        for name in missing:
+            op.add_column(
+                "tasks", sa.Column(name, sa.DateTime(timezone=True), nullable=True)
+            )
+        # Bound through the column type instead of a server default so SQLite stores the format the app writes
+        tasks = sa.table(
+            "tasks", *(sa.column(name, sa.DateTime(timezone=True)) for name in missing)
+        )
+        now = datetime.now(timezone.utc)
+        op.execute(tasks.update().values({name: now for name in missing}))
+        with op.batch_alter_table("tasks") as batch_op:
+            for name in missing:
+                batch_op.alter_column(
+                    name, existing_type=sa.DateTime(timezone=True), nullable=False
+                )
+    for name, index_columns in INDEXES.items():
+        op.create_index(name, "tasks", index_columns, if_not_exists=True)
+
+
+def downgrade():
+    for name in reversed(INDEXES):
+        op.drop_index(name, table_name="tasks")
+    with op.batch_alter_table("tasks") as batch_op:
+        for name in reversed(TIMESTAMP_COLUMNS):
+            batch_op.drop_column(name)
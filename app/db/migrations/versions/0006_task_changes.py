@@ -0,0 +1,131 @@
+"""Task change sequence and tombstones for incremental sync
+
+GET /tasks/changes returns the tasks written and deleted after a client's watermark. Every insert and update of a task
+sets change_seq to the next value of one sequence shared by all tasks and change_xid to the writing transaction, and
+the tasks_tombstone trigger records each deleted task in task_tombstones with its own values:
+
+    /tasks/changes?since=   WHERE user_id = ? AND (change_xid, change_seq, id) > (?, ?, ?) AND change_xid < ?
+                            ORDER BY change_xid, change_seq, id
+                            -> ix_tasks_user_id_change_xid_change_seq_id,
+                               ix_task_tombstones_user_id_change_xid_change_seq_task_id
+
+On Postgres the values come from the task_change_seq sequence, so writers don't wait for each other, and readers stop
+at the oldest running transaction (pg_snapshot_xmin), see app.crud.changes. Postgres 13 or later is needed for
+pg_current_xact_id. On SQLite, which has one writer at a time, the next value is the highest one handed out plus one
+and change_xid stays 0. Existing tasks get change_seq = id and change_xid = 0.
+
+SQLite batch operations copy tasks into a new table, which drops its triggers. A later migration that batch-alters
+tasks has to create tasks_tombstone again.
+
+Revision ID: 0006
+Revises: 0005
+Create Date: 2026-10-17
+"""
+
+import sqlalchemy as sa
+from alembic import op
+
+revision = "0006"
+down_revision = "0005"
+branch_labels = None
+depends_on = None
+
+TRIGGER_SQL = {
+    "sqlite": [
+        "CREATE TRIGGER IF NOT EXISTS tasks_tombstone BEFORE DELETE ON tasks BEGIN "
+        "INSERT INTO task_tombstones (task_id, user_id, change_seq) "
+        "VALUES (OLD.id, OLD.user_id, (SELECT coalesce(max(seq), 0) FROM ("
+        "SELECT max(change_seq) AS seq FROM tasks "
+        "UNION ALL SELECT max(change_seq) FROM task_tombstones) AS latest) + 1); END",
+    ],
+    "postgresql": [
+        "CREATE SEQUENCE IF NOT EXISTS task_change_seq",
+        # Continues after the values stored so far. is_called = false: nextval returns exactly this value
+        "SELECT setval('task_change_seq', greatest("
+        "(SELECT max(change_seq) FROM tasks), "
+        "(SELECT max(change_seq) FROM task_tombstones), 0) + 1, false)",
+        "CREATE OR REPLACE FUNCTION record_task_tombstone() RETURNS trigger "
+        "LANGUAGE plpgsql AS $$ BEGIN "
+        "INSERT INTO task_tombstones (task_id, user_id, change_seq, change_xid) "
+        "VALUES (OLD.id, OLD.user_id, nextval('task_change_seq'), "
+        "pg_current_xact_id()::text::bigint); RETURN OLD; END $$",
+        "DROP TRIGGER IF EXISTS tasks_tombstone ON tasks",
+        "CREATE TRIGGER tasks_tombstone BEFORE DELETE ON tasks "
+        "FOR EACH ROW EXECUTE FUNCTION record_task_tombstone()",
+    ],
+}
+
+
+# Databases stamped from create_all may already have the table, column, indexes and trigger
+def upgrade():
+    inspector = sa.inspect(op.get_bind())
+    if not inspector.has_table("task_tombstones"):
+        op.create_table(
+            "task_tombstones",
+            sa.Column("id", sa.Integer(), primary_key=True),
+            sa.Column("task_id", sa.Integer(), nullable=False),
+            sa.Column("user_id", sa.Integer(), nullable=False),
+            sa.Column("change_seq", sa.BigInteger(), nullable=False),
+            sa.Column(
+                "change_xid", sa.BigInteger(), nullable=False, server_default="0"
+            ),
+            sa.Column(
+                "deleted_at",
+                sa.DateTime(timezone=True),
+                nullable=False,
+                server_default=sa.func.now(),
+            ),
+        )
+    columns = {column["name"] for column in inspector.get_columns("tasks")}
+    if "change_seq" not in columns:
+        op.add_column("tasks", sa.Column("change_seq", sa.BigInteger(), nullable=True))
+        op.execute("UPDATE tasks SET change_seq = id")
+        with op.batch_alter_table("tasks") as batch_op:
+            batch_op.alter_column(
+                "change_seq", existing_type=sa.BigInteger(), nullable=False
+            )
+    if "change_xid" not in columns:
+        op.add_column(
+            "tasks",
+            sa.Column(
+                "change_xid", sa.BigInteger(), nullable=False, server_default="0"
+            ),
+        )
+    op.create_index(
+        "ix_tasks_user_id_change_xid_change_seq_id",
+        "tasks",
+        ["user_id", "change_xid", "change_seq", "id"],
+        if_not_exists=True,
+    )
+    op.create_index("ix_tasks_change_seq", "tasks", ["change_seq"], if_not_exists=True)
+    op.create_index(
+        "ix_task_tombstones_user_id_change_xid_change_seq_task_id",
+        "task_tombstones",
+        ["user_id", "change_xid", "change_seq", "task_id"],
+        if_not_exists=True,
+    )
+    op.create_index(
+        "ix_task_tombstones_change_seq",
+        "task_tombstones",
+        ["change_seq"],
+        if_not_exists=True,
+    )
+    for statement in TRIGGER_SQL.get(op.get_bind().dialect.name, []):
+        op.execute(statement)
+
+
+def downgrade():
+    dialect = op.get_bind().dialect.name
+    op.execute(
+        "DROP TRIGGER IF EXISTS tasks_tombstone"
+        + (" ON tasks" if dialect == "postgresql" else "")
+    )
+    if dialect == "postgresql":
+        op.execute("DROP FUNCTION IF EXISTS record_task_tombstone()")
+        op.execute("DROP SEQUENCE IF EXISTS task_change_seq")
+    op.drop_index("ix_tasks_change_seq", table_name="tasks")
+    op.drop_index("ix_tasks_user_id_change_xid_change_seq_id", table_name="tasks")
+    with op.batch_alter_table("tasks") as batch_op:
+        batch_op.drop_column("change_xid")
+        batch_op.drop_column("change_seq")
+    op.drop_table("task_tombstones")
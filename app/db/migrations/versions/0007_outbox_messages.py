@@ -0,0 +1,48 @@
+"""Outbox for the side effects of task writes
+
+Task writes insert their side effects into outbox_messages in the same transaction, and the outbox worker of every
+process claims the due messages in batches, oldest first:
+
+    claim   WHERE available_at <= ? ORDER BY available_at, id LIMIT ? -> ix_outbox_messages_available_at_id
+
+available_at is NULL for messages that failed OUTBOX_MAX_ATTEMPTS times, so the claims never read them.
+
+Revision ID: 0007
+Revises: 0006
+Create Date: 2026-10-17
+"""
+
+import sqlalchemy as sa
+from alembic import op
+
+revision = "0007"
+down_revision = "0006"
+branch_labels = None
+depends_on = None
+
+
+# Databases stamped from create_all may already have the table and index
+def upgrade():
+    if not sa.inspect(op.get_bind()).has_table("outbox_messages"):
+        op.create_table(
+            "outbox_messages",
+            sa.Column("id", sa.Integer(), primary_key=True),
+            sa.Column("topic", sa.String(), nullable=False),
+            sa.Column("payload", sa.JSON(), nullable=False),
+            sa.Column("attempts", sa.Integer(), nullable=False),
+            sa.Column("available_at", sa.DateTime(timezone=True), nullable=True),
+            sa.Column("created_at", sa.DateTime(timezone=True), nullable=False),
+            sa.Column("failed_at", sa.DateTime(timezone=True), nullable=True),
+            sa.Column("last_error", sa.Text(), nullable=True),
+        )
+    op.create_index(
+        "ix_outbox_messages_available_at_id",
+        "outbox_messages",
+        ["available_at", "id"],
+        if_not_exists=True,
+    )
+
+
+def downgrade():
+    op.drop_index("ix_outbox_messages_available_at_id", table_name="outbox_messages")
+    op.drop_table("outbox_messages")
@@ -0,0 +1,32 @@
+"""Index for pruning task tombstones
+
+Tombstones are kept for TOMBSTONE_RETENTION_DAYS, so /tasks/changes can report deletions to clients that sync within
+that window. Every worker deletes the older ones periodically:
+
+    prune   DELETE FROM task_tombstones WHERE deleted_at < ?   -> ix_task_tombstones_deleted_at
+
+Revision ID: 0008
+Revises: 0007
+Create Date: 2026-10-17
+"""
+
+from alembic import op
+
+revision = "0008"
+down_revision = "0007"
+branch_labels = None
+depends_on = None
+
+
+# Databases stamped from create_all may already have the index
+def upgrade():
+    op.create_index(
+        "ix_task_tombstones_deleted_at",
+        "task_tombstones",
+        ["deleted_at"],
+        if_not_exists=True,
+    )
+
+
+def downgrade():
+    op.drop_index("ix_task_tombstones_deleted_at", table_name="task_tombstones")
@@ -0,0 +1,121 @@
+import logging
+import threading
+import time
+from bisect import bisect_left
+from typing import Any, Dict, Optional
+
+from sqlalchemy import exc
+from sqlalchemy.engine import Engine, make_url
+from sqlalchemy.pool import QueuePool
+
+from app.core.config import settings
+
+"""
+Connection pool settings and statistics. Pool size, overflow, timeout, recycle and pre-ping come from Settings so
+pools can be sized against the number of uvicorn workers and PgBouncer. InstrumentedQueuePool records how long each
+checkout waited so saturation shows up in /db/pool and in the logs before requests start failing.
+"""
+
+logger = logging.getLogger(__name__)
+
+WAIT_BUCKETS = (0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+
+# Thread-safe counters and wait time histogram for connection checkouts
+class PoolStats:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.reset()
+
+    def reset(self) -> None:
+        with self._lock:
+            self.checkouts = 0
+            self.timeouts = 0
+            self.wait_seconds_sum = 0.0
+            self.wait_seconds_max = 0.0
+            self.bucket_counts = [0] * (len(WAIT_BUCKETS) + 1)  # Last bucket is +Inf
+
+    def record_checkout(self, waited: float) -> None:
+        with self._lock:
+            self.checkouts += 1
+            self.wait_seconds_sum += waited
+            self.wait_seconds_max = max(self.wait_seconds_max, waited)
+            self.bucket_counts[bisect_left(WAIT_BUCKETS, waited)] += 1
+
+    def record_timeout(self) -> None:
+        with self._lock:
+            self.timeouts += 1
+
+    def as_dict(self) -> dict:
+        with self._lock:
+            cumulative, histogram = 0, {}
+            for bound, count in zip(WAIT_BUCKETS + ("+Inf",), self.bucket_counts):
+                cumulative += count
+                histogram[str(bound)] = cumulative
+            return {
+                "checkouts": self.checkouts,
+                "timeouts": self.timeouts,
+                "wait_seconds_sum": round(self.wait_seconds_sum, 6),
+                "wait_seconds_max": round(self.wait_seconds_max, 6),
+                "wait_seconds_histogram": histogram,  # Cumulative counts per upper bound
+            }
+
+
+pool_stats = PoolStats()
+
+
+class InstrumentedQueuePool(QueuePool):  # QueuePool that times every checkout
+    def _do_get(self):
+        start = time.perf_counter()
+        try:
+            connection = super()._do_get()
+        except exc.TimeoutError:
+            pool_stats.record_timeout()
+            logger.error("Connection pool exhausted: %s", describe_pool(self))
+            raise
+        waited = time.perf_counter() - start
+        pool_stats.record_checkout(waited)
+        if waited >= settings.DB_POOL_SLOW_CHECKOUT_SECONDS:
+            logger.warning(
+                "Waited %.3fs for a database connection: %s",
+                waited,
+                describe_pool(self),
+            )
+        return connection
+
+
+def pool_options(url: str, instrumented: bool = True) -> dict:
+    # Keyword arguments for create_engine/create_async_engine. In-memory SQLite keeps its single connection pool
+    options: Dict[str, Any] = {"pool_pre_ping": settings.DB_POOL_PRE_PING}
+    parsed = make_url(url)
+    in_memory = parsed.database in (None, "", ":memory:")
+    if parsed.get_backend_name() == "sqlite" and in_memory:
+        return options
+    options.update(
+        pool_size=settings.DB_POOL_SIZE,
+        max_overflow=settings.DB_MAX_OVERFLOW,
+        pool_timeout=settings.DB_POOL_TIMEOUT,
+        pool_recycle=settings.DB_POOL_RECYCLE,
+    )
+    if instrumented:  # Async engines need their own adapted pool class
+        options["poolclass"] = InstrumentedQueuePool
+    return options
+
+
+def describe_pool(pool) -> Optional[dict]:
+    # Current usage of a QueuePool. None for pool classes that don't keep a size (e.g. NullPool)
+    if not isinstance(pool, QueuePool):
+        return None
+    return {
+        "size": pool.size(),
+        "checked_out": pool.checkedout(),
+        "checked_in": pool.checkedin(),
+        "overflow": max(pool.overflow(), 0),
+        "max_overflow": pool._max_overflow,
+        "timeout": pool.timeout(),
+    }
+
+
+# Current pool usage plus checkout statistics since start
+def pool_snapshot(engine: Engine) -> dict:
+    return {"pool": describe_pool(engine.pool), "stats": pool_stats.as_dict()}
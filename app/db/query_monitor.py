@@ -0,0 +1,113 @@
+import logging
+import time
+from collections import Counter
+from contextvars import ContextVar
+from typing import Callable, List, Optional
+
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+from app.core.config import settings
+
+"""
+Statement monitoring on the engines. Every statement is timed through cursor events. Statements slower than
+DB_SLOW_QUERY_SECONDS are logged with their parameters and the route that ran them. Within a request the statements are
+counted in a RequestQueries, and one statement repeated DB_REPEATED_QUERY_THRESHOLD times is logged as a likely N+1
+(e.g. a lazy load of Task.owner per row). The request context is set by QueryMonitorMiddleware, whether or not metrics
+are enabled, and the test suite reads finished requests through request_observers to enforce statement budgets.
+"""
+
+logger = logging.getLogger(__name__)
+
+MAX_LOGGED_PARAMETERS_LENGTH = 500  # Long parameter lists (bulk inserts) are cut
+
+
+class RequestQueries:  # Statements of one request. Mutated from the request's threads
+    __slots__ = ("method", "route", "count", "seconds", "statements", "repeated")
+
+    def __init__(self, method: str = "", route: str = ""):
+        self.method = method
+        self.route = route
+        self.count = 0
+        self.seconds = 0.0
+        self.statements: Counter = Counter()  # SQL text -> executions
+        self.repeated: List[str] = []  # Statements that reached the N+1 threshold
+
+    @property
+    def endpoint(self) -> str:
+        return f"{self.method} {self.route}"
+
+
+# Set by QueryMonitorMiddleware. Threadpool endpoints get a copy of the context, which holds the same RequestQueries object
+current_queries: ContextVar[Optional[RequestQueries]] = ContextVar(
+    "current_queries", default=None
+)
+
+# Called with every finished request's RequestQueries, e.g. by the statement budget check of the tests
+request_observers: List[Callable[[RequestQueries], None]] = []
+
+
+def _format_parameters(parameters) -> str:
+    if not settings.DB_SLOW_QUERY_LOG_PARAMETERS:
+        return "<hidden>"
+    text = repr(parameters)
+    if len(text) > MAX_LOGGED_PARAMETERS_LENGTH:
+        text = text[:MAX_LOGGED_PARAMETERS_LENGTH] + "..."
+    return text
+
+
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    conn.info.setdefault("query_started_at", []).append(
+        (statement, time.perf_counter())
+    )
+
+
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    elapsed = time.perf_counter() - conn.info["query_started_at"].pop()[1]
+    queries = current_queries.get()
+    slow = settings.DB_SLOW_QUERY_SECONDS
+    if slow and elapsed >= slow:
+        logger.warning(
+            "Slow query (%.3fs) in %s: %s parameters=%s",
+            elapsed,
+            queries.endpoint if queries is not None else "no request",
+            statement,
+            _format_parameters(parameters),
+        )
+    if queries is None:
+        return
+    queries.count += 1
+    queries.seconds += elapsed
+    queries.statements[statement] += 1
+    threshold = settings.DB_REPEATED_QUERY_THRESHOLD
+    # Logged once, when the statement reaches the threshold
+    if threshold and queries.statements[statement] == threshold:
+        queries.repeated.append(statement)
+        logger.warning(
+            "Statement repeated %d times in %s, likely N+1: %s",
+            threshold,
+            queries.endpoint,
+            statement,
+        )
+
+
+def _handle_error(exception_context):
+    # A failed statement never reaches after_cursor_execute. Drops its start time so the connection's stack doesn't grow
+    conn = exception_context.connection
+    started = conn.info.get("query_started_at") if conn is not None else None
+    # Errors raised before the cursor ran (e.g. on connect) have no entry
+    if started and started[-1][0] == exception_context.statement:
+        started.pop()
+
+
+def monitor_queries(engine: Engine) -> None:
+    # Adds the cursor event listeners once. Pass async_engine.sync_engine for async engines
+    if not event.contains(engine, "before_cursor_execute", _before_cursor_execute):
+        event.listen(engine, "before_cursor_execute", _before_cursor_execute)
+        event.listen(engine, "after_cursor_execute", _after_cursor_execute)
+        event.listen(engine, "handle_error", _handle_error)
+
+
+def finish_request(queries: RequestQueries) -> None:
+    for observer in request_observers:
+        observer(queries)
@@ -2,9 +2,15 @@ import os
 
 from dotenv import load_dotenv
 from sqlalchemy import create_engine
+from sqlalchemy.engine import make_url
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.orm import sessionmaker
 
+from app.core.config import settings
+from app.db.pool import pool_options
+from app.db.query_monitor import monitor_queries
+
 load_dotenv()
 
 POSTGRES_USER = os.getenv("POSTGRES_USER")
@@ -19,7 +25,34 @@ DATABASE_URL = os.getenv(
     f"postgresql://{POSTGRES_USER}:{POSTGRES_PASSWORD}@{POSTGRES_HOST}:{POSTGRES_PORT}/{POSTGRES_DB}"
 )
 
-engine = create_engine(DATABASE_URL)
+engine = create_engine(DATABASE_URL, **pool_options(DATABASE_URL))
+monitor_queries(engine)
 
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 Base = declarative_base()  # Created only once
+
+ASYNC_DRIVERS = {"postgresql": "postgresql+asyncpg", "sqlite": "sqlite+aiosqlite"}
+
+
+# Swaps the sync driver in a database url for its async counterpart
+def make_async_url(url: str) -> str:
+    parsed = make_url(url)
+    backend = parsed.get_backend_name()
+    if backend not in ASYNC_DRIVERS:
+        raise ValueError(f"No async driver configured for '{backend}' databases")
+    return parsed.set(drivername=ASYNC_DRIVERS[backend]).render_as_string(
+        hide_password=False
+    )
+
+
+async_engine = None
+AsyncSessionLocal = None
+# Async drivers are only imported when async mode is used
+if settings.DB_MODE == "async":
+    async_engine = create_async_engine(
+        make_async_url(DATABASE_URL), **pool_options(DATABASE_URL, instrumented=False)
+    )
+    monitor_queries(async_engine.sync_engine)
+    AsyncSessionLocal = async_sessionmaker(
+        async_engine, autoflush=False, expire_on_commit=False
+    )
@@ -1,22 +1,51 @@
 from fastapi import FastAPI
+from fastapi.responses import JSONResponse, ORJSONResponse
 from fastapi.staticfiles import StaticFiles
 from starlette.responses import RedirectResponse
 
+from app.api.routes import admin_router
 from app.api.routes import router as hello_router
 from app.auth.routes_auth import router as auth_router
+from app.auth.routes_auth_async import router as async_auth_router
+from app.core.config import settings
+from app.core.lifespan import lifespan
+from app.core.metrics import MetricsMiddleware, QueryMonitorMiddleware
 from app.crud.routes_tasks import router as tasks_router
-from app.db.session import engine
-from app.models.models import Base
+from app.crud.routes_tasks_async import router as async_tasks_router
+from app.crud.routes_tasks_bulk import router as bulk_tasks_router
+from app.crud.routes_tasks_changes import router as changes_tasks_router
+from app.crud.routes_tasks_export import router as export_tasks_router
+from app.crud.routes_tasks_search import router as search_tasks_router
+from app.crud.routes_tasks_stream import router as stream_tasks_router
 
-Base.metadata.create_all(bind=engine)
+# orjson renders large task pages several times faster than the stdlib encoder
+RESPONSE_CLASSES = {"json": JSONResponse, "orjson": ORJSONResponse}
 
-app = FastAPI()
+# Migrations and pool warm-up run in the lifespan handler, not at import
+app = FastAPI(
+    default_response_class=RESPONSE_CLASSES[settings.JSON_RESPONSE], lifespan=lifespan
+)
 
 app.mount("/static", StaticFiles(directory="app/static", html=True), name="static")
 
+# Async routes are matched first and shadow their sync versions. The other task routers are sync only, see README
+if settings.DB_MODE == "async":
+    app.include_router(async_auth_router, prefix="/auth", tags=["auth"])
+    app.include_router(async_tasks_router, prefix="/tasks", tags=["tasks"])
 app.include_router(auth_router, prefix="/auth", tags=["auth"])
 app.include_router(tasks_router, prefix="/tasks", tags=["tasks"])
+app.include_router(bulk_tasks_router, prefix="/tasks", tags=["tasks"])
+app.include_router(export_tasks_router, prefix="/tasks", tags=["tasks"])
+app.include_router(search_tasks_router, prefix="/tasks", tags=["tasks"])
+app.include_router(changes_tasks_router, prefix="/tasks", tags=["tasks"])
+app.include_router(stream_tasks_router, prefix="/tasks", tags=["tasks"])
 app.include_router(hello_router)
+app.include_router(admin_router)
+
+if settings.METRICS_ENABLED:
+    app.add_middleware(MetricsMiddleware, router=app.router)
+# Added last so it runs first: sets the request context the query monitor uses for routes, N+1 warnings and metrics
+app.add_middleware(QueryMonitorMiddleware, router=app.router)
 
 
 @app.get("/", include_in_schema=False)  # Reroutes empty path to login.html
@@ -1,11 +1,64 @@
 import enum
+from datetime import datetime, timezone
 
-from sqlalchemy import Column, Enum, ForeignKey, Integer, String, Text
+from sqlalchemy import (DDL, JSON, BigInteger, Column, DateTime, Enum,
+                        ForeignKey, Index, Integer, Sequence, String, Text,
+                        event, func)
+from sqlalchemy.ext.compiler import compiles
 from sqlalchemy.orm import relationship
+from sqlalchemy.sql.functions import FunctionElement
 
 from app.db.session import Base
 
 
+def utcnow() -> datetime:
+    return datetime.now(timezone.utc)
+
+
+# Postgres only, created and dropped with the other tables. Writers take values without waiting for each other
+TASK_CHANGE_SEQUENCE = Sequence("task_change_seq", metadata=Base.metadata)
+
+
+class next_change_seq(
+    FunctionElement
+):  # Next value of the change sequence of tasks, rendered inline in the write
+    type = BigInteger()
+    inherit_cache = True
+
+
+@compiles(next_change_seq)
+def _next_change_seq(element, compiler, **kw):
+    # SQLite runs one write transaction at a time, so the highest value handed out, including deleted tasks, plus one
+    # is unique and in commit order
+    return (
+        "((SELECT coalesce(max(seq), 0) FROM ("
+        "SELECT max(change_seq) AS seq FROM tasks "
+        "UNION ALL SELECT max(change_seq) FROM task_tombstones) AS latest) + 1)"
+    )
+
+
+@compiles(next_change_seq, "postgresql")
+def _next_change_seq_postgresql(element, compiler, **kw):
+    return compiler.process(TASK_CHANGE_SEQUENCE.next_value(), **kw)
+
+
+class current_change_xid(
+    FunctionElement
+):  # Id of the writing transaction on Postgres. Sync readers compare it with their snapshot, see app.crud.changes
+    type = BigInteger()
+    inherit_cache = True
+
+
+@compiles(current_change_xid)
+def _current_change_xid(element, compiler, **kw):
+    return "0"  # SQLite: changes are ordered by change_seq alone
+
+
+@compiles(current_change_xid, "postgresql")
+def _current_change_xid_postgresql(element, compiler, **kw):
+    return "pg_current_xact_id()::text::bigint"
+
+
 class TaskStatus(
     str, enum.Enum
 ):  # Defines values for status field in Task model. Enforces exact matches
@@ -32,11 +85,152 @@ class Task(
     Base
 ):  # Defines Task model with ForeignKey to user's id with relationship to user defined. Status defined in TaskStatus.
     __tablename__ = "tasks"
+    # Match the listing filters so pages are read in id order. See migration 0002
+    __table_args__ = (
+        Index("ix_tasks_user_id_id", "user_id", "id"),
+        Index("ix_tasks_user_id_status_id", "user_id", "status", "id"),
+        Index("ix_tasks_status_id", "status", "id"),
+        # sort=created_at/updated_at and their *_after filters. See migration 0005
+        Index("ix_tasks_user_id_created_at_id", "user_id", "created_at", "id"),
+        Index("ix_tasks_user_id_updated_at_id", "user_id", "updated_at", "id"),
+        Index("ix_tasks_created_at_id", "created_at", "id"),
+        Index("ix_tasks_updated_at_id", "updated_at", "id"),
+        # /tasks/changes and next_change_seq. See migration 0006
+        Index(
+            "ix_tasks_user_id_change_xid_change_seq_id",
+            "user_id",
+            "change_xid",
+            "change_seq",
+            "id",
+        ),
+        Index("ix_tasks_change_seq", "change_seq"),
+    )
 
     id = Column(Integer, primary_key=True, index=True)
     title = Column(String, nullable=False)
     description = Column(Text, nullable=True)
-    status = Column(Enum(TaskStatus), default=TaskStatus.new)
+    status: Column[TaskStatus] = Column(Enum(TaskStatus), default=TaskStatus.new)
     user_id = Column(Integer, ForeignKey("users.id", ondelete="CASCADE"))
+    # Bumped by every update. Drives the task's ETag. See migration 0003
+    version = Column(Integer, nullable=False, default=1, server_default="1")
+    # Set by Python, not the database clock, so SQLite stores every value in the same text format
+    created_at = Column(DateTime(timezone=True), nullable=False, default=utcnow)
+    updated_at = Column(
+        DateTime(timezone=True), nullable=False, default=utcnow, onupdate=utcnow
+    )
+    # Position of the task's last write in the change sequence shared by all tasks. Drives /tasks/changes
+    change_seq = Column(
+        BigInteger,
+        nullable=False,
+        default=next_change_seq(),
+        onupdate=next_change_seq(),
+    )
+    # Transaction of the task's last write. Always 0 on SQLite
+    change_xid = Column(
+        BigInteger,
+        nullable=False,
+        default=current_change_xid(),
+        onupdate=current_change_xid(),
+        server_default="0",
+    )
 
     owner = relationship("User", back_populates="tasks")
+
+
+class TaskTombstone(
+    Base
+):  # Deleted task for /tasks/changes. Written by the tasks_tombstone trigger, so every delete path records one
+    __tablename__ = "task_tombstones"
+    __table_args__ = (
+        Index(
+            "ix_task_tombstones_user_id_change_xid_change_seq_task_id",
+            "user_id",
+            "change_xid",
+            "change_seq",
+            "task_id",
+        ),
+        Index("ix_task_tombstones_change_seq", "change_seq"),
+        Index("ix_task_tombstones_deleted_at", "deleted_at"),
+    )
+
+    id = Column(Integer, primary_key=True)
+    task_id = Column(Integer, nullable=False)
+    # No foreign key: tombstones are written while a user's tasks are deleted with the user
+    user_id = Column(Integer, nullable=False)
+    change_seq = Column(BigInteger, nullable=False)
+    change_xid = Column(BigInteger, nullable=False, server_default="0")
+    deleted_at = Column(
+        DateTime(timezone=True), nullable=False, server_default=func.now()
+    )
+
+
+class OutboxMessage(
+    Base
+):  # Side effect of a task write. Inserted in the write's transaction and run by app.crud.outbox after the commit
+    __tablename__ = "outbox_messages"
+    # Claims read the oldest due messages. See migration 0007
+    __table_args__ = (
+        Index("ix_outbox_messages_available_at_id", "available_at", "id"),
+    )
+
+    id = Column(Integer, primary_key=True)
+    topic = Column(String, nullable=False)  # Selects the handler
+    payload = Column(JSON, nullable=False)
+    attempts = Column(Integer, nullable=False, default=0)
+    # Next time the message may be claimed. NULL once it failed OUTBOX_MAX_ATTEMPTS times
+    available_at = Column(DateTime(timezone=True), nullable=True, default=utcnow)
+    created_at = Column(DateTime(timezone=True), nullable=False, default=utcnow)
+    failed_at = Column(DateTime(timezone=True), nullable=True)
+    last_error = Column(Text, nullable=True)
+
+
+# Postgres only, so SQLite schemas stay valid: a weighted tsvector of title and description for /tasks/search. It isn't
+# mapped, queries use app.crud.search.SEARCH_VECTOR. Migration 0004 adds the same column and index to existing databases
+TASK_SEARCH_VECTOR_SQL = (
+    "setweight(to_tsvector('english', coalesce(title, '')), 'A') || "
+    "setweight(to_tsvector('english', coalesce(description, '')), 'B')"
+)
+event.listen(
+    Task.__table__,
+    "after_create",
+    DDL(
+        f"ALTER TABLE tasks ADD COLUMN search_vector tsvector "
+        f"GENERATED ALWAYS AS ({TASK_SEARCH_VECTOR_SQL}) STORED"
+    ).execute_if(dialect="postgresql"),
+)
+event.listen(
+    Task.__table__,
+    "after_create",
+    DDL(
+        "CREATE INDEX ix_tasks_search_vector ON tasks USING gin (search_vector)"
+    ).execute_if(dialect="postgresql"),
+)
+
+# Both dialects: every deleted task leaves a tombstone with the next change_seq and, on Postgres, the deleting
+# transaction. The trigger runs BEFORE DELETE so on SQLite the deleted task's own change_seq still counts. Migration 0006
+# adds the same to existing databases
+TASK_CHANGE_DDL = {
+    "sqlite": [
+        "CREATE TRIGGER IF NOT EXISTS tasks_tombstone BEFORE DELETE ON tasks BEGIN "
+        "INSERT INTO task_tombstones (task_id, user_id, change_seq) "
+        "VALUES (OLD.id, OLD.user_id, (SELECT coalesce(max(seq), 0) FROM ("
+        "SELECT max(change_seq) AS seq FROM tasks "
+        "UNION ALL SELECT max(change_seq) FROM task_tombstones) AS latest) + 1); END",
+    ],
+    "postgresql": [
+        "CREATE OR REPLACE FUNCTION record_task_tombstone() RETURNS trigger "
+        "LANGUAGE plpgsql AS $$ BEGIN "
+        "INSERT INTO task_tombstones (task_id, user_id, change_seq, change_xid) "
+        "VALUES (OLD.id, OLD.user_id, nextval('task_change_seq'), "
+        "pg_current_xact_id()::text::bigint); RETURN OLD; END $$",
+        "DROP TRIGGER IF EXISTS tasks_tombstone ON tasks",
+        "CREATE TRIGGER tasks_tombstone BEFORE DELETE ON tasks "
+        "FOR EACH ROW EXECUTE FUNCTION record_task_tombstone()",
+    ],
+}
+for dialect, statements in TASK_CHANGE_DDL.items():
+    for statement in statements:
+        # After every table, the trigger needs tasks and task_tombstones
+        event.listen(
+            Base.metadata, "after_create", DDL(statement).execute_if(dialect=dialect)
+        )
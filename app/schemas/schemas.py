@@ -1,5 +1,6 @@
+from datetime import datetime
 from enum import Enum
-from typing import List, Optional
+from typing import List, Optional, Union
 
 from pydantic import BaseModel, Field, constr
 
@@ -10,6 +11,38 @@ class TaskStatus(str, Enum):  # Enforces specific string values
     completed = "Completed"
 
 
+class TotalMode(str, Enum):  # How the 'total' of a paginated listing is calculated
+    exact = "exact"
+    estimate = "estimate"
+    none = "none"
+
+
+class TaskSort(
+    str, Enum
+):  # Orders of the task listings. '-' sorts descending and ties are broken by id
+    id = "id"
+    id_desc = "-id"
+    created_at = "created_at"
+    created_at_desc = "-created_at"
+    updated_at = "updated_at"
+    updated_at_desc = "-updated_at"
+
+
+class ExportFormat(str, Enum):  # Formats supported by the export endpoints
+    ndjson = "ndjson"
+    csv = "csv"
+
+
+class SearchScope(str, Enum):  # Tasks searched by /tasks/search
+    own = "own"
+    public = "public"
+
+
+class StreamScope(str, Enum):  # Tasks whose changes /tasks/stream sends
+    own = "own"
+    public = "public"
+
+
 class UserCreate(BaseModel):  # Defines user creation fields
     first_name: str
     last_name: Optional[str] = None
@@ -48,8 +81,66 @@ class TaskOut(BaseModel):  # Defines returned task fields
         from_attributes = True
 
 
+# Defines a task with only the fields requested with 'fields='. Fields that weren't requested are left out
+class TaskFields(BaseModel):
+    id: int
+    title: Optional[str] = None
+    description: Optional[str] = None
+    status: Optional[TaskStatus] = None
+    created_at: Optional[datetime] = None
+    updated_at: Optional[datetime] = None
+
+
 class PaginatedTasks(BaseModel):  # Defines pagination information
-    total: int
+    total: Optional[int]  # None when the listing was requested with total=none
     skip: int
     limit: int
-    tasks: List[TaskOut]
+    tasks: List[Union[TaskOut, TaskFields]]
+    next_cursor: Optional[str] = None  # Cursor for the next page. None on the last page
+
+
+class TaskSearchHit(TaskOut):  # Task matched by /tasks/search with its relevance
+    rank: float
+
+
+class TaskSearchResults(
+    BaseModel
+):  # Defines one page of search results, best match first
+    tasks: List[TaskSearchHit]
+    next_cursor: Optional[str] = None  # Cursor for the next page. None on the last page
+
+
+class SyncedTask(TaskOut):  # Task returned by /tasks/changes with its timestamps
+    created_at: datetime
+    updated_at: datetime
+
+
+class TaskChanges(
+    BaseModel
+):  # Defines the changes to a user's tasks after a sync token
+    # Created or updated tasks in their current state, oldest change first
+    tasks: List[SyncedTask]
+    deleted: List[int]  # Ids of deleted tasks. May name tasks the client never received
+    since: str  # Token to send as 'since' next time
+    has_more: bool  # More changes are waiting. Call again with 'since' right away
+
+
+# Defines one item of a bulk update. Same fields as TaskUpdate plus the task's id
+class BulkTaskUpdate(TaskUpdate):
+    id: int
+
+
+class BulkTaskDelete(BaseModel):  # Defines ids for a bulk delete
+    ids: List[int] = Field(..., min_length=1)
+
+
+class BulkItemResult(BaseModel):  # Defines the outcome of one item in a bulk request
+    id: Optional[int]
+    status_code: int  # Same code the single task endpoint would have returned
+    detail: Optional[str] = None
+    task: Optional[TaskOut] = None
+
+
+# Defines bulk response. Results are in the same order as the request items
+class BulkResult(BaseModel):
+    results: List[BulkItemResult]
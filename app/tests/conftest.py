@@ -1,4 +1,5 @@
 import os
+import time
 
 import pytest
 from dotenv import load_dotenv
@@ -7,10 +8,16 @@ from sqlalchemy import create_engine
 from sqlalchemy.orm import sessionmaker
 
 from app.auth.auth import get_password_hash
+from app.auth.identity import identity_cache
+from app.core.config import settings
+from app.crud.counts import count_cache
+from app.crud.outbox import outbox_worker
+from app.crud.response_cache import public_feed_cache
 from app.db.deps import get_db
+from app.db.query_monitor import monitor_queries, request_observers
 from app.db.session import Base
 from app.main import app
-from app.models.models import User
+from app.models.models import OutboxMessage, TaskTombstone, User
 
 load_dotenv(dotenv_path=".env.test")
 
@@ -19,6 +26,72 @@ if TEST_DATABASE_URL is None:
     raise RuntimeError("TEST_DATABASE_URL must be set")
 
 engine = create_engine(TEST_DATABASE_URL)
+monitor_queries(engine)  # Statements are counted per request like the app engine's
+
+
+# Statements allowed per request with 'pytest --query-budget'. Endpoints not listed are only checked for N+1.
+# POST /tasks/bulk isn't listed: SQLite can't return a multi-row INSERT's rows in order, so it inserts one at a time
+# Writes include the INSERTs of their two outbox messages, task events and cache invalidation. SQLite runs them one at a time too
+QUERY_BUDGETS = {
+    "POST /auth/register": 3,
+    "POST /auth/login": 1,
+    "GET /tasks": 3,
+    "GET /tasks/public": 2,
+    "GET /tasks/filter-by-status/": 2,
+    "GET /tasks/{task_id:int}": 2,
+    "POST /tasks": 5,
+    "PUT /tasks/{task_id:int}": 5,
+    "PUT /tasks/{task_id:int}/complete": 5,
+    "DELETE /tasks/{task_id:int}": 5,
+    "GET /tasks/export": 1,
+    "GET /tasks/public/export": 1,
+    "PATCH /tasks/bulk": 5,
+    "DELETE /tasks/bulk": 4,
+    "GET /tasks/search": 3,
+    "GET /tasks/changes": 3,
+}
+
+
+def pytest_addoption(parser):
+    parser.addoption(
+        "--query-budget",
+        action="store_true",
+        help="Fail tests with requests over their QUERY_BUDGETS entry or repeating a statement (likely N+1)",
+    )
+
+
+def pytest_configure(config):
+    config.addinivalue_line(
+        "markers",
+        "query_budget(statements): fail if any request of the test runs more statements",
+    )
+
+
+@pytest.fixture(autouse=True)
+def query_budget(
+    request,
+):  # Checks every request of the test against its statement budget
+    marker = request.node.get_closest_marker("query_budget")
+    if marker is None and not request.config.getoption("--query-budget"):
+        yield
+        return
+
+    failures = []
+
+    def check(queries):
+        budget = marker.args[0] if marker else QUERY_BUDGETS.get(queries.endpoint)
+        if budget is not None and queries.count > budget:
+            failures.append(
+                f"{queries.endpoint} ran {queries.count} statements, budget is {budget}"
+            )
+        for statement in queries.repeated:
+            failures.append(f"{queries.endpoint} repeated a statement: {statement}")
+
+    request_observers.append(check)
+    yield
+    request_observers.remove(check)
+    if failures:
+        pytest.fail("\n".join(failures))
 
 
 TestingSessionLocal = sessionmaker(  # Replaces SessionLocal
@@ -26,6 +99,7 @@ TestingSessionLocal = sessionmaker(  # Replaces SessionLocal
     autoflush=False,
     bind=engine,
 )
+outbox_worker.session_factory = TestingSessionLocal  # Drains TEST_DATABASE_URL
 
 
 @pytest.fixture(scope="session", autouse=True)
@@ -42,7 +116,12 @@ def clean_tables(
     yield
     for table in reversed(Base.metadata.sorted_tables):
         db_session.execute(table.delete())
+    # Deleting the tasks wrote tombstones
+    db_session.execute(TaskTombstone.__table__.delete())
     db_session.commit()
+    count_cache.clear()  # Cached totals and users would outlive the wiped rows
+    identity_cache.clear()
+    public_feed_cache.clear()
 
 
 @pytest.fixture(scope="function")
@@ -72,6 +151,23 @@ def client(db_session):  # Provides a test client for making HTTP requests
     app.dependency_overrides.clear()
 
 
+@pytest.fixture(scope="function")
+def drain_outbox(
+    db_session,
+):  # Waits until the outbox worker has handled every message, e.g. the cache invalidation of a write
+    def drain():
+        deadline = time.monotonic() + 5
+        while (
+            db_session.query(OutboxMessage)
+            .filter(OutboxMessage.failed_at.is_(None))
+            .count()
+        ):
+            assert time.monotonic() < deadline, "The outbox wasn't drained"
+            time.sleep(0.01)
+
+    return drain
+
+
 @pytest.fixture(scope="function")
 def create_users(db_session):  # Creates 2 users to use in tests
     pw = "testpass123"
@@ -121,3 +217,11 @@ def other_token_headers(
     )
     token = resp.json()["access_token"]
     return {"Authorization": f"Bearer {token}"}
+
+
+@pytest.fixture(scope="function")
+def admin_headers(
+    token_headers, monkeypatch
+):  # Authenticates user1, listed in ADMIN_USERNAMES for the test
+    monkeypatch.setattr(settings, "ADMIN_USERNAMES", ["user1"])
+    return token_headers
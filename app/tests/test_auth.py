@@ -0,0 +1,52 @@
+from datetime import timedelta
+
+import pytest
+
+from app.auth import auth
+from app.auth.auth import (InvalidTokenError, JoseBackend, create_access_token,
+                           decode_access_token, token_cache)
+
+
+@pytest.fixture(scope="function", autouse=True)
+def empty_token_cache():
+    token_cache.clear()
+    yield
+    token_cache.clear()
+
+
+def test_decode_access_token_caches_verified_claims(monkeypatch):
+    # Second decode of the same token is served from the cache
+    calls = []
+    backend = JoseBackend()
+
+    def counting_decode(token):
+        calls.append(token)
+        return backend.decode(token)
+
+    monkeypatch.setattr(auth.jwt_backend, "decode", counting_decode)
+    token = create_access_token({"sub": "cached", "uid": 1})
+    assert decode_access_token(token)["sub"] == "cached"
+    assert decode_access_token(token)["uid"] == 1
+    assert len(calls) == 1
+
+
+def test_expired_token_is_rejected_and_not_cached():
+    token = create_access_token({"sub": "old"}, expires_delta=timedelta(seconds=-1))
+    with pytest.raises(InvalidTokenError):
+        decode_access_token(token)
+    assert len(token_cache) == 0
+
+
+def test_tampered_token_is_rejected():
+    token = create_access_token({"sub": "someone"})
+    with pytest.raises(InvalidTokenError):
+        decode_access_token(token[:-2] + ("AA" if token[-2:] != "AA" else "BB"))
+
+
+def test_pyjwt_backend_reads_jose_tokens():
+    # Backends are interchangeable because both produce standard HS256 tokens
+    pytest.importorskip("jwt")
+    token = JoseBackend().encode({"sub": "swap"})
+    assert auth.PyJWTBackend().decode(token)["sub"] == "swap"
+    with pytest.raises(InvalidTokenError):
+        auth.PyJWTBackend().decode("not.a.token")
@@ -0,0 +1,53 @@
+from app.core.cache import TTLCache
+
+
+class FakeClock:  # Lets tests move time forward without sleeping
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+def test_ttl_cache_expires_entries():
+    # Entries are returned until their ttl has passed
+    clock = FakeClock()
+    cache = TTLCache(max_entries=10, ttl=5, clock=clock)
+    cache.set("a", 1)
+    clock.now = 4.9
+    assert cache.get("a") == 1
+    clock.now = 5
+    assert cache.get("a") is None
+
+
+def test_ttl_cache_evicts_least_recently_used():
+    # Reading 'a' makes 'b' the least recently used entry
+    cache = TTLCache(max_entries=2, ttl=60)
+    cache.set("a", 1)
+    cache.set("b", 2)
+    cache.get("a")
+    cache.set("c", 3)
+    assert cache.get("b") is None
+    assert cache.get("a") == 1
+    assert cache.get("c") == 3
+
+
+def test_ttl_cache_delete_where():
+    # Only keys matching the predicate are removed
+    cache = TTLCache(max_entries=10, ttl=60)
+    cache.set((1, None), 5)
+    cache.set((2, None), 7)
+    cache.delete_where(lambda key: key[0] == 1)
+    assert cache.get((1, None)) is None
+    assert cache.get((2, None)) == 7
+
+
+def test_ttl_cache_counts_evictions():
+    # Only entries pushed out by the size limit are evictions
+    clock = FakeClock()
+    cache = TTLCache(max_entries=1, ttl=5, clock=clock)
+    cache.set("a", 1)
+    cache.set("b", 2)
+    clock.now = 10
+    cache.get("b")
+    assert cache.evictions == 1
@@ -0,0 +1,49 @@
+import asyncio
+
+import pytest
+from fastapi import HTTPException
+
+from app.auth.hashing import PasswordHasher
+
+
+@pytest.fixture(scope="module")
+def hasher():  # Low cost factor and one worker process keep the tests fast
+    hasher = PasswordHasher(workers=1, max_pending=4, rounds=4)
+    yield hasher
+    hasher.shutdown()
+
+
+def test_hash_and_verify_in_worker_process(hasher):
+    hashed = hasher.hash("secret123")
+    assert hashed.startswith("$2b$04$")  # Cost factor is stored in the hash
+    assert hasher.verify("secret123", hashed)
+    assert not hasher.verify("wrong", hashed)
+
+
+def test_saturated_hasher_rejects_with_503():
+    # No free slot means the call fails fast instead of queueing
+    hasher = PasswordHasher(workers=0, max_pending=1, rounds=4)
+    hasher._slots.acquire()
+    with pytest.raises(HTTPException) as exc_info:
+        hasher.hash("secret123")
+    assert exc_info.value.status_code == 503
+    hasher._slots.release()
+    assert hasher.verify("secret123", hasher.hash("secret123"))
+
+
+def test_async_methods_await_the_worker_process(hasher):
+    async def run():
+        hashed = await hasher.hash_async("secret123")
+        return await hasher.verify_async("secret123", hashed)
+
+    assert asyncio.run(run())
+    assert hasher._slots.acquire(blocking=False)  # The slots were given back
+    hasher._slots.release()
+
+
+def test_saturated_hasher_rejects_async_calls_with_503():
+    hasher = PasswordHasher(workers=0, max_pending=1, rounds=4)
+    hasher._slots.acquire()
+    with pytest.raises(HTTPException) as exc_info:
+        asyncio.run(hasher.hash_async("secret123"))
+    assert exc_info.value.status_code == 503
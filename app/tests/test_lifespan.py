@@ -0,0 +1,55 @@
+import asyncio
+import time
+
+from fastapi.testclient import TestClient
+from sqlalchemy import create_engine
+from sqlalchemy.pool import QueuePool
+
+from app.core import lifespan
+from app.core.lifespan import readiness
+
+
+def wait_until_ready(client: TestClient, timeout: float = 10.0):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        response = client.get("/readyz")
+        if response.status_code == 200:
+            return response
+        time.sleep(0.05)
+    raise AssertionError(f"Not ready after {timeout}s: {response.json()}")
+
+
+def test_healthz_does_not_need_the_database(client: TestClient, monkeypatch):
+    wait_until_ready(client)  # So startup can't finish after the patch below
+    monkeypatch.setattr(readiness, "ready", False)
+    assert client.get("/healthz").json() == {"status": "ok"}
+    assert client.get("/readyz").status_code == 503
+
+
+def test_readyz_after_startup(client: TestClient):
+    data = wait_until_ready(client).json()
+    assert data["status"] == "ready"
+
+
+def test_startup_retries_until_the_database_answers(monkeypatch):
+    calls = []
+
+    def flaky_prepare():
+        calls.append(1)
+        if len(calls) < 3:
+            raise ConnectionRefusedError("database is starting up")
+
+    monkeypatch.setattr(lifespan, "prepare_database", flaky_prepare)
+    monkeypatch.setattr(lifespan, "RETRY_DELAY_SECONDS", 0.01)
+    monkeypatch.setattr(readiness, "ready", False)
+
+    asyncio.run(lifespan.prepare_until_ready())
+    assert len(calls) == 3
+    assert readiness.ready and readiness.error is None
+
+
+def test_warm_pool_leaves_connections_in_the_pool():
+    engine = create_engine("sqlite://", poolclass=QueuePool, pool_size=3)
+    lifespan.warm_pool(engine, 3)
+    assert engine.pool.checkedin() == 3
+    engine.dispose()
@@ -0,0 +1,68 @@
+from fastapi.testclient import TestClient
+
+from app.core.config import settings
+from app.core.metrics import (Counter, Histogram, db_queries_per_request,
+                              http_request_duration, http_requests,
+                              http_requests_in_progress, registry)
+
+
+def test_histogram_renders_cumulative_buckets():
+    histogram = Histogram("latency_seconds", "Latency.", ("route",), buckets=(0.1, 1))
+    for value in (0.05, 0.5, 0.5, 3):
+        histogram.observe("/a", value=value)
+    lines = histogram.render()
+    assert 'latency_seconds_bucket{route="/a",le="0.1"} 1' in lines
+    assert 'latency_seconds_bucket{route="/a",le="1"} 3' in lines
+    assert 'latency_seconds_bucket{route="/a",le="+Inf"} 4' in lines
+    assert 'latency_seconds_sum{route="/a"} 4.05' in lines
+    assert 'latency_seconds_count{route="/a"} 4' in lines
+
+
+def test_label_values_are_escaped():
+    counter = Counter("things_total", "Things.", ("name",))
+    counter.inc('a "quoted"\nname')
+    assert 'things_total{name="a \\"quoted\\"\\nname"} 1' in counter.render()
+
+
+def test_requests_are_labelled_with_route_template(
+    token_headers: dict, client: TestClient
+):
+    registry.clear()
+    task_id = client.post(
+        "/tasks", json={"title": "T", "description": "d"}, headers=token_headers
+    ).json()["id"]
+    client.get(f"/tasks/{task_id}", headers=token_headers)
+    client.get(f"/tasks/{task_id + 1000}", headers=token_headers)
+    client.get("/no/such/path")
+
+    # Ids don't create series of their own
+    route = "/tasks/{task_id:int}"
+    assert http_requests.value("GET", route, "200") == 1
+    assert http_requests.value("GET", route, "404") == 1
+    assert http_requests.value("GET", "unmatched", "404") == 1
+    assert http_request_duration.count("GET", route) == 2
+    assert http_requests_in_progress.value("GET", route) == 0
+    # Both reads ran at least the task lookup
+    assert db_queries_per_request.count("GET", route) == 2
+    assert db_queries_per_request.sum("GET", route) >= 2
+
+
+def test_metrics_endpoint(client: TestClient):
+    registry.clear()
+    client.get("/hello")
+    response = client.get("/metrics")
+    assert response.status_code == 200
+    assert response.headers["content-type"].startswith("text/plain; version=0.0.4")
+    body = response.text
+    assert "# TYPE http_requests_total counter" in body
+    assert 'http_requests_total{method="GET",route="/hello",status="200"} 1' in body
+    assert 'http_request_db_queries_count{method="GET",route="/hello"} 1' in body
+
+
+def test_metrics_token(client: TestClient, monkeypatch):
+    monkeypatch.setattr(settings, "METRICS_TOKEN", "scrape-secret")
+    assert client.get("/metrics").status_code == 401
+    wrong = {"Authorization": "Bearer other"}
+    assert client.get("/metrics", headers=wrong).status_code == 401
+    scraper = {"Authorization": "Bearer scrape-secret"}
+    assert client.get("/metrics", headers=scraper).status_code == 200
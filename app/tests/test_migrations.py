@@ -0,0 +1,150 @@
+import json
+from dataclasses import replace
+from datetime import datetime, timezone
+
+import pytest
+from alembic.script import ScriptDirectory
+from sqlalchemy import create_engine, insert, inspect, select, text
+
+from app.crud.changes import changed_tasks
+from app.crud.query_builder import (TaskListQuery, filtered_statement,
+                                    listing_statement)
+from app.db.migrate import alembic_config, upgrade_database
+from app.db.session import Base
+from app.models.models import Task, TaskStatus, User
+from app.schemas.schemas import TaskSort
+
+LIST_INDEXES = {
+    "ix_tasks_user_id_id",
+    "ix_tasks_user_id_status_id",
+    "ix_tasks_status_id",
+    "ix_tasks_user_id_created_at_id",
+    "ix_tasks_user_id_updated_at_id",
+    "ix_tasks_created_at_id",
+    "ix_tasks_updated_at_id",
+    "ix_tasks_user_id_change_xid_change_seq_id",
+}
+
+
+HEAD = ScriptDirectory.from_config(alembic_config()).get_current_head()
+
+
+def head_revision(engine):
+    with engine.connect() as connection:
+        return connection.execute(
+            text("SELECT version_num FROM alembic_version")
+        ).scalar()
+
+
+def test_upgrade_creates_schema_and_indexes(tmp_path):
+    engine = create_engine(f"sqlite:///{tmp_path / 'fresh.db'}")
+    upgrade_database(engine)
+    index_names = {index["name"] for index in inspect(engine).get_indexes("tasks")}
+    assert LIST_INDEXES <= index_names
+    columns = {column["name"] for column in inspect(engine).get_columns("tasks")}
+    assert {"version", "created_at", "updated_at"} <= columns
+    assert head_revision(engine) == HEAD
+    engine.dispose()
+
+
+def test_upgrade_adopts_database_made_by_create_all(tmp_path):
+    # Databases from before migrations are stamped instead of failing on existing tables
+    engine = create_engine(f"sqlite:///{tmp_path / 'legacy.db'}")
+    Base.metadata.create_all(bind=engine)
+    upgrade_database(engine)
+    assert head_revision(engine) == HEAD
+    engine.dispose()
+
+
+def query_plan(db_session, stmt) -> str:
+    # Returns the plan of a statement as text for SQLite and Postgres
+    bind = db_session.get_bind()
+    compiled = stmt.compile(bind, compile_kwargs={"literal_binds": True})
+    if bind.dialect.name == "postgresql":
+        plan = db_session.execute(text(f"EXPLAIN (FORMAT JSON) {compiled}")).scalar()
+        return json.dumps(plan)
+    rows = db_session.execute(text(f"EXPLAIN QUERY PLAN {compiled}")).all()
+    return " | ".join(row[-1] for row in rows)
+
+
+@pytest.fixture(scope="function")
+def many_tasks(db_session):
+    # Many users with 10 tasks each and 1 in 50 tasks completed. Postgres only prefers the indexes over scanning
+    # the primary key with a filter when they are selective
+    db_session.execute(
+        insert(User),
+        [
+            {"first_name": "P", "username": f"plan{i}", "password": "x"}
+            for i in range(2000)
+        ],
+    )
+    user_ids = db_session.scalars(select(User.id).order_by(User.id)).all()
+    db_session.execute(
+        insert(Task),
+        [
+            {
+                "title": f"T{i}",
+                "status": (
+                    TaskStatus.completed
+                    if i % 50 == 3
+                    else (TaskStatus.new, TaskStatus.in_progress)[i % 2]
+                ),
+                "user_id": user_ids[i // 10],
+            }
+            for i in range(20000)
+        ],
+    )
+    db_session.commit()
+    db_session.execute(text("ANALYZE"))
+    db_session.commit()
+    return user_ids[0]
+
+
+SINCE = datetime(2020, 1, 1, tzinfo=timezone.utc)
+
+
+@pytest.mark.parametrize(
+    "scope_user, query, index",
+    [
+        (True, TaskListQuery(), "ix_tasks_user_id_id"),
+        (
+            True,
+            TaskListQuery(statuses=(TaskStatus.completed,)),
+            "ix_tasks_user_id_status_id",
+        ),
+        (False, TaskListQuery(statuses=(TaskStatus.completed,)), "ix_tasks_status_id"),
+        (
+            True,
+            TaskListQuery(sort=TaskSort.created_at_desc),
+            "ix_tasks_user_id_created_at_id",
+        ),
+        (
+            True,
+            TaskListQuery(sort=TaskSort.created_at, created_after=SINCE),
+            "ix_tasks_user_id_created_at_id",
+        ),
+        (False, TaskListQuery(sort=TaskSort.created_at), "ix_tasks_created_at_id"),
+        (
+            False,
+            TaskListQuery(sort=TaskSort.updated_at_desc, updated_after=SINCE),
+            "ix_tasks_updated_at_id",
+        ),
+    ],
+)
+def test_list_queries_use_indexes(db_session, many_tasks, scope_user, query, index):
+    # Same statements as the list endpoints in routes_tasks.py
+    if scope_user:
+        query = replace(query, user_id=many_tasks)
+    page, _ = listing_statement(query, filtered_statement(query))
+
+    plan = query_plan(db_session, page)
+    assert index in plan
+    assert "Seq Scan" not in plan
+    assert "USE TEMP B-TREE FOR ORDER BY" not in plan  # SQLite sorting the rows itself
+
+
+def test_changes_query_uses_index(db_session, many_tasks):
+    plan = query_plan(db_session, changed_tasks(many_tasks, (0, 100, 0), 100))
+    assert "ix_tasks_user_id_change_xid_change_seq_id" in plan
+    assert "Seq Scan" not in plan
+    assert "USE TEMP B-TREE FOR ORDER BY" not in plan
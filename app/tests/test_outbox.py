@@ -0,0 +1,87 @@
+from datetime import datetime, timezone
+
+from sqlalchemy import update
+
+from app.core.config import settings
+from app.crud import response_cache
+from app.crud.outbox import (PENDING_KEY, claim_batch, drain_batch, enqueue,
+                             handlers, outbox_stats)
+from app.crud.response_cache import enqueue_cache_invalidation
+from app.models.models import OutboxMessage, utcnow
+
+
+def test_messages_are_stored_with_the_transaction(db_session, monkeypatch):
+    received = []
+    monkeypatch.setitem(handlers, "test", received.append)
+
+    enqueue(db_session, "test", {"n": 1})
+    db_session.rollback()
+    assert PENDING_KEY not in db_session.info
+    assert db_session.query(OutboxMessage).count() == 0
+
+    enqueue(db_session, "test", {"n": 2})
+    enqueue(db_session, "test", {"n": 3})
+    db_session.commit()
+    assert PENDING_KEY not in db_session.info  # Woke the worker
+
+    assert drain_batch(db_session) == 2
+    assert received == [{"n": 2}, {"n": 3}]
+    assert db_session.query(OutboxMessage).count() == 0
+    assert drain_batch(db_session) == 0
+
+
+def test_failed_messages_are_retried_then_kept(db_session, monkeypatch):
+    monkeypatch.setattr(settings, "OUTBOX_MAX_ATTEMPTS", 2)
+    received = []
+
+    def flaky(payload):
+        raise ConnectionError("broker down")
+
+    monkeypatch.setitem(handlers, "flaky", flaky)
+    monkeypatch.setitem(handlers, "test", received.append)
+    enqueue(db_session, "flaky", {"n": 1})
+    enqueue(db_session, "test", {"n": 2})
+    db_session.commit()
+
+    # One failing message doesn't hold back the rest of the batch
+    assert drain_batch(db_session) == 2
+    assert received == [{"n": 2}]
+    message = db_session.query(OutboxMessage).one()
+    assert message.attempts == 1
+    assert message.last_error == "ConnectionError: broker down"
+    assert drain_batch(db_session) == 0  # Backing off
+
+    past = datetime(2020, 1, 1, tzinfo=timezone.utc)
+    db_session.execute(update(OutboxMessage).values(available_at=past))
+    db_session.commit()
+    assert drain_batch(db_session) == 1
+    db_session.expire_all()
+    message = db_session.query(OutboxMessage).one()
+    assert message.attempts == 2
+    assert message.available_at is None and message.failed_at is not None
+    assert outbox_stats(db_session)["failed"] == 1
+    assert drain_batch(db_session) == 0
+
+
+def test_claimed_messages_are_leased(db_session):
+    enqueue(db_session, "test", {"n": 1})
+    db_session.commit()
+    now = utcnow()
+    assert len(db_session.execute(claim_batch(now, 10)).all()) == 1
+    db_session.commit()
+    # Another worker can't claim it until the lease runs out
+    assert db_session.execute(claim_batch(now, 10)).all() == []
+    db_session.commit()
+    assert outbox_stats(db_session)["pending"] == 1
+
+
+def test_cache_invalidation_is_broadcast_through_the_outbox(db_session, monkeypatch):
+    invalidated = []
+    monkeypatch.setattr(response_cache, "invalidate_task_caches", invalidated.append)
+    enqueue_cache_invalidation(db_session, 7)
+    db_session.commit()
+    assert invalidated == []  # Not before the worker drains the message
+
+    # Without a broker the broadcast reaches the listener of this process
+    assert drain_batch(db_session) == 1
+    assert invalidated == [7]
@@ -0,0 +1,45 @@
+import pytest
+from sqlalchemy import create_engine, exc
+
+from app.db.pool import (InstrumentedQueuePool, pool_options, pool_snapshot,
+                         pool_stats)
+
+
+@pytest.fixture(scope="function")
+def tiny_engine(tmp_path):  # One connection and no overflow to force a timeout
+    engine = create_engine(
+        f"sqlite:///{tmp_path / 'pool.db'}",
+        poolclass=InstrumentedQueuePool,
+        pool_size=1,
+        max_overflow=0,
+        pool_timeout=0.05,
+    )
+    pool_stats.reset()
+    yield engine
+    engine.dispose()
+    pool_stats.reset()
+
+
+def test_pool_options_from_settings():
+    # Network databases get the configured pool, in-memory SQLite keeps its default pool
+    options = pool_options("postgresql://u:p@db/todo")
+    assert options["poolclass"] is InstrumentedQueuePool
+    assert {"pool_size", "max_overflow", "pool_timeout", "pool_recycle"} <= set(options)
+    assert "poolclass" not in pool_options(
+        "postgresql://u:p@db/todo", instrumented=False
+    )
+    assert set(pool_options("sqlite://")) == {"pool_pre_ping"}
+
+
+def test_checkouts_and_timeouts_are_recorded(tiny_engine):
+    # Second checkout waits for the only connection and times out
+    with tiny_engine.connect():
+        snapshot = pool_snapshot(tiny_engine)
+        assert snapshot["pool"]["checked_out"] == 1
+        with pytest.raises(exc.TimeoutError):
+            tiny_engine.connect()
+
+    stats = pool_snapshot(tiny_engine)["stats"]
+    assert stats["checkouts"] == 1
+    assert stats["timeouts"] == 1
+    assert stats["wait_seconds_histogram"]["+Inf"] == 1
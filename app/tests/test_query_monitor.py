@@ -0,0 +1,103 @@
+import logging
+import re
+
+import pytest
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+from sqlalchemy import select, text
+from sqlalchemy.exc import DBAPIError
+
+from app.core.config import settings
+from app.core.metrics import QueryMonitorMiddleware
+from app.db.query_monitor import (RequestQueries, current_queries,
+                                  request_observers)
+from app.models.models import Task
+
+
+def run_in_request(db_session, queries: RequestQueries, statements: int):
+    token = current_queries.set(queries)
+    try:
+        for task_id in range(statements):
+            db_session.execute(select(Task.title).where(Task.id == task_id)).all()
+    finally:
+        current_queries.reset(token)
+
+
+def test_repeated_statement_is_logged_once_as_n_plus_one(
+    db_session, monkeypatch, caplog
+):
+    monkeypatch.setattr(settings, "DB_REPEATED_QUERY_THRESHOLD", 3)
+    queries = RequestQueries("GET", "/tasks")
+    with caplog.at_level(logging.WARNING, logger="app.db.query_monitor"):
+        run_in_request(db_session, queries, 5)
+
+    assert queries.count == 5
+    assert len(queries.repeated) == 1
+    warnings = [record.getMessage() for record in caplog.records]
+    assert len(warnings) == 1
+    assert "likely N+1" in warnings[0] and "GET /tasks" in warnings[0]
+
+
+def test_slow_query_is_logged_with_parameters_and_route(
+    db_session, monkeypatch, caplog
+):
+    monkeypatch.setattr(settings, "DB_SLOW_QUERY_SECONDS", 1e-9)
+    with caplog.at_level(logging.WARNING, logger="app.db.query_monitor"):
+        run_in_request(db_session, RequestQueries("GET", "/tasks/{task_id:int}"), 1)
+
+    message = caplog.records[0].getMessage()
+    assert message.startswith("Slow query")
+    assert "GET /tasks/{task_id:int}" in message
+    # (0,) on SQLite, {'id_1': 0} on Postgres
+    assert re.search(r"parameters=[({].*\b0\b", message)
+
+    monkeypatch.setattr(settings, "DB_SLOW_QUERY_LOG_PARAMETERS", False)
+    caplog.clear()
+    with caplog.at_level(logging.WARNING, logger="app.db.query_monitor"):
+        run_in_request(db_session, RequestQueries("GET", "/tasks"), 1)
+    assert "parameters=<hidden>" in caplog.records[0].getMessage()
+
+
+def test_statements_outside_requests_are_not_counted(db_session):
+    queries = RequestQueries("GET", "/tasks")
+    run_in_request(db_session, queries, 1)
+    db_session.execute(select(Task.id)).all()
+    assert queries.count == 1
+
+
+def test_failed_statement_drops_its_start_time(db_session):
+    info = db_session.connection().info
+    with pytest.raises(DBAPIError):
+        db_session.execute(text("SELECT * FROM no_such_table"))
+    db_session.rollback()  # Postgres aborted the transaction, the teardown reuses the session
+    assert info["query_started_at"] == []
+
+
+def test_requests_are_counted_without_metrics(db_session):
+    # The request context doesn't depend on MetricsMiddleware, which METRICS_ENABLED=False leaves out
+    app = FastAPI()
+
+    @app.get("/items/{item_id}")
+    def read_item(item_id: int):
+        db_session.execute(select(Task.id).where(Task.id == item_id)).all()
+
+    app.add_middleware(QueryMonitorMiddleware, router=app.router)
+    finished = []
+    request_observers.append(finished.append)
+    try:
+        TestClient(app).get("/items/1")
+    finally:
+        request_observers.remove(finished.append)
+    assert [(queries.endpoint, queries.count) for queries in finished] == [
+        ("GET /items/{item_id}", 1)
+    ]
+
+
+# POST /tasks: user lookup, task INSERT, two outbox INSERTs and the refresh
+@pytest.mark.query_budget(5)
+def test_task_endpoints_stay_within_budget(token_headers: dict, client: TestClient):
+    task_id = client.post(
+        "/tasks", json={"title": "T", "description": "d"}, headers=token_headers
+    ).json()["id"]
+    assert client.get(f"/tasks/{task_id}", headers=token_headers).status_code == 200
+    assert client.get("/tasks", headers=token_headers).status_code == 200
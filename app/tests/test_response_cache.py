@@ -0,0 +1,166 @@
+import asyncio
+import threading
+import time
+
+from fastapi.testclient import TestClient
+
+from app.core.cache import TTLCache
+from app.crud.events import task_events
+from app.crud.outbox import handlers
+from app.crud.response_cache import (CACHES_CHANNEL, TASK_CACHES_TOPIC,
+                                     ResponseCache, public_feed_cache)
+
+
+def test_get_or_load_is_single_flight():
+    # Concurrent misses for one key load the value once
+    cache = ResponseCache(TTLCache(max_entries=10, ttl=60), ttl=60)
+    calls = []
+
+    def load():
+        calls.append(1)
+        time.sleep(0.05)
+        return {"page": 1}
+
+    results = []
+    threads = [
+        threading.Thread(target=lambda: results.append(cache.get_or_load(("k",), load)))
+        for _ in range(8)
+    ]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert len(calls) == 1
+    assert results == [{"page": 1}] * 8
+    assert cache.stats()["misses"] == 1
+    assert cache.stats()["hits"] == 7
+
+
+class FailingFirstLoad:  # Slow load that fails the first time and records how many ran at once
+    def __init__(self):
+        self.calls = 0
+        self.running = 0
+        self.overlap = 0
+
+    def start(self):
+        self.calls += 1
+        self.running += 1
+        self.overlap = max(self.overlap, self.running)
+        return self.calls
+
+    def finish(self, call: int):
+        self.running -= 1
+        if call == 1:
+            raise RuntimeError("Database unavailable")
+        return {"page": 1}
+
+
+def test_late_caller_waits_for_the_retry_of_a_failed_load():
+    # The first load fails while others wait. A caller arriving while the next waiter loads waits for it too
+    cache = ResponseCache(TTLCache(max_entries=10, ttl=60), ttl=60)
+    loads = FailingFirstLoad()
+
+    def load():
+        call = loads.start()
+        time.sleep(0.05)
+        return loads.finish(call)
+
+    results = []
+
+    def get():
+        try:
+            results.append(cache.get_or_load(("k",), load))
+        except RuntimeError:
+            results.append(None)
+
+    threads = [threading.Thread(target=get) for _ in range(4)]
+    for thread in threads[:3]:
+        thread.start()
+        time.sleep(0.01)
+    time.sleep(0.05)  # The first load failed, the second is running
+    threads[3].start()
+    for thread in threads:
+        thread.join()
+    assert loads.overlap == 1
+    assert loads.calls == 2  # The failed load and its retry
+    assert sorted(results, key=bool) == [None] + [{"page": 1}] * 3
+    assert cache._flights == {}
+
+
+def test_late_async_caller_waits_for_the_retry_of_a_failed_load():
+    cache = ResponseCache(TTLCache(max_entries=10, ttl=60), ttl=60)
+    loads = FailingFirstLoad()
+
+    async def load():
+        call = loads.start()
+        await asyncio.sleep(0.05)
+        return loads.finish(call)
+
+    async def get(delay: float):
+        await asyncio.sleep(delay)
+        try:
+            return await cache.get_or_load_async(("k",), load)
+        except RuntimeError:
+            return None
+
+    async def run():
+        return await asyncio.gather(get(0), get(0.01), get(0.02), get(0.08))
+
+    assert asyncio.run(run()) == [None] + [{"page": 1}] * 3
+    assert loads.overlap == 1
+    assert loads.calls == 2
+    assert cache._async_flights == {}
+
+
+def test_invalidate_drops_every_key():
+    cache = ResponseCache(TTLCache(max_entries=10, ttl=60), ttl=60)
+    cache.get_or_load(("a",), lambda: 1)
+    cache.get_or_load(("b",), lambda: 2)
+    cache.invalidate()
+    assert cache.get_or_load(("a",), lambda: 3) == 3
+    assert cache.get_or_load(("b",), lambda: 4) == 4
+
+
+def test_public_feed_is_cached_until_a_write(
+    token_headers: dict, client: TestClient, drain_outbox
+):
+    client.post("/tasks", json={"title": "A"}, headers=token_headers)
+    drain_outbox()
+    first = client.get("/tasks/public", headers=token_headers).json()
+    assert client.get("/tasks/public", headers=token_headers).json() == first
+    assert public_feed_cache.hits == 1
+
+    # Any task write drops the cached pages
+    client.post("/tasks", json={"title": "B"}, headers=token_headers)
+    drain_outbox()
+    data = client.get("/tasks/public", headers=token_headers).json()
+    assert data["total"] == 2
+
+
+def test_writes_drop_their_own_workers_cache_without_the_outbox(
+    token_headers: dict, client: TestClient, drain_outbox, monkeypatch
+):
+    monkeypatch.setitem(handlers, TASK_CACHES_TOPIC, lambda payload: None)
+    client.post("/tasks", json={"title": "A"}, headers=token_headers)
+    drain_outbox()
+    assert client.get("/tasks/public", headers=token_headers).json()["total"] == 1
+    client.post("/tasks", json={"title": "B"}, headers=token_headers)
+    assert client.get("/tasks/public", headers=token_headers).json()["total"] == 2
+
+
+def test_broadcast_invalidation_drops_the_cache():
+    # What other workers run when the outbox broadcasts a write
+    public_feed_cache.get_or_load(("page",), lambda: 1)
+    task_events.deliver([CACHES_CHANNEL], [{"user_id": 1}])
+    assert public_feed_cache.get_or_load(("page",), lambda: 2) == 2
+
+
+def test_cached_public_feed_keeps_etag(
+    token_headers: dict, client: TestClient, drain_outbox
+):
+    client.post("/tasks", json={"title": "A"}, headers=token_headers)
+    drain_outbox()
+    etag = client.get("/tasks/public", headers=token_headers).headers["etag"]
+    resp = client.get("/tasks/public", headers={**token_headers, "If-None-Match": etag})
+    assert resp.status_code == 304
+    assert public_feed_cache.hits == 1
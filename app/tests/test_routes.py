@@ -4,3 +4,30 @@ def test_say_hello(
     response = client.get("/hello")
     assert response.status_code == 200
     assert response.json() == {"message": "Hello and welcome to my TaskListApp!"}
+
+
+def test_pool_stats(client, admin_headers):
+    # Pool statistics are exposed for monitoring
+    response = client.get("/db/pool", headers=admin_headers)
+    assert response.status_code == 200
+    assert {"pool", "stats"} <= set(response.json())
+
+
+def test_public_feed_cache_stats(client, admin_headers):
+    response = client.get("/cache/public-feed", headers=admin_headers)
+    assert response.status_code == 200
+    assert {"enabled", "hits", "misses", "evictions"} <= set(response.json())
+
+
+def test_outbox_stats(client, admin_headers):
+    response = client.get("/outbox", headers=admin_headers)
+    assert response.status_code == 200
+    assert {"pending", "failed", "batches"} <= set(response.json())
+
+
+def test_operations_endpoints_require_admin(client, admin_headers, other_token_headers):
+    for path in ("/db/pool", "/cache/public-feed", "/outbox"):
+        assert client.get(path).status_code == 403  # No token
+        assert client.get(path, headers=other_token_headers).status_code == 403
+    # Load balancer probes stay open
+    assert client.get("/healthz").status_code == 200
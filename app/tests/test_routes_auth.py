@@ -1,5 +1,14 @@
+import threading
+
 import pytest
 from fastapi.testclient import TestClient
+from jose import jwt
+
+from app.auth.auth import ALGORITHM, SECRET_KEY
+from app.auth.hashing import password_hasher
+from app.core.config import settings
+from app.db import deps
+from app.models.models import User
 
 
 def test_register_and_login(
@@ -91,3 +100,47 @@ def test_register_short_password(
     payload = {"first_name": "first", "username": "usershortpass", "password": "12345"}
     resp = client.post("/auth/register", json=payload)
     assert resp.status_code == 422
+
+
+def test_token_carries_user_id(client: TestClient):
+    # Tokens include the user's id in the 'uid' claim
+    payload = {"first_name": "uid", "username": "uiduser", "password": "uidpass123"}
+    token = client.post("/auth/register", json=payload).json()["access_token"]
+    claims = jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM])
+    assert claims["sub"] == "uiduser"
+    assert isinstance(claims["uid"], int)
+
+
+def test_deleted_user_is_not_served_from_cache(
+    client: TestClient, token_headers: dict, db_session
+):
+    # Deleting a user drops its cached identity so the old token stops working
+    assert client.get("/tasks", headers=token_headers).status_code == 200
+    user = db_session.query(User).filter(User.username == "user1").first()
+    db_session.delete(user)
+    db_session.commit()
+    assert client.get("/tasks", headers=token_headers).status_code == 401
+
+
+def test_trusted_token_user_id_skips_lookup(
+    client: TestClient, token_headers: dict, monkeypatch
+):
+    # With AUTH_TRUST_TOKEN_USER_ID the user comes from the token claims
+    monkeypatch.setattr(settings, "AUTH_TRUST_TOKEN_USER_ID", True)
+    # Would fail if the cache was used
+    monkeypatch.setattr(deps, "get_cached_user", None)
+    resp = client.post("/tasks", json={"title": "trusted"}, headers=token_headers)
+    assert resp.status_code == 200
+
+
+def test_login_rejected_when_hashing_is_saturated(
+    client: TestClient, create_users, monkeypatch
+):
+    # Login storms get 503 once the hashing pool is full
+    monkeypatch.setattr(password_hasher, "_slots", threading.BoundedSemaphore(1))
+    password_hasher._slots.acquire()
+    resp = client.post(
+        "/auth/login", json={"username": "user1", "password": "testpass123"}
+    )
+    assert resp.status_code == 503
+    assert resp.headers["Retry-After"] == "1"
@@ -1,6 +1,8 @@
 import pytest
 from fastapi.testclient import TestClient
+from sqlalchemy import event
 
+from app.crud.counts import count_cache
 from app.models.models import Task, TaskStatus, User
 
 """
@@ -339,3 +341,375 @@ def test_filter_by_status_invalid_status(token_headers, client):
         "/tasks/filter-by-status/?status=InvalidStatus", headers=token_headers
     )
     assert resp.status_code == 422
+
+
+def test_cursor_pagination_walks_all_pages(token_headers: dict, client: TestClient):
+    # Following next_cursor should return every task exactly once and end with next_cursor None
+    created_ids = []
+    for i in range(5):
+        t = client.post("/tasks", json={"title": f"C{i}"}, headers=token_headers)
+        created_ids.append(t.json()["id"])
+
+    seen_ids = []
+    resp = client.get("/tasks?limit=2", headers=token_headers).json()
+    seen_ids += [t["id"] for t in resp["tasks"]]
+    while resp["next_cursor"]:
+        resp = client.get(
+            f"/tasks?limit=2&cursor={resp['next_cursor']}", headers=token_headers
+        ).json()
+        seen_ids += [t["id"] for t in resp["tasks"]]
+    assert seen_ids == sorted(created_ids)
+    assert resp["total"] == 5
+
+
+def test_cursor_pagination_with_status(token_headers: dict, client: TestClient):
+    # Cursor on /tasks/public keeps the status filter and can't be reused with another status
+    for i in range(3):
+        t = client.post("/tasks", json={"title": f"S{i}"}, headers=token_headers)
+        client.put(f"/tasks/{t.json()['id']}/complete", headers=token_headers)
+    client.post("/tasks", json={"title": "Not completed"}, headers=token_headers)
+
+    first = client.get(
+        "/tasks/public?status=Completed&limit=2", headers=token_headers
+    ).json()
+    second = client.get(
+        f"/tasks/public?status=Completed&limit=2&cursor={first['next_cursor']}",
+        headers=token_headers,
+    ).json()
+    assert len(second["tasks"]) == 1
+    assert second["next_cursor"] is None
+    assert all(t["status"] == TaskStatus.completed.value for t in second["tasks"])
+
+    resp = client.get(
+        f"/tasks/public?status=New&cursor={first['next_cursor']}", headers=token_headers
+    )
+    assert resp.status_code == 400
+
+
+def test_invalid_cursor_returns_400(token_headers: dict, client: TestClient):
+    # Tampered cursors are rejected instead of causing a server error
+    resp = client.get("/tasks?cursor=not-a-cursor", headers=token_headers)
+    assert resp.status_code == 400
+    assert resp.json()["detail"] == "Invalid cursor"
+
+
+def test_total_none_skips_count(token_headers: dict, client: TestClient):
+    # total=none returns the page without counting
+    client.post("/tasks", json={"title": "A"}, headers=token_headers)
+    resp = client.get("/tasks?total=none", headers=token_headers)
+    assert resp.status_code == 200
+    assert resp.json()["total"] is None
+    assert len(resp.json()["tasks"]) == 1
+
+
+def test_total_estimate_is_invalidated_by_writes(
+    token_headers: dict, client: TestClient, drain_outbox
+):
+    # Estimated totals are cached but writes of the current user drop the cached value
+    client.post("/tasks", json={"title": "A"}, headers=token_headers)
+    drain_outbox()
+    assert (
+        client.get("/tasks?total=estimate", headers=token_headers).json()["total"] == 1
+    )
+    t = client.post("/tasks", json={"title": "B"}, headers=token_headers).json()
+    drain_outbox()
+    assert (
+        client.get("/tasks?total=estimate", headers=token_headers).json()["total"] == 2
+    )
+    # The public estimate may come from Postgres statistics, so a cached sentinel shows whether it was dropped
+    count_cache.set((None, None), 99)
+    assert (
+        client.get("/tasks/public?total=estimate", headers=token_headers).json()[
+            "total"
+        ]
+        == 99
+    )
+    client.delete(f"/tasks/{t['id']}", headers=token_headers)
+    drain_outbox()
+    assert (
+        client.get("/tasks/public?total=estimate", headers=token_headers).json()[
+            "total"
+        ]
+        != 99
+    )
+
+
+def test_invalid_total_mode_returns_422(token_headers: dict, client: TestClient):
+    resp = client.get("/tasks?total=sometimes", headers=token_headers)
+    assert resp.status_code == 422
+
+
+def test_update_is_one_statement(token_headers: dict, client: TestClient, db_session):
+    # Owned writes are a single UPDATE/DELETE ... RETURNING without a lookup first
+    task_id = client.post("/tasks", json={"title": "T"}, headers=token_headers).json()[
+        "id"
+    ]
+    statements = []
+
+    def record(conn, cursor, statement, parameters, context, executemany):
+        # The outbox worker drains its messages on the same engine
+        if "outbox_messages" in statement:
+            return
+        if statement.lstrip().upper().startswith(("SELECT", "UPDATE", "DELETE")):
+            statements.append(statement)
+
+    engine = db_session.get_bind()
+    event.listen(engine, "before_cursor_execute", record)
+    try:
+        resp = client.put(
+            f"/tasks/{task_id}", json={"title": "New"}, headers=token_headers
+        )
+        assert resp.json()["title"] == "New"
+        client.put(f"/tasks/{task_id}/complete", headers=token_headers)
+        client.delete(f"/tasks/{task_id}", headers=token_headers)
+    finally:
+        event.remove(engine, "before_cursor_execute", record)
+    assert [s.lstrip().split()[0].upper() for s in statements] == [
+        "UPDATE",
+        "UPDATE",
+        "DELETE",
+    ]
+
+
+def test_empty_update_returns_task(
+    token_headers: dict, other_token_headers: dict, client: TestClient
+):
+    task = client.post("/tasks", json={"title": "T"}, headers=token_headers).json()
+    resp = client.put(f"/tasks/{task['id']}", json={}, headers=token_headers)
+    assert resp.status_code == 200
+    assert resp.json() == task
+    resp = client.put(f"/tasks/{task['id']}", json={}, headers=other_token_headers)
+    assert resp.status_code == 403
+
+
+def test_get_task_etag_and_not_modified(token_headers: dict, client: TestClient):
+    task_id = client.post("/tasks", json={"title": "T"}, headers=token_headers).json()[
+        "id"
+    ]
+    resp = client.get(f"/tasks/{task_id}", headers=token_headers)
+    etag = resp.headers["etag"]
+    assert etag == f'"{task_id}-1"'
+
+    resp = client.get(
+        f"/tasks/{task_id}", headers={**token_headers, "If-None-Match": etag}
+    )
+    assert resp.status_code == 304
+    assert resp.content == b""
+
+    # Updates bump the version, so the old ETag no longer matches
+    resp = client.put(f"/tasks/{task_id}", json={"title": "New"}, headers=token_headers)
+    assert resp.headers["etag"] == f'"{task_id}-2"'
+    resp = client.get(
+        f"/tasks/{task_id}", headers={**token_headers, "If-None-Match": etag}
+    )
+    assert resp.status_code == 200
+    assert resp.json()["title"] == "New"
+
+
+def test_update_with_if_match(
+    token_headers: dict, other_token_headers: dict, client: TestClient
+):
+    resp = client.post("/tasks", json={"title": "T"}, headers=token_headers)
+    task_id, etag = resp.json()["id"], resp.headers["etag"]
+
+    resp = client.put(
+        f"/tasks/{task_id}",
+        json={"title": "First"},
+        headers={**token_headers, "If-Match": etag},
+    )
+    assert resp.status_code == 200
+
+    # A second writer holding the old ETag loses instead of overwriting
+    resp = client.put(
+        f"/tasks/{task_id}",
+        json={"title": "Second"},
+        headers={**token_headers, "If-Match": etag},
+    )
+    assert resp.status_code == 412
+    assert client.get(f"/tasks/{task_id}", headers=token_headers).json()["title"] == (
+        "First"
+    )
+
+    # Ownership and existence are still reported before the precondition
+    resp = client.put(
+        f"/tasks/{task_id}",
+        json={"title": "X"},
+        headers={**other_token_headers, "If-Match": etag},
+    )
+    assert resp.status_code == 403
+    resp = client.put(
+        "/tasks/99999", json={"title": "X"}, headers={**token_headers, "If-Match": etag}
+    )
+    assert resp.status_code == 404
+
+
+def test_list_etag_changes_on_write(token_headers: dict, client: TestClient):
+    task_id = client.post("/tasks", json={"title": "T"}, headers=token_headers).json()[
+        "id"
+    ]
+    etag = client.get("/tasks", headers=token_headers).headers["etag"]
+    assert etag.startswith('W/"')
+
+    resp = client.get("/tasks", headers={**token_headers, "If-None-Match": etag})
+    assert resp.status_code == 304
+    # Other parameters give another page and another ETag
+    resp = client.get(
+        "/tasks", params={"limit": 5}, headers={**token_headers, "If-None-Match": etag}
+    )
+    assert resp.status_code == 200
+
+    client.put(f"/tasks/{task_id}/complete", headers=token_headers)
+    resp = client.get("/tasks", headers={**token_headers, "If-None-Match": etag})
+    assert resp.status_code == 200
+    assert resp.json()["tasks"][0]["status"] == "Completed"
+    assert (
+        "etag"
+        not in client.get(
+            "/tasks", params={"total": "none"}, headers=token_headers
+        ).headers
+    )
+
+
+def test_list_etag_changes_when_a_deleted_id_is_reused(
+    token_headers: dict, client: TestClient
+):
+    # SQLite hands the id of a deleted newest task to the next one, with the same count and version sum
+    client.post("/tasks", json={"title": "A"}, headers=token_headers)
+    task_id = client.post("/tasks", json={"title": "B"}, headers=token_headers).json()[
+        "id"
+    ]
+    etag = client.get("/tasks", headers=token_headers).headers["etag"]
+    client.delete(f"/tasks/{task_id}", headers=token_headers)
+    client.post("/tasks", json={"title": "C"}, headers=token_headers)
+
+    resp = client.get("/tasks", headers={**token_headers, "If-None-Match": etag})
+    assert resp.status_code == 200
+    assert [task["title"] for task in resp.json()["tasks"]] == ["A", "C"]
+
+
+def test_list_fields_projection(token_headers: dict, client: TestClient):
+    for i in range(3):
+        client.post(
+            "/tasks",
+            json={"title": f"T{i}", "description": "x" * 50},
+            headers=token_headers,
+        )
+    resp = client.get(
+        "/tasks", params={"fields": "title,status", "limit": 2}, headers=token_headers
+    )
+    assert resp.status_code == 200
+    data = resp.json()
+    assert [set(task) for task in data["tasks"]] == [{"id", "title", "status"}] * 2
+    # Cursors still work because 'id' is always selected
+    resp = client.get(
+        "/tasks",
+        params={"fields": "title", "cursor": data["next_cursor"]},
+        headers=token_headers,
+    )
+    assert [task["title"] for task in resp.json()["tasks"]] == ["T2"]
+
+    public = client.get(
+        "/tasks/public", params={"fields": "id"}, headers=token_headers
+    ).json()
+    assert [set(task) for task in public["tasks"]] == [{"id"}] * 3
+    full = client.get("/tasks/public", headers=token_headers).json()
+    assert set(full["tasks"][0]) == {"id", "title", "description", "status"}
+
+
+def test_list_unknown_field_returns_400(token_headers: dict, client: TestClient):
+    resp = client.get(
+        "/tasks", params={"fields": "title,password"}, headers=token_headers
+    )
+    assert resp.status_code == 400
+
+
+def test_list_sort_and_several_statuses(token_headers: dict, client: TestClient):
+    ids = [
+        client.post("/tasks", json={"title": f"T{i}"}, headers=token_headers).json()[
+            "id"
+        ]
+        for i in range(4)
+    ]
+    client.put(f"/tasks/{ids[1]}/complete", headers=token_headers)
+    client.put(
+        f"/tasks/{ids[2]}",
+        json={"title": "T2", "status": "In Progress"},
+        headers=token_headers,
+    )
+    resp = client.get(
+        "/tasks",
+        params={"sort": "-id", "status": ["New", "Completed"]},
+        headers=token_headers,
+    )
+    assert resp.status_code == 200
+    assert [task["id"] for task in resp.json()["tasks"]] == [ids[3], ids[1], ids[0]]
+    assert resp.json()["total"] == 3
+
+
+def test_list_sort_by_updated_at_pages_with_cursor(
+    token_headers: dict, client: TestClient
+):
+    ids = [
+        client.post("/tasks", json={"title": f"T{i}"}, headers=token_headers).json()[
+            "id"
+        ]
+        for i in range(3)
+    ]
+    client.put(f"/tasks/{ids[0]}", json={"title": "Changed"}, headers=token_headers)
+
+    seen, cursor = [], None
+    while True:
+        params: dict = {"sort": "-updated_at", "limit": 1, "fields": "title"}
+        if cursor:
+            params["cursor"] = cursor
+        data = client.get("/tasks", params=params, headers=token_headers).json()
+        # The sort column is read for the cursor but only returned when requested
+        assert all(set(task) == {"id", "title"} for task in data["tasks"])
+        seen += [task["id"] for task in data["tasks"]]
+        cursor = data["next_cursor"]
+        if not cursor:
+            break
+    assert seen == [ids[0], ids[2], ids[1]]
+
+    # Tasks changed after T1 was created: T2 and the update of T0
+    since = client.get(
+        "/tasks", params={"fields": "updated_at", "limit": 3}, headers=token_headers
+    ).json()["tasks"][1]["updated_at"]
+    resp = client.get(
+        "/tasks",
+        params={"sort": "updated_at", "updated_after": since},
+        headers=token_headers,
+    )
+    assert [task["id"] for task in resp.json()["tasks"]] == [ids[2], ids[0]]
+
+
+def test_list_filter_needs_sort_on_its_column(token_headers: dict, client: TestClient):
+    # Only combinations an index covers are accepted
+    assert client.get("/tasks?sort=title", headers=token_headers).status_code == 422
+    for params in (
+        {"created_after": "2020-01-01T00:00:00Z"},
+        {"created_after": "2020-01-01T00:00:00Z", "sort": "-updated_at"},
+        {"updated_after": "2020-01-01T00:00:00Z", "sort": "created_at"},
+    ):
+        resp = client.get("/tasks/public", params=params, headers=token_headers)
+        assert resp.status_code == 400
+    resp = client.get(
+        "/tasks/public",
+        params={"created_after": "2020-01-01T00:00:00Z", "sort": "-created_at"},
+        headers=token_headers,
+    )
+    assert resp.status_code == 200
+
+
+def test_cursor_is_bound_to_sort(token_headers: dict, client: TestClient):
+    for i in range(3):
+        client.post("/tasks", json={"title": f"T{i}"}, headers=token_headers)
+    cursor = client.get("/tasks?limit=1&sort=created_at", headers=token_headers).json()[
+        "next_cursor"
+    ]
+    resp = client.get(
+        "/tasks",
+        params={"sort": "-created_at", "cursor": cursor},
+        headers=token_headers,
+    )
+    assert resp.status_code == 400
@@ -0,0 +1,160 @@
+import pytest
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
+from sqlalchemy.pool import NullPool
+
+from app.auth.routes_auth_async import router as async_auth_router
+from app.crud.routes_tasks_async import router as async_tasks_router
+from app.db.deps import get_async_db
+from app.db.session import make_async_url
+from app.models.models import TaskStatus
+from app.tests.conftest import TEST_DATABASE_URL
+
+"""
+The async routes are only mounted in app.main when DB_MODE=async, so these tests mount them on their own app.
+Tokens come from the normal client fixtures since they are valid for both apps.
+"""
+
+
+@pytest.fixture(scope="function")
+def async_client():  # Test client for the async auth and task routes on TEST_DATABASE_URL
+    async_engine = create_async_engine(
+        make_async_url(TEST_DATABASE_URL), poolclass=NullPool
+    )
+    AsyncTestingSessionLocal = async_sessionmaker(
+        async_engine, autoflush=False, expire_on_commit=False
+    )
+
+    async def override_get_async_db():
+        async with AsyncTestingSessionLocal() as db:
+            yield db
+
+    async_app = FastAPI()
+    async_app.include_router(async_auth_router, prefix="/auth")
+    async_app.include_router(async_tasks_router, prefix="/tasks")
+    async_app.dependency_overrides[get_async_db] = override_get_async_db
+
+    with TestClient(async_app) as c:
+        yield c
+
+
+def test_make_async_url():
+    # Sync drivers are swapped for their async counterparts
+    assert make_async_url("postgresql://u:p@db:5432/todo") == (
+        "postgresql+asyncpg://u:p@db:5432/todo"
+    )
+    assert make_async_url("sqlite:///./test.db") == "sqlite+aiosqlite:///./test.db"
+    with pytest.raises(ValueError):
+        make_async_url("mysql://u:p@db/todo")
+
+
+def test_async_requires_authentication(async_client: TestClient):
+    assert async_client.get("/tasks").status_code == 403
+
+
+def test_async_crud_flow(token_headers: dict, async_client: TestClient):
+    # Create, read, update, complete and delete through the async routes
+    resp = async_client.post("/tasks", json={"title": "Async"}, headers=token_headers)
+    assert resp.status_code == 200
+    task = resp.json()
+    assert task["status"] == TaskStatus.new.value
+
+    resp = async_client.get(f"/tasks/{task['id']}", headers=token_headers)
+    assert resp.json()["title"] == "Async"
+
+    resp = async_client.put(
+        f"/tasks/{task['id']}", json={"title": "Async updated"}, headers=token_headers
+    )
+    assert resp.json()["title"] == "Async updated"
+
+    resp = async_client.put(f"/tasks/{task['id']}/complete", headers=token_headers)
+    assert resp.json()["status"] == TaskStatus.completed.value
+
+    resp = async_client.delete(f"/tasks/{task['id']}", headers=token_headers)
+    assert resp.json()["message"] == "Task deleted"
+    assert (
+        async_client.get(f"/tasks/{task['id']}", headers=token_headers).status_code
+        == 404
+    )
+
+
+def test_async_ownership(
+    token_headers: dict, other_token_headers: dict, async_client: TestClient
+):
+    # Other users get 403 like on the sync routes
+    tid = async_client.post(
+        "/tasks", json={"title": "Mine"}, headers=token_headers
+    ).json()["id"]
+    assert (
+        async_client.get(f"/tasks/{tid}", headers=other_token_headers).status_code
+        == 403
+    )
+    assert (
+        async_client.delete(f"/tasks/{tid}", headers=other_token_headers).status_code
+        == 403
+    )
+
+
+def test_async_pagination(token_headers: dict, async_client: TestClient):
+    # Offset and cursor pagination work the same as on the sync routes
+    for i in range(5):
+        async_client.post("/tasks", json={"title": f"A{i}"}, headers=token_headers)
+    data = async_client.get("/tasks?skip=2&limit=2", headers=token_headers).json()
+    assert data["total"] == 5
+    assert len(data["tasks"]) == 2
+
+    data = async_client.get(
+        f"/tasks/public?limit=2&cursor={data['next_cursor']}", headers=token_headers
+    ).json()
+    assert [t["title"] for t in data["tasks"]] == ["A4"]
+    assert data["next_cursor"] is None
+
+
+def test_async_etags(token_headers: dict, async_client: TestClient):
+    resp = async_client.post("/tasks", json={"title": "A"}, headers=token_headers)
+    task_id, etag = resp.json()["id"], resp.headers["etag"]
+    resp = async_client.get(
+        f"/tasks/{task_id}", headers={**token_headers, "If-None-Match": etag}
+    )
+    assert resp.status_code == 304
+
+    list_etag = async_client.get("/tasks", headers=token_headers).headers["etag"]
+    resp = async_client.put(
+        f"/tasks/{task_id}",
+        json={"title": "B"},
+        headers={**token_headers, "If-Match": etag},
+    )
+    assert resp.status_code == 200
+    resp = async_client.put(
+        f"/tasks/{task_id}",
+        json={"title": "C"},
+        headers={**token_headers, "If-Match": etag},
+    )
+    assert resp.status_code == 412
+    resp = async_client.get(
+        "/tasks", headers={**token_headers, "If-None-Match": list_etag}
+    )
+    assert resp.status_code == 200
+
+
+def test_async_register_and_login(async_client: TestClient):
+    user = {
+        "first_name": "Async",
+        "last_name": "User",
+        "username": "asyncuser",
+        "password": "password123",
+    }
+    resp = async_client.post("/auth/register", json=user)
+    assert resp.status_code == 200
+    assert resp.json()["token_type"] == "bearer"
+    assert async_client.post("/auth/register", json=user).status_code == 400
+
+    login = {"username": "asyncuser", "password": "password123"}
+    resp = async_client.post("/auth/login", json=login)
+    assert resp.status_code == 200
+    headers = {"Authorization": f"Bearer {resp.json()['access_token']}"}
+    assert async_client.get("/tasks", headers=headers).status_code == 200
+
+    login["password"] = "wrong"
+    assert async_client.post("/auth/login", json=login).status_code == 400
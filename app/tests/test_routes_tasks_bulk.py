@@ -0,0 +1,144 @@
+from fastapi.testclient import TestClient
+from sqlalchemy import delete
+
+from app.core.config import settings
+from app.crud import routes_tasks_bulk
+from app.models.models import Task, TaskStatus
+
+
+def test_bulk_requires_authentication(client: TestClient):
+    assert client.post("/tasks/bulk", json=[{"title": "A"}]).status_code == 403
+    assert client.patch("/tasks/bulk", json=[{"id": 1}]).status_code == 403
+    assert client.request("DELETE", "/tasks/bulk", json={"ids": [1]}).status_code == 403
+
+
+def test_bulk_create(token_headers: dict, client: TestClient):
+    # Tasks are created in request order and show up in the user's list
+    payload = [{"title": f"Bulk{i}", "description": "d"} for i in range(5)]
+    resp = client.post("/tasks/bulk", json=payload, headers=token_headers)
+    assert resp.status_code == 200
+    results = resp.json()["results"]
+    assert [r["task"]["title"] for r in results] == [p["title"] for p in payload]
+    assert all(r["status_code"] == 200 for r in results)
+    assert all(r["task"]["status"] == TaskStatus.new.value for r in results)
+    assert client.get("/tasks", headers=token_headers).json()["total"] == 5
+
+
+def test_bulk_create_validates_every_item(token_headers: dict, client: TestClient):
+    # One invalid item rejects the whole request before anything is written
+    payload = [{"title": "Valid"}, {"title": ""}]
+    resp = client.post("/tasks/bulk", json=payload, headers=token_headers)
+    assert resp.status_code == 422
+    assert client.get("/tasks", headers=token_headers).json()["total"] == 0
+
+
+def test_bulk_create_limit(token_headers: dict, client: TestClient):
+    payload = [{"title": "x"}] * (settings.BULK_MAX_ITEMS + 1)
+    resp = client.post("/tasks/bulk", json=payload, headers=token_headers)
+    assert resp.status_code == 422
+    assert client.post("/tasks/bulk", json=[], headers=token_headers).status_code == 422
+
+
+def test_bulk_update_reports_per_item_results(
+    token_headers: dict, other_token_headers: dict, client: TestClient
+):
+    # Own tasks are updated, other users' tasks get 403, missing ids 404 and repeated ids 400
+    mine = client.post(
+        "/tasks/bulk", json=[{"title": "A"}, {"title": "B"}], headers=token_headers
+    ).json()["results"]
+    other = client.post(
+        "/tasks", json={"title": "Theirs"}, headers=other_token_headers
+    ).json()
+    a_id, b_id = mine[0]["id"], mine[1]["id"]
+
+    payload = [
+        {"id": a_id, "title": "A2"},
+        {"id": b_id, "status": TaskStatus.completed.value},
+        {"id": other["id"], "title": "hacked"},
+        {"id": 999999, "title": "nope"},
+        {"id": a_id, "title": "again"},
+    ]
+    resp = client.patch("/tasks/bulk", json=payload, headers=token_headers)
+    assert resp.status_code == 200
+    results = resp.json()["results"]
+    assert [r["status_code"] for r in results] == [200, 200, 403, 404, 400]
+    assert results[0]["task"]["title"] == "A2"
+    assert results[1]["task"]["status"] == TaskStatus.completed.value
+    assert results[1]["task"]["title"] == "B"
+
+    theirs = client.get(f"/tasks/{other['id']}", headers=other_token_headers).json()
+    assert theirs["title"] == "Theirs"
+
+
+def test_bulk_update_mixes_field_sets_in_one_statement(
+    token_headers: dict, client: TestClient
+):
+    mine = client.post(
+        "/tasks/bulk",
+        json=[{"title": "A", "description": "a"}, {"title": "B"}, {"title": "C"}],
+        headers=token_headers,
+    ).json()["results"]
+    payload = [
+        {"id": mine[0]["id"], "description": None},
+        {"id": mine[1]["id"], "title": "B2", "status": TaskStatus.in_progress.value},
+        {"id": mine[2]["id"]},  # Nothing to change
+    ]
+    results = client.patch("/tasks/bulk", json=payload, headers=token_headers).json()[
+        "results"
+    ]
+    assert [r["task"] for r in results] == [
+        {**mine[0]["task"], "description": None},
+        {**mine[1]["task"], "title": "B2", "status": TaskStatus.in_progress.value},
+        mine[2]["task"],
+    ]
+
+
+def test_bulk_update_reports_tasks_deleted_meanwhile_as_missing(
+    token_headers: dict, client: TestClient, db_session, monkeypatch
+):
+    mine = client.post(
+        "/tasks/bulk", json=[{"title": "A"}, {"title": "B"}], headers=token_headers
+    ).json()["results"]
+    a_id, b_id = mine[0]["id"], mine[1]["id"]
+    update_owned_tasks = routes_tasks_bulk.update_owned_tasks
+
+    def delete_first(user_id, changes):  # Another request deletes B after the lookup
+        db_session.execute(delete(Task).where(Task.id == b_id))
+        return update_owned_tasks(user_id, changes)
+
+    monkeypatch.setattr(routes_tasks_bulk, "update_owned_tasks", delete_first)
+    payload = [{"id": a_id, "title": "A2"}, {"id": b_id, "title": "B2"}]
+    results = client.patch("/tasks/bulk", json=payload, headers=token_headers).json()[
+        "results"
+    ]
+    assert [(r["id"], r["status_code"]) for r in results] == [(a_id, 200), (b_id, 404)]
+
+
+def test_bulk_delete(
+    token_headers: dict, other_token_headers: dict, client: TestClient
+):
+    # Only the current user's tasks are deleted
+    mine = client.post(
+        "/tasks/bulk", json=[{"title": "A"}, {"title": "B"}], headers=token_headers
+    ).json()["results"]
+    other = client.post(
+        "/tasks", json={"title": "Theirs"}, headers=other_token_headers
+    ).json()
+
+    ids = [mine[0]["id"], other["id"], 999999, mine[1]["id"], mine[0]["id"]]
+    resp = client.request(
+        "DELETE", "/tasks/bulk", json={"ids": ids}, headers=token_headers
+    )
+    assert resp.status_code == 200
+    results = resp.json()["results"]
+    assert [(r["id"], r["status_code"]) for r in results] == [
+        (mine[0]["id"], 200),
+        (other["id"], 403),
+        (999999, 404),
+        (mine[1]["id"], 200),
+    ]
+    assert client.get("/tasks", headers=token_headers).json()["total"] == 0
+    assert (
+        client.get(f"/tasks/{other['id']}", headers=other_token_headers).status_code
+        == 200
+    )
@@ -0,0 +1,158 @@
+from datetime import timedelta
+
+from fastapi.testclient import TestClient
+from sqlalchemy import insert, update
+from sqlalchemy.dialects import postgresql
+
+from app.core.config import settings
+from app.crud.changes import changed_tasks, prune_tombstones
+from app.crud.pagination import decode_payload, encode_payload
+from app.models.models import Task, TaskTombstone, utcnow
+
+
+def sync(client: TestClient, headers: dict, since=None, limit=100) -> dict:
+    params = {"limit": limit}
+    if since is not None:
+        params["since"] = since
+    resp = client.get("/tasks/changes", params=params, headers=headers)
+    assert resp.status_code == 200
+    return resp.json()
+
+
+def test_changes_returns_only_writes_after_token(
+    token_headers: dict, client: TestClient
+):
+    ids = [
+        client.post("/tasks", json={"title": f"T{i}"}, headers=token_headers).json()[
+            "id"
+        ]
+        for i in range(3)
+    ]
+    first = sync(client, token_headers)
+    assert [task["id"] for task in first["tasks"]] == ids
+    assert first["deleted"] == [] and first["has_more"] is False
+    assert {"created_at", "updated_at"} <= set(first["tasks"][0])
+
+    # Nothing changed: same token, no rows
+    idle = sync(client, token_headers, first["since"])
+    assert idle["tasks"] == [] and idle["deleted"] == []
+
+    client.put(f"/tasks/{ids[0]}", json={"title": "Changed"}, headers=token_headers)
+    client.delete(f"/tasks/{ids[1]}", headers=token_headers)
+    new_id = client.post("/tasks", json={"title": "New"}, headers=token_headers).json()[
+        "id"
+    ]
+    changes = sync(client, token_headers, idle["since"])
+    assert [task["id"] for task in changes["tasks"]] == [ids[0], new_id]
+    assert changes["tasks"][0]["title"] == "Changed"
+    assert changes["deleted"] == [ids[1]]
+
+
+def test_changes_pages_with_has_more(token_headers: dict, client: TestClient):
+    ids = [
+        client.post("/tasks", json={"title": f"T{i}"}, headers=token_headers).json()[
+            "id"
+        ]
+        for i in range(3)
+    ]
+    since = sync(client, token_headers)["since"]
+    client.delete(f"/tasks/{ids[0]}", headers=token_headers)
+    client.put(f"/tasks/{ids[2]}/complete", headers=token_headers)
+    client.delete(f"/tasks/{ids[1]}", headers=token_headers)
+
+    page = sync(client, token_headers, since, limit=2)
+    assert page["deleted"] == [ids[0]]
+    assert [task["id"] for task in page["tasks"]] == [ids[2]]
+    assert page["has_more"] is True
+    page = sync(client, token_headers, page["since"], limit=2)
+    assert page["deleted"] == [ids[1]] and page["tasks"] == []
+    assert page["has_more"] is False
+
+
+def test_change_seq_increases_with_every_write(
+    token_headers: dict, client: TestClient, db_session
+):
+    task_id = client.post("/tasks", json={"title": "A"}, headers=token_headers).json()[
+        "id"
+    ]
+    created = db_session.get(Task, task_id).change_seq
+    client.put(f"/tasks/{task_id}", json={"title": "B"}, headers=token_headers)
+    db_session.expire_all()
+    updated = db_session.get(Task, task_id).change_seq
+    client.delete(f"/tasks/{task_id}", headers=token_headers)
+    tombstone = db_session.query(TaskTombstone).filter_by(task_id=task_id).one()
+    assert created < updated < tombstone.change_seq
+
+
+def test_changes_token_is_bound_to_user(
+    token_headers: dict, other_token_headers: dict, client: TestClient
+):
+    client.post("/tasks", json={"title": "Mine"}, headers=token_headers)
+    since = sync(client, token_headers)["since"]
+    assert sync(client, other_token_headers)["tasks"] == []
+    resp = client.get(
+        "/tasks/changes", params={"since": since}, headers=other_token_headers
+    )
+    assert resp.status_code == 400
+    resp = client.get("/tasks/changes?since=garbage", headers=token_headers)
+    assert resp.status_code == 400
+
+
+def test_tokens_older_than_the_retention_window_expire(
+    token_headers: dict, client: TestClient, monkeypatch
+):
+    for title in ("A", "B"):
+        client.post("/tasks", json={"title": title}, headers=token_headers)
+    first = sync(client, token_headers, limit=1)
+    assert first["has_more"] is True
+    # The client isn't caught up while has_more is True, the token keeps the time of the first page
+    second = sync(client, token_headers, first["since"], limit=1)
+    synced_at = decode_payload(first["since"])["at"]
+    assert decode_payload(second["since"])["at"] == synced_at
+
+    payload = decode_payload(second["since"])
+    stale = synced_at - settings.TOMBSTONE_RETENTION_DAYS * 86400 - 1
+    expired = encode_payload({**payload, "at": stale})
+    resp = client.get(
+        "/tasks/changes", params={"since": expired}, headers=token_headers
+    )
+    assert resp.status_code == 410
+    # Tokens issued before the retention window existed
+    legacy = encode_payload({k: v for k, v in payload.items() if k != "at"})
+    resp = client.get("/tasks/changes", params={"since": legacy}, headers=token_headers)
+    assert resp.status_code == 410
+
+
+def test_prune_tombstones_keeps_the_retention_window(
+    token_headers: dict, client: TestClient, db_session
+):
+    ids = [
+        client.post("/tasks", json={"title": title}, headers=token_headers).json()["id"]
+        for title in ("Old", "New")
+    ]
+    for task_id in ids:
+        client.delete(f"/tasks/{task_id}", headers=token_headers)
+    days = settings.TOMBSTONE_RETENTION_DAYS
+    db_session.execute(
+        update(TaskTombstone)
+        .where(TaskTombstone.task_id == ids[0])
+        .values(deleted_at=utcnow() - timedelta(days=days + 1))
+    )
+    db_session.commit()
+
+    assert prune_tombstones(db_session, utcnow()) == 1
+    assert [t.task_id for t in db_session.query(TaskTombstone)] == [ids[1]]
+
+
+def test_postgres_writers_use_a_sequence_and_readers_a_snapshot_horizon():
+    # No lock or max() on Postgres: the sequence orders writes, the snapshot's xmin keeps readers behind running ones
+    dialect = postgresql.dialect()
+    write = str(insert(Task).values(title="T").compile(dialect=dialect))
+    assert "nextval('task_change_seq')" in write
+    assert "pg_current_xact_id()" in write
+    assert "max(" not in write
+    rewrite = str(update(Task).values(title="T").compile(dialect=dialect))
+    assert "nextval('task_change_seq')" in rewrite
+    read = str(changed_tasks(1, (0, 0, 0), 10).compile(dialect=dialect))
+    assert "tasks.change_xid < pg_snapshot_xmin(pg_current_snapshot())" in read
+    assert "ORDER BY tasks.change_xid, tasks.change_seq, tasks.id" in read
@@ -0,0 +1,91 @@
+import csv
+import io
+import json
+
+from fastapi.testclient import TestClient
+from sqlalchemy import update
+
+from app.core.config import settings
+from app.models.models import Task
+
+
+def create_tasks(client: TestClient, headers: dict, count: int, prefix: str = "T"):
+    payload = [{"title": f"{prefix}{i}", "description": "d"} for i in range(count)]
+    assert client.post("/tasks/bulk", json=payload, headers=headers).status_code == 200
+
+
+def test_export_requires_authentication(client: TestClient):
+    assert client.get("/tasks/export").status_code == 403
+    assert client.get("/tasks/public/export").status_code == 403
+
+
+def test_export_ndjson_only_own_tasks(
+    token_headers: dict, other_token_headers: dict, client: TestClient, monkeypatch
+):
+    # Small batches so the export spans several chunks
+    monkeypatch.setattr(settings, "EXPORT_BATCH_SIZE", 2)
+    create_tasks(client, token_headers, 5)
+    create_tasks(client, other_token_headers, 2, prefix="Other")
+
+    resp = client.get("/tasks/export", headers=token_headers)
+    assert resp.status_code == 200
+    assert resp.headers["content-type"].startswith("application/x-ndjson")
+    rows = [json.loads(line) for line in resp.text.splitlines()]
+    assert [row["title"] for row in rows] == [f"T{i}" for i in range(5)]
+    assert rows[0].keys() == {"id", "title", "description", "status"}
+    assert [row["id"] for row in rows] == sorted(row["id"] for row in rows)
+
+
+def test_export_csv_with_status_filter(token_headers: dict, client: TestClient):
+    create_tasks(client, token_headers, 3)
+    first_id = client.get("/tasks", headers=token_headers).json()["tasks"][0]["id"]
+    client.put(f"/tasks/{first_id}/complete", headers=token_headers)
+
+    resp = client.get(
+        "/tasks/export",
+        params={"format": "csv", "status": "Completed"},
+        headers=token_headers,
+    )
+    assert resp.status_code == 200
+    assert resp.headers["content-type"].startswith("text/csv")
+    assert 'filename="tasks.csv"' in resp.headers["content-disposition"]
+    rows = list(csv.DictReader(io.StringIO(resp.text)))
+    assert rows == [
+        {"id": str(first_id), "title": "T0", "description": "d", "status": "Completed"}
+    ]
+
+
+def test_public_export_includes_all_users(
+    admin_headers: dict, other_token_headers: dict, client: TestClient
+):
+    create_tasks(client, admin_headers, 2)
+    create_tasks(client, other_token_headers, 2, prefix="Other")
+    resp = client.get("/tasks/public/export", headers=admin_headers)
+    assert resp.status_code == 200
+    assert len(resp.text.splitlines()) == 4
+
+
+def test_public_export_requires_admin(
+    admin_headers: dict, other_token_headers: dict, client: TestClient
+):
+    resp = client.get("/tasks/public/export", headers=other_token_headers)
+    assert resp.status_code == 403
+    assert resp.json()["detail"] == "Admin access required"
+
+
+def test_export_tasks_without_status(
+    token_headers: dict, client: TestClient, db_session
+):
+    create_tasks(client, token_headers, 1)
+    db_session.execute(update(Task).values(status=None))
+    db_session.commit()
+
+    resp = client.get("/tasks/export", headers=token_headers)
+    assert json.loads(resp.text)["status"] is None
+    resp = client.get("/tasks/export", params={"format": "csv"}, headers=token_headers)
+    assert list(csv.DictReader(io.StringIO(resp.text)))[0]["status"] == ""
+
+
+def test_export_invalid_format(token_headers: dict, client: TestClient):
+    resp = client.get("/tasks/export", params={"format": "xml"}, headers=token_headers)
+    assert resp.status_code == 422
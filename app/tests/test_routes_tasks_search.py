@@ -0,0 +1,132 @@
+from typing import List, Optional
+
+from fastapi.testclient import TestClient
+from sqlalchemy.dialects import postgresql
+
+from app.crud.search import SearchIndex, search_statement
+
+
+def create_tasks(client: TestClient, headers: dict, tasks: list):
+    resp = client.post("/tasks/bulk", json=tasks, headers=headers)
+    assert resp.status_code == 200
+    return [result["id"] for result in resp.json()["results"]]
+
+
+def test_search_requires_authentication(client: TestClient):
+    assert client.get("/tasks/search?q=milk").status_code == 403
+
+
+def test_search_ranks_title_matches_first(
+    token_headers: dict, other_token_headers: dict, client: TestClient
+):
+    in_description, in_title, _ = create_tasks(
+        client,
+        token_headers,
+        [
+            {"title": "Groceries", "description": "Buy milk and bread"},
+            {"title": "Milk the cow", "description": "Before breakfast"},
+            {"title": "Walk the dog", "description": None},
+        ],
+    )
+    create_tasks(client, other_token_headers, [{"title": "Milk delivery"}])
+
+    data = client.get("/tasks/search?q=MILK", headers=token_headers).json()
+    assert [hit["id"] for hit in data["tasks"]] == [in_title, in_description]
+    assert data["tasks"][0]["rank"] > data["tasks"][1]["rank"]
+    assert data["next_cursor"] is None
+
+    # Every term has to match
+    data = client.get("/tasks/search?q=milk bread", headers=token_headers).json()
+    assert [hit["id"] for hit in data["tasks"]] == [in_description]
+
+    data = client.get("/tasks/search?q=milk&scope=public", headers=token_headers).json()
+    assert len(data["tasks"]) == 3
+
+
+def test_search_pages_with_cursor(token_headers: dict, client: TestClient):
+    create_tasks(
+        client,
+        token_headers,
+        [{"title": "report " * (i % 3 + 1), "description": "d"} for i in range(7)],
+    )
+    seen, cursor = [], None
+    while True:
+        params: dict = {
+            "q": "report",
+            "limit": 3,
+            **({"cursor": cursor} if cursor else {}),
+        }
+        data = client.get("/tasks/search", params=params, headers=token_headers).json()
+        seen.extend(data["tasks"])
+        cursor = data["next_cursor"]
+        if cursor is None:
+            break
+    assert len({hit["id"] for hit in seen}) == 7
+    ranks = [hit["rank"] for hit in seen]
+    assert ranks == sorted(ranks, reverse=True)
+
+    first = client.get("/tasks/search?q=report&limit=3", headers=token_headers).json()
+    resp = client.get(
+        "/tasks/search",
+        params={"q": "other", "cursor": first["next_cursor"]},
+        headers=token_headers,
+    )
+    assert resp.status_code == 400
+
+
+def test_search_sees_updates(token_headers: dict, client: TestClient, drain_outbox):
+    (task_id,) = create_tasks(client, token_headers, [{"title": "Draft"}])
+    drain_outbox()
+    assert (
+        client.get("/tasks/search?q=final", headers=token_headers).json()["tasks"] == []
+    )
+    client.put(f"/tasks/{task_id}", json={"title": "Final"}, headers=token_headers)
+    drain_outbox()
+    data = client.get("/tasks/search?q=final", headers=token_headers).json()
+    assert [hit["id"] for hit in data["tasks"]] == [task_id]
+
+
+def test_search_index_keyset():
+    index = SearchIndex(
+        [
+            {"id": 1, "title": "a", "description": None, "status": "New"},
+            {"id": 2, "title": "a a", "description": None, "status": "New"},
+            {"id": 3, "title": "a", "description": None, "status": "New"},
+        ]
+    )
+    assert [hit["id"] for hit in index.search("a", 10, None)] == [2, 1, 3]
+    assert [hit["id"] for hit in index.search("a", 10, (2.0, 1))] == [3]
+
+
+def test_search_pages_through_tied_ranks(token_headers: dict, client: TestClient):
+    # Equal ranks like 0.1 must survive the cursor, or every tie after the first page is lost
+    ids = create_tasks(
+        client,
+        token_headers,
+        [{"title": f"Errand {n}", "description": "buy milk"} for n in range(5)],
+    )
+    found: List[int] = []
+    cursor: Optional[str] = None
+    while True:
+        params: dict = {
+            "q": "milk",
+            "limit": 2,
+            **({"cursor": cursor} if cursor else {}),
+        }
+        data = client.get("/tasks/search", params=params, headers=token_headers).json()
+        found.extend(hit["id"] for hit in data["tasks"])
+        cursor = data["next_cursor"]
+        if cursor is None:
+            break
+    assert found == ids
+
+
+def test_postgres_search_uses_the_tsvector_column():
+    sql = str(
+        search_statement("buy milk", 1, 20, (0.5, 10)).compile(
+            dialect=postgresql.dialect()
+        )
+    )
+    assert "tasks.search_vector @@ websearch_to_tsquery" in sql
+    assert "ORDER BY CAST(ts_rank_cd" in sql
+    assert "AS DOUBLE PRECISION) < " in sql
@@ -0,0 +1,122 @@
+import asyncio
+import threading
+
+import pytest
+from fastapi.testclient import TestClient
+
+from app.core.config import settings
+from app.crud.events import (PUBLIC_CHANNEL, EventBus, PostgresBroker,
+                             task_event, task_events, user_channel)
+from app.crud.routes_tasks_stream import event_stream
+from app.models.models import User
+from app.tests.conftest import engine
+
+
+def test_bus_delivers_from_other_threads_and_resets_slow_streams():
+    bus = EventBus(max_subscriptions=2, max_events=2)
+
+    async def run():
+        with bus.subscribe("user:1") as subscription:
+            assert bus.full is False
+            thread = threading.Thread(
+                target=bus.deliver, args=(["user:1", "public"], [{"id": 1}])
+            )
+            thread.start()
+            thread.join()
+            assert await subscription.next(1) == {"id": 1}
+            assert await subscription.next(0.01) is None
+
+            bus.deliver(["public"], [{"id": 2}])  # Another channel
+            bus.deliver(["user:1"], [{"id": n} for n in range(3)])
+            await asyncio.sleep(0)
+            assert subscription.overflowed is True
+        assert bus._channels == {} and bus._count == 0
+
+    asyncio.run(run())
+
+
+def test_event_stream_formats_events_and_keep_alives(monkeypatch):
+    monkeypatch.setattr(settings, "STREAM_HEARTBEAT_SECONDS", 0.01)
+
+    async def run():
+        stream = event_stream("user:7")
+        assert (await stream.__anext__()).startswith("retry: ")
+        task_events.deliver(["user:7"], [task_event("deleted", 3)])
+        assert await stream.__anext__() == (
+            'event: deleted\ndata: {"type":"deleted","id":3}\n\n'
+        )
+        assert await stream.__anext__() == ": keep-alive\n\n"
+        task_events.deliver(
+            ["user:7"], [{"type": "deleted", "id": n} for n in range(200)]
+        )
+        await asyncio.sleep(0)
+        messages = [message async for message in stream]
+        assert messages == ["event: reset\ndata: {}\n\n"]
+
+    asyncio.run(run())
+    assert task_events._count == 0
+
+
+def test_postgres_broker_delivers_notifications():
+    if engine.dialect.name != "postgresql":
+        pytest.skip("LISTEN/NOTIFY needs PostgreSQL")
+    bus = EventBus(max_subscriptions=1, max_events=10)
+    broker = PostgresBroker(engine, bus)
+    broker.start()
+    try:
+        assert broker.listening.wait(5), "The listener didn't LISTEN"
+
+        async def run():
+            with bus.subscribe("user:1") as subscription:
+                broker.publish(["user:1"], [task_event("deleted", 4)])
+                assert await subscription.next(5) == {"type": "deleted", "id": 4}
+
+        asyncio.run(run())
+    finally:
+        broker.stop()
+
+
+def test_writes_publish_events(token_headers: dict, client: TestClient, db_session):
+    user_id = db_session.query(User.id).filter_by(username="user1").scalar()
+    if task_events.broker is not None:  # NOTIFYs sent before the LISTEN are lost
+        assert task_events.broker.listening.wait(5), "The listener didn't LISTEN"
+
+    async def run():
+        loop = asyncio.get_running_loop()
+        with task_events.subscribe(user_channel(user_id)) as own, task_events.subscribe(
+            PUBLIC_CHANNEL
+        ) as public:
+            created = await loop.run_in_executor(
+                None,
+                lambda: client.post(
+                    "/tasks", json={"title": "Live"}, headers=token_headers
+                ).json(),
+            )
+            await loop.run_in_executor(
+                None,
+                lambda: client.put(
+                    f"/tasks/{created['id']}/complete", headers=token_headers
+                ),
+            )
+            await loop.run_in_executor(
+                None,
+                lambda: client.delete(f"/tasks/{created['id']}", headers=token_headers),
+            )
+            for subscription in (own, public):
+                events = [await subscription.next(1) for _ in range(3)]
+                assert [event["type"] for event in events] == [
+                    "created",
+                    "completed",
+                    "deleted",
+                ]
+                assert events[0]["task"] == created
+                assert events[1]["task"]["status"] == "Completed"
+                assert events[2] == {"type": "deleted", "id": created["id"]}
+
+    asyncio.run(run())
+
+
+def test_stream_limit_returns_503(token_headers: dict, client: TestClient, monkeypatch):
+    monkeypatch.setattr(task_events, "max_subscriptions", 0)
+    resp = client.get("/tasks/stream", headers=token_headers)
+    assert resp.status_code == 503
@@ -0,0 +1,73 @@
+import runpy
+import sys
+from pathlib import Path
+
+import pytest
+from pydantic import ValidationError
+
+from app.core.config import Settings, settings
+
+server = pytest.importorskip("app.core.server", exc_type=ImportError)
+
+
+def test_gunicorn_options_come_from_settings(monkeypatch):
+    monkeypatch.setattr(settings, "SERVER_WORKERS", 3)
+    monkeypatch.setattr(settings, "TASK_EVENTS_BACKEND", "postgres")
+    monkeypatch.setattr(settings, "SERVER_MAX_REQUESTS_JITTER", 50)
+    options = server.gunicorn_options()
+    assert options["workers"] == 3
+    assert options["max_requests_jitter"] == 50
+    assert options["worker_class"] == "app.core.server.UvicornWorker"
+
+
+def test_several_workers_require_the_postgres_event_backend(monkeypatch):
+    monkeypatch.setattr(settings, "TASK_EVENTS_BACKEND", "memory")
+    monkeypatch.setattr(settings, "SERVER_WORKERS", 2)
+    with pytest.raises(RuntimeError, match="TASK_EVENTS_BACKEND=postgres"):
+        server.gunicorn_options()
+    monkeypatch.setattr(settings, "SERVER_WORKERS", 1)
+    assert server.gunicorn_options()["workers"] == 1
+
+
+def test_workers_default_to_cpu_count(monkeypatch):
+    monkeypatch.setattr(settings, "SERVER_WORKERS", 0)
+    monkeypatch.setattr(server.multiprocessing, "cpu_count", lambda: 6)
+    assert server.worker_count() == 6
+
+
+def test_post_fork_gives_the_worker_its_own_pool():
+    from app.db.session import engine
+
+    inherited = engine.pool
+    server.post_fork(None, None)
+    assert engine.pool is not inherited
+
+
+def test_task_events_backend_follows_the_database(monkeypatch):
+    monkeypatch.setattr(settings, "TASK_EVENTS_BACKEND", None)
+    monkeypatch.setattr(settings, "DATABASE_URL", "postgresql://app@db/app")
+    assert settings.task_events_backend == "postgres"
+    monkeypatch.setattr(settings, "DATABASE_URL", None)  # Built from POSTGRES_*
+    assert settings.task_events_backend == "postgres"
+    monkeypatch.setattr(settings, "DATABASE_URL", "sqlite:///./app.db")
+    assert settings.task_events_backend == "memory"
+    monkeypatch.setattr(settings, "TASK_EVENTS_BACKEND", "postgres")
+    assert settings.task_events_backend == "postgres"
+
+
+def test_orjson_responses_require_orjson(monkeypatch):
+    # Fails at startup instead of on the first response
+    monkeypatch.setitem(sys.modules, "orjson", None)
+    with pytest.raises(ValidationError, match="needs orjson installed"):
+        Settings(JSON_RESPONSE="orjson")
+
+
+def test_gunicorn_config_loads_with_default_settings(monkeypatch):
+    # As in the Docker image: PostgreSQL, SERVER_WORKERS and TASK_EVENTS_BACKEND unset, several cores
+    monkeypatch.setattr(settings, "DATABASE_URL", "postgresql://app@db/app")
+    for name in ("SERVER_WORKERS", "TASK_EVENTS_BACKEND"):
+        monkeypatch.setattr(settings, name, type(settings).model_fields[name].default)
+    monkeypatch.setattr(server.multiprocessing, "cpu_count", lambda: 4)
+    config = runpy.run_path(str(Path(__file__).parents[2] / "gunicorn.conf.py"))
+    assert config["workers"] == 4
+    assert config["worker_class"] == "app.core.server.UvicornWorker"
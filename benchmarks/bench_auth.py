@@ -0,0 +1,56 @@
+"""
+Per-request authentication overhead before and after the verified-token cache.
+
+Measures the token part of get_current_user with the identity lookup served from its cache, which is the
+steady-state path for a client that reuses its token. Run from the repository root with the app's env variables set:
+
+    python -m benchmarks.bench_auth --iterations 20000
+"""
+
+import argparse
+import json
+import timeit
+
+from app.auth import auth
+from app.auth.identity import CurrentUser, cache_user
+from app.db.deps import resolve_token
+
+
+def bench(label: str, fn, iterations: int) -> dict:
+    seconds = min(timeit.repeat(fn, number=iterations, repeat=5))
+    return {"case": label, "us_per_request": round(seconds / iterations * 1e6, 2)}
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--iterations", type=int, default=20000)
+    args = parser.parse_args()
+
+    token = auth.create_access_token({"sub": "bench", "uid": 1})
+    cache_user(CurrentUser(id=1, username="bench"))
+
+    results = []
+    for name, backend_cls in auth.JWT_BACKENDS.items():
+        try:
+            backend = backend_cls()
+        except ImportError:  # PyJWT is optional
+            continue
+        auth.jwt_backend = backend
+
+        def uncached():
+            auth.token_cache.clear()
+            resolve_token(token)
+
+        results.append(bench(f"{name} decode every request", uncached, args.iterations))
+        results.append(
+            bench(
+                f"{name} verified-token cache",
+                lambda: resolve_token(token),
+                args.iterations,
+            )
+        )
+    print(json.dumps(results, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,169 @@
+"""
+Latency of GET /tasks/search's query against the 'ILIKE %q%' baseline it replaces. Seeds --tasks tasks (1M by
+default) with random words, then times both queries for the public feed and for one user's tasks:
+
+    ilike     WHERE title ILIKE '%q%' OR description ILIKE '%q%' ORDER BY id LIMIT 20 (unranked, and matches inside
+              words: word1 also finds word10)
+    search    app.crud.search.search_tasks: the GIN-indexed tsvector on Postgres, SearchIndex elsewhere
+
+Run it against a local Postgres from the repository root with the app's env variables set:
+
+    docker compose up -d db
+    python -m benchmarks.bench_search --tasks 1000000 --output search.json
+
+The seeded user is named 'bench_search' and is recreated on every run. Don't point it at a database with real data.
+"""
+
+import argparse
+import json
+import os
+import random
+import statistics
+import time
+
+from sqlalchemy import create_engine, delete, insert, or_, select
+from sqlalchemy.orm import Session
+
+USERNAME = "bench_search"
+OTHER_USERS = 50  # Tasks are spread over these users plus bench_search
+WORDS = [f"word{n}" for n in range(20000)]
+# Common, medium and rare words. The vocabulary is Zipf-like so their hit counts differ by orders of magnitude
+QUERIES = ["word1", "word50", "word2000", "word19999", "word1 word50"]
+PAGE_SIZE = 20
+
+
+def sentence(rng: random.Random, length: int) -> str:
+    # Zipf-like pick so a few words are very common and most are rare
+    return " ".join(WORDS[int(len(WORDS) * rng.random() ** 3)] for _ in range(length))
+
+
+def seed(database_url: str, tasks: int) -> int:
+    # Recreates the benchmark users and tasks. Returns the id of bench_search
+    from app.db.migrate import upgrade_database
+    from app.models.models import Task, User
+
+    engine = create_engine(database_url)
+    upgrade_database(engine)
+    rng = random.Random(1)
+    with engine.begin() as connection:
+        old_users = select(User.id).where(User.username.like(f"{USERNAME}%"))
+        connection.execute(delete(Task).where(Task.user_id.in_(old_users)))
+        connection.execute(delete(User).where(User.id.in_(old_users)))
+        user_ids = (
+            connection.execute(
+                insert(User).returning(User.id, sort_by_parameter_order=True),
+                [
+                    {
+                        "first_name": "Bench",
+                        "username": f"{USERNAME}{n or ''}",
+                        "password": "x",
+                    }
+                    for n in range(OTHER_USERS + 1)
+                ],
+            )
+            .scalars()
+            .all()
+        )
+        for start in range(0, tasks, 10_000):
+            connection.execute(
+                insert(Task),
+                [
+                    {
+                        "title": sentence(rng, 4),
+                        "description": sentence(rng, 20),
+                        "user_id": user_ids[n % len(user_ids)],
+                    }
+                    for n in range(start, min(start + 10_000, tasks))
+                ],
+            )
+        if engine.dialect.name == "postgresql":
+            connection.exec_driver_sql("ANALYZE tasks")
+    engine.dispose()
+    return user_ids[0]
+
+
+def ilike_page(db: Session, q: str, user_id):
+    from app.models.models import Task
+
+    # Only the first term, the baseline can't combine words without more clauses
+    pattern = f"%{q.split()[0]}%"
+    stmt = select(Task.id, Task.title).where(
+        or_(Task.title.ilike(pattern), Task.description.ilike(pattern))
+    )
+    if user_id is not None:
+        stmt = stmt.where(Task.user_id == user_id)
+    return db.execute(stmt.order_by(Task.id).limit(PAGE_SIZE)).all()
+
+
+def search_page(db: Session, q: str, user_id):
+    from app.crud.search import search_tasks
+
+    return search_tasks(db, q, user_id, PAGE_SIZE, None)
+
+
+def time_query(engine, fn, q: str, user_id, repeat: int) -> dict:
+    timings = []
+    with Session(engine) as db:
+        fn(db, q, user_id)  # Warm up caches (and SearchIndex on SQLite)
+        for _ in range(repeat):
+            started = time.perf_counter()
+            rows = fn(db, q, user_id)
+            timings.append(time.perf_counter() - started)
+    return {
+        "hits_on_page": len(rows),
+        "median_ms": round(statistics.median(timings) * 1000, 2),
+        "max_ms": round(max(timings) * 1000, 2),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--database-url", default=os.getenv("DATABASE_URL"))
+    parser.add_argument("--tasks", type=int, default=1_000_000)
+    parser.add_argument("--repeat", type=int, default=20)
+    parser.add_argument(
+        "--skip-seed", action="store_true", help="Reuse the last run's tasks"
+    )
+    parser.add_argument("--output", help="Also write the results to this file")
+    args = parser.parse_args()
+
+    if not args.database_url:
+        raise SystemExit("Set DATABASE_URL or pass --database-url")
+    if args.skip_seed:
+        from app.models.models import User
+
+        with Session(create_engine(args.database_url)) as db:
+            user_id = db.execute(
+                select(User.id).where(User.username == USERNAME)
+            ).scalar_one()
+    else:
+        user_id = seed(args.database_url, args.tasks)
+
+    engine = create_engine(args.database_url)
+    results = []
+    for scope, scope_user in (("public", None), ("own", user_id)):
+        for q in QUERIES:
+            results.append(
+                {
+                    "scope": scope,
+                    "q": q,
+                    "ilike": time_query(engine, ilike_page, q, scope_user, args.repeat),
+                    "search": time_query(
+                        engine, search_page, q, scope_user, args.repeat
+                    ),
+                }
+            )
+    engine.dispose()
+
+    output = json.dumps(
+        {"dialect": engine.dialect.name, "tasks": args.tasks, "results": results},
+        indent=2,
+    )
+    print(output)
+    if args.output:
+        with open(args.output, "w") as file:
+            file.write(output + "\n")
+
+
+if __name__ == "__main__":
+    main()
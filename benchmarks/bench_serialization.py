@@ -0,0 +1,143 @@
+"""
+Cost of serving GET /tasks?limit=100 with the stdlib JSON response class and with orjson (JSON_RESPONSE=orjson),
+plus the read + validate + encode pipeline for one page of ORM objects versus plain row dicts.
+
+Every response class runs in its own process because the app picks it when it is imported. Each process uses a
+temporary SQLite database, so Postgres isn't needed. Run from the repository root with the app's env variables set:
+
+    python -m benchmarks.bench_serialization --requests 2000
+"""
+
+import argparse
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import time
+import timeit
+
+PAGE_SIZE = 100
+
+
+def serve_requests(requests: int) -> dict:
+    # Runs in the child process. JSON_RESPONSE and DATABASE_URL are already set
+    from fastapi.testclient import TestClient
+
+    from app.core.config import settings
+    from app.main import app
+
+    # One portal for all requests. Without the context manager every request starts its own event loop
+    with TestClient(app) as client:
+        token = client.post(
+            "/auth/register",
+            json={"first_name": "Bench", "username": "bench", "password": "benchmark"},
+        ).json()["access_token"]
+        headers = {"Authorization": f"Bearer {token}"}
+        tasks = [
+            {"title": f"Task {i}", "description": "x" * 80} for i in range(PAGE_SIZE)
+        ]
+        client.post("/tasks/bulk", json=tasks, headers=headers)
+
+        url = f"/tasks?limit={PAGE_SIZE}&total=none"
+        for _ in range(50):  # Warm up
+            client.get(url, headers=headers)
+        started = time.perf_counter()
+        for _ in range(requests):
+            client.get(url, headers=headers)
+        elapsed = time.perf_counter() - started
+    return {
+        "case": f"GET {url} with {settings.JSON_RESPONSE}",
+        "requests_per_second": round(requests / elapsed, 1),
+    }
+
+
+def run_child(response_class: str, requests: int) -> dict:
+    with tempfile.TemporaryDirectory() as directory:
+        env = {
+            **os.environ,
+            "JSON_RESPONSE": response_class,
+            "DATABASE_URL": f"sqlite:///{directory}/bench.db",
+            "DB_MODE": "sync",
+            "DB_MIGRATE_ON_STARTUP": "true",
+            "PASSWORD_HASH_WORKERS": "0",
+        }
+        output = subprocess.run(
+            [sys.executable, "-m", "benchmarks.bench_serialization"]
+            + ["--child", "--requests", str(requests)],
+            env=env,
+            check=True,
+            capture_output=True,
+            text=True,
+        ).stdout
+    return json.loads(output)
+
+
+def bench_pipeline(iterations: int) -> list:
+    # One page read as Task objects or as rows, validated into PaginatedTasks and encoded with json.dumps
+    from sqlalchemy import create_engine, insert, select
+    from sqlalchemy.orm import Session
+
+    from app.crud.mutations import TASK_COLUMNS
+    from app.crud.pagination import row_dicts
+    from app.db.session import Base
+    from app.models.models import Task, User
+    from app.schemas.schemas import PaginatedTasks
+
+    engine = create_engine("sqlite://")
+    Base.metadata.create_all(engine)
+    with Session(engine) as db:
+        db.add(User(id=1, first_name="Bench", username="bench", password="x"))
+        db.execute(
+            insert(Task),
+            [
+                {"title": f"Task {i}", "description": "x" * 80, "user_id": 1}
+                for i in range(PAGE_SIZE)
+            ],
+        )
+        db.commit()
+
+    def encode(tasks):
+        page = {"total": None, "skip": 0, "limit": PAGE_SIZE, "tasks": tasks}
+        json.dumps(PaginatedTasks.model_validate(page).model_dump(mode="json"))
+
+    def orm_objects():
+        with Session(engine) as db:
+            encode(db.scalars(select(Task).limit(PAGE_SIZE)).all())
+
+    def rows():
+        with Session(engine) as db:
+            stmt = select(*TASK_COLUMNS).limit(PAGE_SIZE)
+            encode(row_dicts(db.connection().execute(stmt)))
+
+    results = []
+    for label, fn in (("ORM objects", orm_objects), ("row dicts", rows)):
+        seconds = min(timeit.repeat(fn, number=iterations, repeat=5))
+        results.append(
+            {
+                "case": f"read and encode {PAGE_SIZE} tasks as {label}",
+                "us_per_page": round(seconds / iterations * 1e6, 1),
+            }
+        )
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--requests", type=int, default=2000)
+    parser.add_argument("--iterations", type=int, default=200)
+    parser.add_argument("--child", action="store_true", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.child:
+        print(json.dumps(serve_requests(args.requests)))
+        return
+
+    results = bench_pipeline(args.iterations)
+    for response_class in ("json", "orjson"):
+        results.append(run_child(response_class, args.requests))
+    print(json.dumps(results, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,320 @@
+"""
+Load test for the API. Seeds users and tasks, starts 'uvicorn app.main:app' with each requested worker count and
+drives a weighted mix of login, list, read, create, update and delete requests from concurrent clients. Prints
+RPS and p50/p95/p99 latency per operation as JSON so results can be compared between releases.
+
+Run it against a local Postgres, e.g. the one from docker-compose, from the repository root with the app's env
+variables set:
+
+    docker compose up -d db
+    python -m benchmarks.loadtest --users 50 --tasks 200 --workers 1,2,4 --duration 30 --output loadtest.json
+
+Seeded users are named 'loadtest_<n>' and are recreated on every run. Don't point it at a database with real data.
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import random
+import subprocess
+import sys
+import time
+from collections import defaultdict
+from typing import Dict, List
+
+import httpx
+from sqlalchemy import create_engine, delete, insert, select
+
+DEFAULT_MIX = "list=40,read=25,create=10,update=10,delete=5,login=10"
+PASSWORD = "loadtest-password"
+USER_PREFIX = "loadtest_"
+
+
+def parse_mix(mix: str) -> Dict[str, int]:
+    weights = {}
+    for item in mix.split(","):
+        name, weight = item.split("=")
+        weights[name.strip()] = int(weight)
+    unknown = set(weights) - set(OPERATIONS)
+    if unknown:
+        raise SystemExit(f"Unknown operations in --mix: {', '.join(sorted(unknown))}")
+    return weights
+
+
+def seed(database_url: str, users: int, tasks: int) -> None:
+    # Recreates the load test users with 'tasks' tasks each. Runs migrations first so an empty database works
+    from app.auth.hashing import _hash
+    from app.core.config import settings
+    from app.db.migrate import upgrade_database
+    from app.models.models import Task, TaskStatus, User
+
+    engine = create_engine(database_url)
+    upgrade_database(engine)
+    # One hash for every user, with the configured rounds so logins cost what they cost in production
+    password = _hash(PASSWORD, settings.BCRYPT_ROUNDS)
+    statuses = list(TaskStatus)
+    with engine.begin() as connection:
+        old_users = select(User.id).where(User.username.like(f"{USER_PREFIX}%"))
+        # Tasks first because SQLite doesn't enforce ON DELETE CASCADE by default
+        connection.execute(delete(Task).where(Task.user_id.in_(old_users)))
+        connection.execute(delete(User).where(User.id.in_(old_users)))
+        user_ids = (
+            connection.execute(
+                insert(User).returning(User.id, sort_by_parameter_order=True),
+                [
+                    {
+                        "first_name": "Load",
+                        "username": f"{USER_PREFIX}{n}",
+                        "password": password,
+                    }
+                    for n in range(users)
+                ],
+            )
+            .scalars()
+            .all()
+        )
+        rows = [
+            {
+                "title": f"Task {n}",
+                "description": "Seeded by benchmarks.loadtest " * 4,
+                "status": statuses[n % len(statuses)],
+                "user_id": user_id,
+            }
+            for user_id in user_ids
+            for n in range(tasks)
+        ]
+        for start in range(0, len(rows), 10_000):
+            connection.execute(insert(Task), rows[start : start + 10_000])
+        # Postgres plans the listings from these statistics
+        if engine.dialect.name == "postgresql":
+            connection.exec_driver_sql("ANALYZE tasks")
+    engine.dispose()
+
+
+def start_server(workers: int, port: int, database_url: str) -> subprocess.Popen:
+    env = {
+        **os.environ,
+        "DATABASE_URL": database_url,
+        "DB_MIGRATE_ON_STARTUP": "false",
+    }
+    command = [sys.executable, "-m", "uvicorn", "app.main:app", "--port", str(port)]
+    command += ["--workers", str(workers), "--log-level", "warning"]
+    return subprocess.Popen(command, env=env)
+
+
+def wait_until_ready(base_url: str, timeout: float = 60.0) -> None:
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        try:
+            if httpx.get(f"{base_url}/readyz", timeout=1).status_code == 200:
+                return
+        except httpx.TransportError:
+            pass
+        time.sleep(0.2)
+    raise SystemExit(f"Server at {base_url} did not start within {timeout} seconds")
+
+
+class VirtualUser:
+    # One simulated client. Keeps a token and the ids of its own tasks so reads and writes hit real rows
+    def __init__(self, client: httpx.AsyncClient, username: str, rng: random.Random):
+        self.client = client
+        self.username = username
+        self.rng = rng
+        self.headers: Dict[str, str] = {}
+        self.task_ids: List[int] = []
+
+    async def login(self) -> httpx.Response:
+        response = await self.client.post(
+            "/auth/login", json={"username": self.username, "password": PASSWORD}
+        )
+        if response.status_code == 200:
+            token = response.json()["access_token"]
+            self.headers = {"Authorization": f"Bearer {token}"}
+        return response
+
+    async def list(self) -> httpx.Response:
+        response = await self.client.get(
+            "/tasks", params={"limit": 20}, headers=self.headers
+        )
+        if response.status_code == 200 and not self.task_ids:
+            self.task_ids = [task["id"] for task in response.json()["tasks"]]
+        return response
+
+    async def read(self) -> httpx.Response:
+        if not self.task_ids:
+            return await self.list()
+        task_id = self.rng.choice(self.task_ids)
+        return await self.client.get(f"/tasks/{task_id}", headers=self.headers)
+
+    async def create(self) -> httpx.Response:
+        response = await self.client.post(
+            "/tasks",
+            json={"title": "Created by load test", "description": "x" * 100},
+            headers=self.headers,
+        )
+        if response.status_code == 200:
+            self.task_ids.append(response.json()["id"])
+        return response
+
+    async def update(self) -> httpx.Response:
+        if not self.task_ids:
+            return await self.create()
+        task_id = self.rng.choice(self.task_ids)
+        return await self.client.put(
+            f"/tasks/{task_id}",
+            json={"title": f"Updated {self.rng.random():.6f}"},
+            headers=self.headers,
+        )
+
+    async def delete(self) -> httpx.Response:
+        if not self.task_ids:
+            return await self.create()
+        task_id = self.task_ids.pop(self.rng.randrange(len(self.task_ids)))
+        return await self.client.delete(f"/tasks/{task_id}", headers=self.headers)
+
+
+OPERATIONS = {
+    "login": VirtualUser.login,
+    "list": VirtualUser.list,
+    "read": VirtualUser.read,
+    "create": VirtualUser.create,
+    "update": VirtualUser.update,
+    "delete": VirtualUser.delete,
+}
+
+
+async def drive(
+    base_url: str,
+    users: int,
+    concurrency: int,
+    duration: float,
+    mix: Dict[str, int],
+    seed_value: int,
+) -> Dict[str, dict]:
+    # Runs 'concurrency' virtual users for 'duration' seconds and returns latencies in seconds per operation
+    latencies: Dict[str, List[float]] = defaultdict(list)
+    errors: Dict[str, int] = defaultdict(int)
+    names, weights = list(mix), list(mix.values())
+    limits = httpx.Limits(max_connections=concurrency)
+
+    async with httpx.AsyncClient(
+        base_url=base_url, limits=limits, timeout=30
+    ) as client:
+        virtual_users = [
+            VirtualUser(
+                client,
+                f"{USER_PREFIX}{n % users}",
+                random.Random(seed_value + n),
+            )
+            for n in range(concurrency)
+        ]
+        await asyncio.gather(*(user.login() for user in virtual_users))
+        deadline = time.perf_counter() + duration
+
+        async def run(user: VirtualUser):
+            while time.perf_counter() < deadline:
+                name = user.rng.choices(names, weights)[0]
+                started = time.perf_counter()
+                try:
+                    response = await OPERATIONS[name](user)
+                    failed = response.status_code >= 400
+                except httpx.HTTPError:
+                    failed = True
+                latencies[name].append(time.perf_counter() - started)
+                if failed:
+                    errors[name] += 1
+
+        started = time.perf_counter()
+        await asyncio.gather(*(run(user) for user in virtual_users))
+        elapsed = time.perf_counter() - started
+
+    return {
+        name: summarize(latencies[name], errors[name], elapsed) for name in latencies
+    }
+
+
+def percentile(sorted_values: List[float], fraction: float) -> float:
+    # Nearest-rank percentile
+    index = max(
+        0, min(len(sorted_values) - 1, round(fraction * len(sorted_values)) - 1)
+    )
+    return sorted_values[index]
+
+
+def summarize(values: List[float], errors: int, elapsed: float) -> dict:
+    values = sorted(values)
+    return {
+        "requests": len(values),
+        "errors": errors,
+        "rps": round(len(values) / elapsed, 1),
+        "p50_ms": round(percentile(values, 0.50) * 1000, 2),
+        "p95_ms": round(percentile(values, 0.95) * 1000, 2),
+        "p99_ms": round(percentile(values, 0.99) * 1000, 2),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--database-url", default=os.getenv("DATABASE_URL"))
+    parser.add_argument("--users", type=int, default=50)
+    parser.add_argument("--tasks", type=int, default=200, help="Tasks per user")
+    parser.add_argument("--workers", default="1,2,4", help="Uvicorn worker counts")
+    parser.add_argument("--concurrency", type=int, default=32)
+    parser.add_argument("--duration", type=float, default=30.0, help="Seconds per run")
+    parser.add_argument("--mix", default=DEFAULT_MIX)
+    parser.add_argument("--port", type=int, default=8099)
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--output", help="Also write the results to this file")
+    args = parser.parse_args()
+
+    if not args.database_url:
+        raise SystemExit("Set DATABASE_URL or pass --database-url")
+    mix = parse_mix(args.mix)
+    seed(args.database_url, args.users, args.tasks)
+
+    base_url = f"http://127.0.0.1:{args.port}"
+    runs = []
+    for workers in [int(count) for count in args.workers.split(",")]:
+        server = start_server(workers, args.port, args.database_url)
+        try:
+            wait_until_ready(base_url)
+            operations = asyncio.run(
+                drive(
+                    base_url,
+                    args.users,
+                    args.concurrency,
+                    args.duration,
+                    mix,
+                    args.seed,
+                )
+            )
+        finally:
+            server.terminate()
+            server.wait(timeout=30)
+        total = sum(result["requests"] for result in operations.values())
+        runs.append(
+            {
+                "workers": workers,
+                "concurrency": args.concurrency,
+                "duration_seconds": args.duration,
+                "rps": round(total / args.duration, 1),
+                "operations": operations,
+            }
+        )
+
+    results = {
+        "users": args.users,
+        "tasks_per_user": args.tasks,
+        "mix": mix,
+        "runs": runs,
+    }
+    output = json.dumps(results, indent=2)
+    print(output)
+    if args.output:
+        with open(args.output, "w") as file:
+            file.write(output + "\n")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,7 @@
+# Production server settings, read from the SERVER_* values of app.core.config.Settings. See app/core/server.py
+#   gunicorn app.main:app
+from app.core import server
+
+globals().update(server.gunicorn_options())
+
+post_fork = server.post_fork